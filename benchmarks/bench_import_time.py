@@ -0,0 +1,71 @@
+"""
+Measure the time taken to import `parameters` and its submodules, using
+`python -X importtime` (Python >= 3.7), and check that the slow optional
+dependencies are not imported eagerly.
+
+Usage::
+
+    python benchmarks/bench_import_time.py [max_milliseconds]
+
+Exits with status 1 if a module listed in `LAZY_MODULES` is imported by
+``import parameters``, or if the import takes longer than `max_milliseconds`
+(the best of several runs is used).
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import subprocess
+import sys
+
+# modules that must only be imported when they are actually used
+LAZY_MODULES = ['numpy', 'scipy', 'scipy.stats', 'urllib.request', 'yaml']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, *options):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    p = subprocess.Popen([sys.executable] + list(options) + ['-c', code],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                         env=env, universal_newlines=True)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        raise RuntimeError(err)
+    return out, err
+
+
+def import_times(module):
+    """Return a dict mapping module names to cumulative import times in microseconds."""
+    out, err = run("import %s" % module, '-X', 'importtime')
+    times = {}
+    for line in err.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def eagerly_imported(module):
+    out, err = run("import sys, %s; print(' '.join(sys.modules))" % module)
+    loaded = set(out.split())
+    return [name for name in LAZY_MODULES if name in loaded]
+
+
+def main(max_ms=None, repeats=5):
+    status = 0
+    for module in ('parameters', 'parameters.random'):
+        best = min(import_times(module)[module] for i in range(repeats))/1000.0
+        print("%-20s %8.1f ms" % (module, best))
+        if module == 'parameters' and max_ms is not None and best > max_ms:
+            print("  import is slower than %.1f ms" % max_ms)
+            status = 1
+        eager = eagerly_imported(module)
+        if eager:
+            print("  imports %s eagerly" % ", ".join(eager))
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(*[float(arg) for arg in sys.argv[1:]]))
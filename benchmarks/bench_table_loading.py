@@ -0,0 +1,79 @@
+"""
+Compare loading a large table by splitting the whole string and converting
+each cell with float(), as `string_table()` used to, with the streaming
+`string_table()`, `ParameterTable.load()` and `ArrayParameterTable.load()`.
+
+Usage::
+
+    python benchmarks/bench_table_loading.py [n_rows] [n_columns]
+
+By default the table has 5000 rows and 200 columns, i.e. one million cells.
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import sys
+import tempfile
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parameters import string_table, ParameterTable, ArrayParameterTable
+
+
+def split_table(tablestring):
+    """The parsing formerly used by `string_table()`."""
+    tabledict = {}
+    rows = tablestring.strip().split('\n')
+    column_headers = rows[0].split()
+    for row in rows[1:]:
+        row = row.split()
+        tabledict[row[0]] = dict((col_header, float(item))
+                                 for col_header, item in zip(column_headers[1:], row[1:]))
+    return tabledict
+
+
+def make_table(filename, n_rows, n_columns):
+    f = open(filename, 'w')
+    f.write("#\t" + "\t".join("c%d" % j for j in range(n_columns)) + "\n")
+    for i in range(n_rows):
+        f.write("r%d\t" % i + "\t".join("%.6g" % random.random()
+                                        for j in range(n_columns)) + "\n")
+    f.close()
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.time()
+    result = func(*args, **kwargs)
+    print("%-40s %8.3f s" % (label, time.time() - start))
+    return result
+
+
+def main(n_rows=5000, n_columns=200):
+    fd, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        make_table(filename, n_rows, n_columns)
+        print("%d x %d table (%d cells)" % (n_rows, n_columns, n_rows*n_columns))
+
+        def read_string(parse):
+            f = open(filename)
+            try:
+                return parse(f.read())
+            finally:
+                f.close()
+        timed("split and float() per cell", read_string, split_table)
+        timed("string_table", read_string, string_table)
+        timed("ParameterTable.load", ParameterTable.load, filename)
+        timed("ParameterTable.load(dtypes=float)",
+              ParameterTable.load, filename, dtypes=float)
+        timed("ArrayParameterTable.load", ArrayParameterTable.load, filename)
+        timed("ArrayParameterTable.load(dtypes=float)",
+              ArrayParameterTable.load, filename, dtypes=float)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
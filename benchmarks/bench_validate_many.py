@@ -0,0 +1,70 @@
+"""
+Measure how `validate_many()` scales with the number of worker processes, by
+loading and validating the same batch of parameter files with 1, 2, 4, ...
+workers, up to the number of CPUs, and printing the throughput of each run
+and its speedup over the run in a single process.
+
+Usage::
+
+    python benchmarks/bench_validate_many.py [n_files] [n_groups] [n_leaves]
+
+By default there are 200 files, each a tree of 50 groups of 50 leaves (see
+`generators.wide_tree`). The speedup can only be close to the number of
+workers on a machine with at least that many idle cores.
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import sys
+import shutil
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parameters.validators import ParameterSchema, validate_many
+import generators
+
+
+def make_files(directory, n_files, n_groups, n_leaves):
+    filenames = []
+    for i in range(n_files):
+        ps = generators.wide_tree(n_groups, n_leaves, seed=i)
+        filename = os.path.join(directory, "%d.param" % i)
+        ps.save(filename)
+        filenames.append(filename)
+    return filenames
+
+
+def worker_counts():
+    n = 1
+    counts = []
+    while n < multiprocessing.cpu_count():
+        counts.append(n)
+        n *= 2
+    return counts + [multiprocessing.cpu_count()]
+
+
+def main(n_files=200, n_groups=50, n_leaves=50):
+    directory = tempfile.mkdtemp()
+    try:
+        filenames = make_files(directory, n_files, n_groups, n_leaves)
+        schema = ParameterSchema(generators.wide_tree(n_groups, n_leaves))
+        print("%d files of %d leaves, %d CPUs" % (n_files, n_groups*n_leaves,
+                                                   multiprocessing.cpu_count()))
+        base = None
+        for workers in worker_counts():
+            batch = validate_many(filenames, schema, workers=workers)
+            errors = batch.errors()
+            assert not errors, errors[0]
+            if base is None:
+                base = batch.elapsed()
+            print("%3d workers %8.3f s %10.1f files/s   speedup %5.2f"
+                  % (workers, batch.elapsed(), batch.throughput(),
+                     base/batch.elapsed()))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
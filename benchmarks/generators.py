@@ -0,0 +1,101 @@
+"""
+Synthetic parameter sets, spaces and tables for the benchmarks, generated
+deterministically so that results can be compared between runs.
+"""
+
+from __future__ import absolute_import
+import random
+from parameters import ParameterSet, ParameterSpace, ParameterRange, \
+    ParameterReference, NormalDist, UniformDist
+
+
+def _leaf(rng, i):
+    kind = i % 4
+    if kind == 0:
+        return rng.randint(0, 1000)
+    elif kind == 1:
+        return rng.random()
+    elif kind == 2:
+        return "value%d" % i
+    return [rng.random() for j in range(3)]
+
+
+def deep_tree(depth=12, breadth=2, leaves=3, seed=1):
+    """A tree `depth` levels deep, with `breadth` subtrees and `leaves` leaves per node."""
+    rng = random.Random(seed)
+
+    def node(level):
+        d = dict(("p%d" % i, _leaf(rng, i)) for i in range(leaves))
+        if level < depth:
+            for j in range(breadth):
+                d["level%d_%d" % (level, j)] = node(level + 1)
+        return d
+    return ParameterSet(node(1))
+
+
+def deep_path(ps):
+    """Return the dotted path of the deepest leaf on the first branch of `ps`."""
+    parts = []
+    node = ps
+    while True:
+        subtrees = sorted(k for k, v in node.items() if isinstance(v, dict))
+        if not subtrees:
+            return '.'.join(parts + ['p0'])
+        parts.append(subtrees[0])
+        node = node[subtrees[0]]
+
+
+def wide_tree(n_groups=100, n_leaves=100, seed=1):
+    """A two-level tree with `n_groups` groups of `n_leaves` leaves."""
+    rng = random.Random(seed)
+    return ParameterSet(dict(("group%d" % g, dict(("p%d" % i, _leaf(rng, i))
+                                                  for i in range(n_leaves)))
+                             for g in range(n_groups)))
+
+
+def many_nodes_text(n_nodes=20000, n_leaves=4, seed=1):
+    """
+    JSON text of a tree with `n_nodes` small subtrees of `n_leaves` leaves,
+    as in a large network description with one parameter set per cell.
+    """
+    import json
+    rng = random.Random(seed)
+    return json.dumps(dict(("cell%d" % i, dict(("p%d" % j, rng.random())
+                                               for j in range(n_leaves)))
+                           for i in range(n_nodes)))
+
+
+def referencing_tree(n_groups=50, n_leaves=20, seed=1):
+    """A wide tree in which half of the leaves are references to other leaves."""
+    ps = wide_tree(n_groups, n_leaves, seed)
+    for g in range(n_groups):
+        for i in range(1, n_leaves, 2):
+            target = "group%d.p%d" % ((g + 1) % n_groups, i - 1)
+            ps["group%d" % g]["p%d" % i] = ParameterReference(target)*2
+    return ps
+
+
+def range_space(n_ranges=6, n_values=6, n_fixed=50):
+    """A space with `n_ranges` ranges of `n_values` values and `n_fixed` fixed leaves."""
+    d = dict(("fixed%d" % i, float(i)) for i in range(n_fixed))
+    d['ranges'] = dict(("r%d" % i, ParameterRange(list(range(n_values))))
+                       for i in range(n_ranges))
+    return ParameterSpace(d)
+
+
+def dist_space(n_dists=20, n_fixed=50):
+    """A space with `n_dists` distributions, each with its own generator."""
+    d = dict(("fixed%d" % i, float(i)) for i in range(n_fixed))
+    d['dists'] = dict(("d%d" % i, NormalDist(std=1.0, rng=i) if i % 2 else
+                       UniformDist(rng=i)) for i in range(n_dists))
+    return ParameterSpace(d)
+
+
+def table_text(n_rows=1000, n_columns=50, seed=1):
+    """A whitespace-separated table with a header line, as a string."""
+    rng = random.Random(seed)
+    lines = ["#\t" + "\t".join("c%d" % j for j in range(n_columns))]
+    for i in range(n_rows):
+        lines.append("r%d\t" % i + "\t".join("%.6g" % rng.random()
+                                             for j in range(n_columns)))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,260 @@
+"""
+Run the benchmark suite: time the main operations of `parameters` on
+synthetic parameter sets (see `generators.py`), measure the peak memory
+allocated by each (Python >= 3.4, with `tracemalloc`), write the results as
+JSON, and compare them with a stored baseline.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py [-o results.json] [-b baseline.json]
+                                        [-t 0.25] [-k pattern] [--quick]
+                                        [--no-baseline]
+
+By default the results are compared with `benchmarks/baseline.json`, the
+results of a full run on the reference version. Times depend on the machine,
+so to compare on another machine, store a baseline of the reference version
+made on it::
+
+    python benchmarks/run_benchmarks.py --no-baseline -o baseline.json
+
+and pass it with `-b`. A baseline made without `--quick` is not compared
+with a quick run, or the other way round.
+
+Exits with status 1 if any benchmark present in the baseline is slower, or
+allocates more memory, than in the baseline by more than the threshold (a
+fraction, 0.25 by default). Times are the best of several repeats, with
+string hashing made deterministic by running with ``PYTHONHASHSEED=0``.
+"""
+
+from __future__ import absolute_import, print_function, division
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parameters import ParameterSet, ArrayParameterTable, string_table
+from parameters.validators import ParameterSchema, CongruencyValidator
+import generators
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+timer = getattr(time, 'perf_counter', time.time)
+
+MIN_MEMORY_KB = 16
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class Benchmark(object):
+    """
+    An operation to time: `setup()` returns the state passed to `run()`,
+    which does `items` units of work (lookups, nodes, points, ...). If
+    `fresh` is True, `setup()` is called again before each run, for
+    operations that modify their state.
+    """
+
+    def __init__(self, name, setup, run, items, unit, fresh=False):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.items = items
+        self.unit = unit
+        self.fresh = fresh
+
+    def time(self, repeats):
+        """Return the best time of `repeats` runs, in seconds."""
+        times = []
+        state = None
+        for i in range(repeats):
+            if self.fresh or state is None:
+                state = self.setup()
+            start = timer()
+            self.run(state)
+            times.append(timer() - start)
+        return min(times)
+
+    def peak_memory(self):
+        """Return the peak memory allocated during a run, in kB, or None."""
+        if tracemalloc is None:
+            return None
+        state = self.setup()
+        tracemalloc.start()
+        try:
+            self.run(state)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return peak/1024.0
+
+
+def _count_nodes(ps):
+    return 1 + sum(_count_nodes(v) for v in ps.values() if isinstance(v, ParameterSet))
+
+
+def _iterate(iterator):
+    for x in iterator:
+        pass
+
+
+def benchmarks(quick=False):
+    """Return the list of benchmarks, with smaller inputs if `quick` is True."""
+    s = 4 if quick else 1    # reduction factor
+    depth = 10 if quick else 12
+    deep = generators.deep_tree(depth=depth)
+    deep_nodes = _count_nodes(deep)
+    wide = generators.wide_tree(n_groups=100//s, n_leaves=100)
+    wide_leaves = len(wide.flatten())
+    wide_text = wide.pretty()
+    lookups = 100000//s
+    deep_path = generators.deep_path(deep)
+    wide_paths = ["group%d.p%d" % (i % (100//s), (7*i) % 100) for i in range(lookups)]
+    space = generators.range_space(n_ranges=6, n_values=6 if not quick else 4)
+    n_points = space.num_conditions()
+    dists = generators.dist_space()
+    n_draws = 5000//s
+    refs = generators.referencing_tree(n_groups=50//s)
+    n_refs = len(refs.find_references())
+    schema = ParameterSchema(generators.wide_tree(n_groups=100//s, n_leaves=100))
+    validator = CongruencyValidator()
+    many_nodes = generators.many_nodes_text(n_nodes=20000//s)
+    table = generators.table_text(n_rows=1000//s, n_columns=50)
+    cells = (1000//s)*50
+
+    wide_changed = ParameterSet(wide.as_dict())
+    wide_changed['group7.p3'] = -1
+
+    def deep_lookups(ps):
+        for i in range(lookups):
+            ps[deep_path]
+
+    def wide_lookups(ps):
+        for path in wide_paths:
+            ps[path]
+
+    return [
+        Benchmark('getitem_deep', lambda: deep, deep_lookups, lookups, 'lookups'),
+        Benchmark('getitem_wide', lambda: wide, wide_lookups, lookups, 'lookups'),
+        Benchmark('tree_copy_deep', lambda: deep, lambda ps: ps.tree_copy(),
+                  deep_nodes, 'nodes'),
+        Benchmark('tree_copy_wide', lambda: wide, lambda ps: ps.tree_copy(),
+                  wide_leaves, 'leaves'),
+        Benchmark('build_many_nodes', lambda: json.loads(many_nodes), ParameterSet,
+                  20000//s, 'nodes', fresh=True),
+        Benchmark('flatten_wide', lambda: wide, lambda ps: ps.flatten(),
+                  wide_leaves, 'leaves'),
+        Benchmark('diff_wide', lambda: wide, lambda ps: ps.diff(wide_changed),
+                  wide_leaves, 'leaves'),
+        Benchmark('pretty_wide', lambda: wide, lambda ps: ps.pretty(),
+                  wide_leaves, 'leaves'),
+        Benchmark('read_from_str', lambda: wide_text, ParameterSet,
+                  wide_leaves, 'leaves'),
+        Benchmark('iter_inner', lambda: space, lambda sp: _iterate(sp.iter_inner()),
+                  n_points, 'points'),
+        Benchmark('iter_inner_random', lambda: space,
+                  lambda sp: _iterate(sp.iter_inner(order='random', seed=1)),
+                  n_points, 'points'),
+        Benchmark('num_conditions', lambda: space, lambda sp: sp.num_conditions(),
+                  1, 'calls'),
+        Benchmark('realize_dists', lambda: dists,
+                  lambda sp: _iterate(sp.realize_dists(n_draws)), n_draws, 'points'),
+        Benchmark('replace_references', lambda: refs.tree_copy(),
+                  lambda ps: ps.replace_references(), n_refs, 'references', fresh=True),
+        Benchmark('validate', lambda: wide,
+                  lambda ps: validator.validate(ps, schema), wide_leaves, 'leaves'),
+        Benchmark('string_table', lambda: table, string_table, cells, 'cells'),
+        Benchmark('array_table', lambda: table, ArrayParameterTable, cells, 'cells'),
+    ]
+
+
+def run(selected, repeats):
+    results = {}
+    for bench in selected:
+        seconds = bench.time(repeats)
+        peak = bench.peak_memory()
+        results[bench.name] = {'seconds': seconds,
+                               'per_second': bench.items/seconds if seconds else None,
+                               'unit': bench.unit,
+                               'peak_memory_kb': peak}
+        print("%-20s %10.4f s %14.0f %s/s %12s" % (
+            bench.name, seconds, results[bench.name]['per_second'] or 0, bench.unit,
+            "-" if peak is None else "%.0f kB" % peak))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the changes from `baseline`, and return the names of regressions."""
+    regressions = []
+    print("\nComparison with baseline (threshold %.0f%%):" % (100*threshold))
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        new, old = results[name], baseline[name]
+        ratio = new['seconds']/old['seconds']
+        line = "%-20s time x%.2f" % (name, ratio)
+        regressed = ratio > 1 + threshold
+        # very small allocations vary too much from run to run to compare
+        if new.get('peak_memory_kb') and (old.get('peak_memory_kb') or 0) >= MIN_MEMORY_KB:
+            memory_ratio = new['peak_memory_kb']/old['peak_memory_kb']
+            line += "  memory x%.2f" % memory_ratio
+            regressed = regressed or memory_ratio > 1 + threshold
+        if regressed:
+            line += "  REGRESSION"
+            regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE,
+                        help="compare with the results in this JSON file "
+                             "(default: %(default)s)")
+    parser.add_argument('--no-baseline', dest='baseline', action='store_const',
+                        const=None, help="do not compare with a baseline")
+    parser.add_argument('-t', '--threshold', type=float, default=0.25,
+                        help="fractional slow-down counted as a regression")
+    parser.add_argument('-k', '--select', default='',
+                        help="only run benchmarks whose names contain this string")
+    parser.add_argument('-r', '--repeats', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="use smaller inputs")
+    args = parser.parse_args(argv)
+
+    selected = [b for b in benchmarks(args.quick) if args.select in b.name]
+    results = run(selected, args.repeats)
+    output = {'meta': {'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'quick': args.quick,
+                       'repeats': args.repeats},
+              'benchmarks': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('quick') != args.quick:
+            print("\nNot compared with %s, which was run with quick=%s"
+                  % (args.baseline, baseline['meta'].get('quick')))
+        elif compare(results, baseline['benchmarks'], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    if os.environ.get('PYTHONHASHSEED') != '0':
+        # string hashing, and so dict lookup times, vary between processes
+        # unless the hash seed is fixed
+        import subprocess
+        env = dict(os.environ, PYTHONHASHSEED='0')
+        sys.exit(subprocess.call([sys.executable] + sys.argv, env=env))
+    sys.exit(main())
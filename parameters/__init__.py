@@ -12,8 +12,14 @@ ParameterRange - for specifying a list of possible values for a given parameter.
 ParameterReference - specify a parameter in terms of the value of another parameter.
 ParameterSet   - for representing/managing hierarchical parameter sets.
 ParameterTable - a sub-class of ParameterSet that can represent a table of parameters.
+ArrayParameterTable - a table of parameters stored in a 2D NumPy array.
 ParameterSpace - a collection of ParameterSets, representing multiple points in
                  parameter space.
+SweepCursor    - a resumable position in an iteration over a ParameterSpace.
+AccessRecord   - the names of the parameters read from a ParameterSet.
+InternPool     - a pool of subtrees and values shared between ParameterSets.
+ParameterOverlay - a view of a ParameterSet with some values overridden.
+ParameterSpaceUnion - a union of disjoint ParameterSpaces.
 
 **Imported from validators**
 
@@ -50,19 +56,31 @@ validators        - A module implementing validation of ParameterSets against Pa
 
 from __future__ import absolute_import
 import copy
+import os
 import warnings
 import math
+import numbers
 import operator
+import ast
+import hashlib
+import pickle
+import threading
+import weakref
 from functools import wraps
+from collections import namedtuple
 try:
-    from urllib2 import build_opener, install_opener, urlopen, ProxyHandler, HTTPHandler  # Python 2
-    from urlparse import urlparse
+    from collections.abc import Mapping   # Python 3
 except ImportError:
-    from urllib.request import build_opener, install_opener, urlopen, ProxyHandler, HTTPHandler  # Python 3
-    from urllib.parse import urlparse
+    from collections import Mapping       # Python 2
+try:
+    from urlparse import urlparse  # Python 2
+except ImportError:
+    from urllib.parse import urlparse  # Python 3
 
 from os import environ, path
-from .random import ParameterDist, GammaDist, UniformDist, NormalDist
+from .random import ParameterDist, GammaDist, UniformDist, NormalDist, \
+    LogNormalDist, TruncatedNormalDist, ChoiceDist, RandIntDist, PoissonDist
+from . import instrumentation as _instrumentation
 import random
 from copy import copy
 
@@ -77,15 +95,57 @@ except NameError:
     def next(obj):        # Python 2
         return obj.next()
 
+try:
+    from sys import intern  # Python 3
+except ImportError:
+    pass                    # Python 2: a built-in
+
 
 __version__ = '0.2.1'
 
 if 'HTTP_PROXY' in environ:
     HTTP_PROXY = environ['HTTP_PROXY']  # user has to define it
-    ''' next lines are for communication to urllib of proxy information '''
-    proxy_support = ProxyHandler({"https": HTTP_PROXY})
-    opener = build_opener(proxy_support, HTTPHandler)
-    install_opener(opener)
+
+_urlopen = None
+
+
+def urlopen(url):
+    """
+    Open `url` with `urllib`, which is only imported the first time a URL is
+    opened, since it is slow to import. If the `HTTP_PROXY` environment
+    variable is defined, a proxy opener is installed at the same time.
+    """
+    global _urlopen
+    if _urlopen is None:
+        try:
+            from urllib2 import build_opener, install_opener, urlopen, ProxyHandler, HTTPHandler  # Python 2
+        except ImportError:
+            from urllib.request import build_opener, install_opener, urlopen, ProxyHandler, HTTPHandler  # Python 3
+        if 'HTTP_PROXY' in environ:
+            # communicate the proxy information to urllib
+            proxy_support = ProxyHandler({"https": environ['HTTP_PROXY']})
+            opener = build_opener(proxy_support, HTTPHandler)
+            install_opener(opener)
+        _urlopen = urlopen
+    return _urlopen(url)
+
+
+def _aio():
+    """Import the `aio` module, which requires Python 3.7 or later."""
+    import sys
+    if sys.version_info < (3, 7):
+        raise ImportError("The asyncio methods require Python 3.7 or later")
+    from . import aio
+    return aio
+
+
+def _sharedmem():
+    """Import the `sharedmem` module, which uses `multiprocessing.shared_memory`."""
+    try:
+        from . import sharedmem
+    except ImportError:
+        raise ImportError("Shared parameter sets require Python 3.8 or later")
+    return sharedmem
 
 
 def isiterable(x):
@@ -142,33 +202,311 @@ class Parameter(object):
         return s
 
 
+def _close(x, y, rel_tol=1e-12, abs_tol=0.0):
+    """
+    Return True if the numbers `x` and `y` are equal to within rounding error,
+    i.e. to within `rel_tol` times the larger of them or `abs_tol`, as for
+    `math.isclose()`.
+    """
+    return x == y or abs(x - y) <= max(rel_tol*max(abs(x), abs(y)), abs_tol)
+
+
+class LinearSequence(object):
+    """
+    The `num` evenly spaced numbers `start`, `start+step`, ..., computed on
+    demand rather than stored. If `last` is given, it replaces the computed
+    last value (as for `numpy.linspace`, to avoid rounding errors).
+
+    Supports `len()`, iteration, indexing and `index()`, all but iteration in
+    constant time. Used by `ParameterRange.linspace()` and
+    `ParameterRange.arange()`.
+    """
+
+    def __init__(self, start, step, num, last=None, spec=None):
+        if num < 0:
+            raise ValueError("A sequence cannot have a negative length")
+        if step == 0 and num > 1:
+            raise ValueError("The step of a sequence cannot be zero")
+        self.start = start
+        self.step = step
+        self.num = num
+        self.last = last
+        # how the sequence was defined, e.g. ('linspace', '0, 1, 11')
+        self.spec = spec
+
+    def __len__(self):
+        return self.num
+
+    def _item(self, i):
+        if self.last is not None and i == self.num - 1:
+            return self.last
+        return self.start + i*self.step
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._item(j) for j in range(*i.indices(self.num))]
+        i = operator.index(i)
+        if i < 0:
+            i += self.num
+        if not 0 <= i < self.num:
+            raise IndexError("sequence index out of range")
+        return self._item(i)
+
+    def __iter__(self):
+        for i in range(self.num):
+            yield self._item(i)
+
+    def index(self, value):
+        """Return the index of `value` in the sequence, in constant time."""
+        try:
+            i = int(round((value - self.start)/float(self.step))) if self.step else 0
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("%r is not in sequence" % (value,))
+        # values near zero, e.g. start + i*step = 5.6e-17 for 0.0, are only
+        # close to within the rounding error of `start` and `step`
+        if 0 <= i < self.num and _close(self._item(i), value,
+                                        abs_tol=1e-12*max(abs(self.start), abs(self.step))):
+            return i
+        raise ValueError("%r is not in sequence" % (value,))
+
+    def __contains__(self, value):
+        try:
+            self.index(value)
+        except ValueError:
+            return False
+        return True
+
+    def __eq__(self, o):
+        if isinstance(o, LinearSequence) and type(o) == type(self):
+            return (self.start, self.step, self.num, self.last) == \
+                   (o.start, o.step, o.num, o.last)
+        return isiterable(o) and list(self) == list(o)
+
+    def __ne__(self, o):
+        return not self.__eq__(o)
+
+    def __repr__(self):
+        return '%s(%r, %r, %r, last=%r)' % (self.__class__.__name__, self.start,
+                                           self.step, self.num, self.last)
+
+
+class GeometricSequence(LinearSequence):
+    """
+    The numbers `base**x` for each `x` in a `LinearSequence`, computed on
+    demand. Used by `ParameterRange.logspace()`.
+    """
+
+    def __init__(self, start, step, num, last=None, spec=None, base=10.0):
+        LinearSequence.__init__(self, start, step, num, last, spec)
+        self.base = base
+
+    def _item(self, i):
+        return self.base**LinearSequence._item(self, i)
+
+    def index(self, value):
+        try:
+            exponent = math.log(value, self.base)
+        except (TypeError, ValueError):
+            raise ValueError("%r is not in sequence" % (value,))
+        try:
+            i = int(round((exponent - self.start)/float(self.step))) if self.step else 0
+        except OverflowError:
+            raise ValueError("%r is not in sequence" % (value,))
+        if 0 <= i < self.num and _close(self._item(i), value):
+            return i
+        raise ValueError("%r is not in sequence" % (value,))
+
+    def __eq__(self, o):
+        if isinstance(o, GeometricSequence):
+            return LinearSequence.__eq__(self, o) and self.base == o.base
+        return LinearSequence.__eq__(self, o)
+
+    def __repr__(self):
+        return '%s(%r, %r, %r, last=%r, base=%r)' % (self.__class__.__name__, self.start,
+                                                    self.step, self.num, self.last,
+                                                    self.base)
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(x, key):
+    """Scramble the integer `x` with the 64-bit `key` (the splitmix64 finalizer)."""
+    x = ((x ^ key)*0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30))*0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27))*0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+class IndexPermutation(object):
+    """
+    A pseudo-random permutation of the integers 0, ..., `n`-1, determined by
+    `seed`. Each position is mapped with a balanced Feistel network over the
+    smallest even power of two not smaller than `n`, re-applied until the
+    result falls below `n` ("cycle walking"), so that the permutation is never
+    stored: `p[i]` takes constant memory and, on average, fewer than four
+    evaluations of the network.
+    """
+
+    rounds = 4
+
+    def __init__(self, n, seed=None):
+        if n < 0:
+            raise ValueError("A permutation cannot have a negative length")
+        self.n = n
+        self.seed = seed
+        bits = max(2, (n - 1).bit_length())
+        self._half = (bits + 1)//2
+        self._mask = (1 << self._half) - 1
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(64) for r in range(self.rounds)]
+
+    def __len__(self):
+        return self.n
+
+    def _encrypt(self, x):
+        left, right = x >> self._half, x & self._mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix(right, key) & self._mask)
+        return (left << self._half) | right
+
+    def __getitem__(self, i):
+        i = operator.index(i)
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError("permutation index out of range")
+        i = self._encrypt(i)
+        while i >= self.n:
+            i = self._encrypt(i)
+        return i
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self[i]
+
+
 class ParameterRange(Parameter):
     """
     A class for specifying a list of possible values for a given parameter.
 
     The value must be an iterable. It acts like a Parameter, but .next() can be
     called to iterate through the values
+
+    Long ranges of evenly spaced numbers should be created with the
+    `linspace()`, `logspace()` or `arange()` constructors, which do not store
+    the values.
+
+    Ranges in a `ParameterSpace` with the same `link` label vary together
+    rather than independently: the first values of all of them are used
+    together, then the second values, etc. Linked ranges must have the same
+    length.
     """
 
-    def __init__(self, value, units=None, name="", shuffle=False):
+    link = None
+
+    def __init__(self, value, units=None, name="", shuffle=False, link=None):
         if not isiterable(value):
             raise TypeError("A ParameterRange value must be iterable")
         Parameter.__init__(self, next(value.__iter__()), units, name)
         self._values = copy(value)
-        self._iter_values = self._values.__iter__()
+        self.link = link
         if shuffle:
+            if isinstance(self._values, LinearSequence):
+                self._values = list(self._values)
             random.shuffle(self._values)
+        self._iter_values = self._values.__iter__()
+
+    @classmethod
+    def linspace(cls, start, stop, num=50, endpoint=True, units=None, name="", link=None):
+        """
+        Return a range of `num` evenly spaced numbers from `start` to `stop`
+        (excluded if `endpoint` is False), like `numpy.linspace()`. The values
+        are computed on demand.
+        """
+        div = (num - 1) if endpoint else num
+        step = (stop - start)/float(div) if div > 0 else 0.0
+        spec = ('linspace', '%r, %r, %r%s' % (start, stop, num,
+                                               '' if endpoint else ', endpoint=False'))
+        last = stop*1.0 if endpoint and num > 1 else None
+        return cls(LinearSequence(start, step, num, last, spec), units, name, link=link)
+
+    @classmethod
+    def logspace(cls, start, stop, num=50, endpoint=True, base=10.0, units=None, name="",
+                 link=None):
+        """
+        Return a range of `num` numbers evenly spaced on a log scale, from
+        `base**start` to `base**stop`, like `numpy.logspace()`. The values are
+        computed on demand.
+        """
+        div = (num - 1) if endpoint else num
+        step = (stop - start)/float(div) if div > 0 else 0.0
+        spec = ('logspace', '%r, %r, %r%s%s' % (start, stop, num,
+                                                 '' if endpoint else ', endpoint=False',
+                                                 '' if base == 10.0 else ', base=%r' % base))
+        last = stop if endpoint and num > 1 else None
+        return cls(GeometricSequence(start, step, num, last, spec, base), units, name,
+                   link=link)
+
+    @classmethod
+    def arange(cls, start, stop=None, step=1, units=None, name="", link=None):
+        """
+        Return a range of the numbers `start`, `start+step`, ... up to but not
+        including `stop`, like `numpy.arange()` (or `range()` for integers).
+        The values are computed on demand.
+        """
+        if stop is None:
+            start, stop = 0, start
+        if step == 0:
+            raise ValueError("The step of a range cannot be zero")
+        if all(isinstance(x, int) for x in (start, stop, step)):
+            num = max(0, -((start - stop)//step))
+        else:
+            num = max(0, int(math.ceil((stop - start)/float(step))))
+        spec = ('arange', '%r, %r%s' % (start, stop, '' if step == 1 else ', %r' % step))
+        return cls(LinearSequence(start, step, num, None, spec), units, name, link=link)
 
     def __repr__(self):
         units_str = ''
         if self.units:
             units_str = ', units="%s"' % self.units
+        if self.link is not None:
+            units_str += ', link="%s"' % self.link
+        spec = getattr(self._values, 'spec', None)
+        if spec:
+            return 'ParameterRange.%s(%s%s)' % (spec[0], spec[1], units_str)
         return 'ParameterRange(%s%s)' % (self._values.__repr__(), units_str)
 
+    def index(self, value):
+        """
+        Return the position of `value` in the range. This takes constant time
+        for ranges created by `linspace()`, `logspace()` and `arange()`.
+        """
+        try:
+            return self._values.index(value)
+        except AttributeError:
+            return list(self._values).index(value)
+
+    def value_at(self, i):
+        """
+        Return the value at position `i` in the range, without iterating over
+        the preceding values if the range supports indexing.
+        """
+        try:
+            return self._values[i]
+        except TypeError:
+            return list(self._values)[i]
+
     def __iter__(self):
         self._iter_values = self._values.__iter__()
         return self._iter_values
 
+    def __getstate__(self):
+        # the iterator over a lazy range is a generator, which cannot be pickled
+        state = self.__dict__.copy()
+        state.pop('_iter_values', None)
+        return state
+
     def __next__(self):
         self._value = next(self._iter_values)
         return self._value
@@ -183,7 +521,8 @@ class ParameterRange(Parameter):
         if (type(self) == type(o) and
             self.name == o.name and
             self._values == o._values and
-                self.units == o.units):
+            self.units == o.units and
+                self.link == o.link):
             return True
         else:
             return False
@@ -237,6 +576,8 @@ class ParameterReference(object):
         """
         This function evaluetes the reference, using the ParameterSet in parameter_set as the source.
         """
+        if _instrumentation.enabled:
+            _instrumentation.count('reference.evaluate')
         ref_value = parameter_set[self.reference_path]
         if isinstance(ref_value,ParameterSet):
            if self.operations == []:
@@ -284,6 +625,358 @@ def load_parameters(parameter_url, modified_parameters):
     return parameters
 
 
+# set while a lookup is being recorded, or by `_lookup()`, so that the
+# lookups it makes in nested parameter sets are not recorded as well
+_lookup_state = threading.local()
+
+
+def _lookup(ps, name):
+    """
+    Return `ps[name]`, or `ps` if `name` is '', without recording the lookup,
+    for lookups made by `parameters` itself.
+    """
+    if not name:
+        return ps
+    if not (_instrumentation.enabled or _tracking):
+        return ps[name]
+    active = getattr(_lookup_state, 'active', False)
+    _lookup_state.active = True
+    try:
+        return ps[name]
+    finally:
+        _lookup_state.active = active
+
+
+def _recorded_getitem(ps, name):
+    """
+    `ParameterSet.__getitem__()`, recording the lookup and its depth if
+    instrumentation is enabled, and its path if accesses are being tracked.
+    Nested parameter sets are looked up with their own `__getitem__()`, as
+    when nothing is recorded, but their lookups are not recorded.
+    """
+    split = name.split('.', 1)
+    if getattr(_lookup_state, 'active', False):
+        if len(split) == 1:
+            return dict.__getitem__(ps, name)
+        return dict.__getitem__(ps, split[0])[split[1]]
+    if _instrumentation.enabled:
+        _instrumentation.count('getitem')
+        _instrumentation.count('getitem.depth', name.count('.') + 1)
+    records = [record for record in getattr(_lookup_state, 'records', ())
+               if id(ps) in record._nodes]
+    _lookup_state.active = True
+    try:
+        if len(split) == 1:
+            value = dict.__getitem__(ps, name)
+        else:
+            value = dict.__getitem__(ps, split[0])[split[1]]
+    except KeyError:
+        for record in records:
+            record._read(ps, name, missing=True)
+        raise
+    finally:
+        _lookup_state.active = False
+    for record in records:
+        record._read(ps, name, value)
+    return value
+
+
+def _record_use(ps, name=None, value=None, missing=False):
+    """
+    Record, in the `AccessRecords` tracking `ps`, that the parameter `name`
+    of `ps` was looked up, e.g. with `get()` or `in`, or, if `name` is
+    None, that all of `ps` was used, e.g. by iterating over it.
+    """
+    for record in getattr(_lookup_state, 'records', ()):
+        if id(ps) in record._nodes:
+            if name is None:
+                record._read_all(ps)
+            else:
+                record._read(ps, name, value, missing)
+
+
+# The number of `AccessRecords` in use in all threads; while there are any,
+# the dict methods below are set on `ParameterSet`, so that their use is
+# recorded, and otherwise they are the plain dict methods. Each thread's
+# records are kept in `_lookup_state.records`.
+_tracking = 0
+_tracking_lock = threading.Lock()
+
+
+def _tracked_get(self, name, default=None):
+    value = dict.get(self, name, _MISSING)
+    _record_use(self, name, value, value is _MISSING)
+    return default if value is _MISSING else value
+
+
+def _tracked_contains(self, name):
+    value = dict.get(self, name, _MISSING)
+    _record_use(self, name, value, value is _MISSING)
+    return value is not _MISSING
+
+
+def _tracked_use(method):
+    def tracked(self):
+        _record_use(self)
+        return method(self)
+    tracked.__name__ = method.__name__
+    return tracked
+
+
+_tracked_methods = {'get': _tracked_get, '__contains__': _tracked_contains}
+for _method in (dict.__iter__, dict.__len__, dict.keys, dict.values, dict.items):
+    _tracked_methods[_method.__name__] = _tracked_use(_method)
+del _method
+
+
+def _start_tracking(record):
+    global _tracking
+    records = getattr(_lookup_state, 'records', None)
+    if records is None:
+        records = _lookup_state.records = []
+    records.append(record)
+    with _tracking_lock:
+        if not _tracking:
+            for name, method in _tracked_methods.items():
+                setattr(ParameterSet, name, method)
+        _tracking += 1
+
+
+def _stop_tracking(record):
+    global _tracking
+    _lookup_state.records.remove(record)
+    with _tracking_lock:
+        _tracking -= 1
+        if not _tracking:
+            for name in _tracked_methods:
+                delattr(ParameterSet, name)
+
+
+def _update_digest(h, value):
+    if isinstance(value, dict):
+        h.update(b'{')
+        for key in sorted(value, key=repr):
+            h.update(_to_bytes(repr(key)))
+            h.update(b':')
+            _update_digest(h, dict.__getitem__(value, key))
+        h.update(b'}')
+    elif hasattr(value, 'dtype') and hasattr(value, 'tobytes'):  # NumPy array
+        h.update(_to_bytes('array(%s, %s)' % (value.dtype, value.shape)))
+        h.update(value.tobytes())
+    elif isinstance(value, ParameterReference):
+        h.update(_to_bytes('ref(%r, %r)' % (value.reference_path, value.operations)))
+    elif value is _MISSING:
+        h.update(b'<missing>')
+    else:
+        h.update(_to_bytes(repr(value)))
+
+
+def _is_immutable(value):
+    """
+    Return True if `value` cannot be changed, so that it can be shared:
+    numbers, strings, None, read-only NumPy arrays, and tuples and
+    frozensets of these.
+    """
+    if value is None or isinstance(value, (numbers.Number, basestring, bytes)):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(_is_immutable(item) for item in value)
+    return getattr(getattr(value, 'flags', None), 'writeable', None) is False
+
+
+def _to_bytes(s):
+    return s if isinstance(s, bytes) else s.encode('utf-8')
+
+
+class _Missing(object):
+    """The value of a parameter which does not exist, in a `Change`."""
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __reduce__(self):
+        return 'MISSING'
+
+_MISSING = MISSING = _Missing()
+
+
+Change = namedtuple('Change', 'kind path old new')
+Change.__doc__ = """A change to a parameter, see `ParameterSet.diff()`."""
+
+Conflict = namedtuple('Conflict', 'path ours theirs')
+Conflict.__doc__ = """
+Changes to the same parameter, or to a parameter set and a parameter in it,
+in both branches of `merge3()`: `ours` and `theirs` are lists of `Change`s.
+"""
+
+
+def _equal(x, y):
+    if x is y:
+        return True
+    try:
+        return bool(x == y) or (x != x and y != y)   # NaN
+    except ValueError:  # NumPy arrays
+        import numpy
+        try:
+            return numpy.array_equal(x, y)
+        except Exception:
+            return False
+
+
+def _diff(a, b, prefix, changes):
+    if a is b:
+        return
+    try:
+        if dict.__eq__(a, b):
+            return
+    except ValueError:  # NumPy arrays, which are compared one by one below
+        pass
+    for key in a:
+        path = prefix + key
+        if key not in b:
+            changes.append(Change('removed', path, dict.__getitem__(a, key), MISSING))
+            continue
+        x, y = dict.__getitem__(a, key), dict.__getitem__(b, key)
+        if isinstance(x, ParameterSet) and isinstance(y, ParameterSet):
+            _diff(x, y, path + '.', changes)
+        elif not _equal(x, y):
+            changes.append(Change('changed', path, x, y))
+    for key in b:
+        if key not in a:
+            changes.append(Change('added', prefix + key, MISSING, dict.__getitem__(b, key)))
+
+
+def _fill_flat(node, values, prefix=''):
+    """
+    Fill the `ParameterSet` `node` from the dict `values` of parameters by
+    dotted name, see `ParameterSet.from_flat()`. Each parameter set is put
+    where the first name in it comes in `values`.
+    """
+    groups = {}
+    for name, value in values.items():
+        head, sep, rest = name.partition('.')
+        if sep:
+            group = groups.get(head)
+            if group is None:
+                if dict.__contains__(node, head):
+                    raise ValueError("'%s' is both a parameter and a parameter set"
+                                     % (prefix + head))
+                head = intern(head)
+                subset = ParameterSet({}, label=head)
+                dict.__setitem__(node, head, subset)
+                group = groups[head] = (subset, {})
+            group[1][rest] = value
+        else:
+            if name in groups:
+                raise ValueError("'%s' is both a parameter and a parameter set"
+                                 % (prefix + name))
+            dict.__setitem__(node, intern(name), value)
+    for head, (subset, group) in groups.items():
+        _fill_flat(subset, group, prefix + head + '.')
+    return node
+
+
+def _plan_flat(items, prefix=''):
+    """
+    Group `items`, a list of (dotted name, column) pairs, by the first part
+    of the names, returning a list of (name, column, None) for the
+    parameters at this level and (name, None, plan) for the parameter sets
+    below it, in the order in which their first names come in `items`.
+    """
+    plan = []
+    groups = {}
+    leaves = set()
+    for name, column in items:
+        head, sep, rest = name.partition('.')
+        if head in (leaves if sep else groups):
+            raise ValueError("'%s' is both a parameter and a parameter set" % (prefix + head))
+        if sep:
+            group = groups.get(head)
+            if group is None:
+                group = groups[head] = []
+                plan.append((intern(head), None, group))
+            group.append((rest, column))
+        else:
+            leaves.add(head)
+            plan.append((intern(name), column, None))
+    return [(name, column, None if group is None else _plan_flat(group, prefix + name + '.'))
+            for name, column, group in plan]
+
+
+def _build_flat(node, plan, i):
+    """Fill `node` with the i-th value of each column in `plan`, see `_plan_flat()`."""
+    for name, column, child in plan:
+        if child is None:
+            dict.__setitem__(node, name, column[i])
+        else:
+            subset = ParameterSet({}, label=name)
+            dict.__setitem__(node, name, subset)
+            _build_flat(subset, child, i)
+    return node
+
+
+def _subtree(node, key, new):
+    """
+    Return an empty parameter set to merge the dict `new` into at `key` in
+    `node`: of the type of `new`, with its constraints, if it is a parameter
+    set, and else of the type of `node`.
+    """
+    subtree = type(new if isinstance(new, ParameterSet) else node)({}, label=key)
+    if isinstance(new, ParameterSpace) and new.constraints:
+        subtree.constraints = list(new.constraints)
+    return subtree
+
+
+def _merge(node, other, prefix, resolve):
+    """Merge the nested dict `other` into the `ParameterSet` `node`, see `ParameterSet.merge()`."""
+    for key, new in other.items():
+        if '.' in key:
+            key, rest = key.split('.', 1)
+            new = {rest: new}
+        if not dict.__contains__(node, key):
+            if isinstance(new, dict):
+                new = _merge(_subtree(node, key, new), new, prefix + key + '.', resolve)
+            node[key] = new
+            continue
+        value = dict.__getitem__(node, key)
+        if isinstance(value, ParameterSet) and isinstance(new, dict):
+            _merge(value, new, prefix + key + '.', resolve)
+        elif not _equal(value, new):
+            new = resolve(prefix + key, value, new)
+            if new is not value:
+                if isinstance(new, dict):
+                    new = _merge(_subtree(node, key, new), new, prefix + key + '.', resolve)
+                node[key] = new
+    return node
+
+
+def merge3(base, ours, theirs):
+    """
+    Merge the changes made from the `ParameterSet` `base` in `ours` and in
+    `theirs`, and return a tuple of the merged `ParameterSet` and a list of
+    `Conflict`s, the changes made to the same parameters in both. Where
+    there is a conflict, the merged parameter set has the value in `ours`.
+    The same change made in both is not a conflict.
+    """
+    our_changes = base.diff(ours)
+    their_changes = base.diff(theirs)
+    merged = ours.tree_copy()
+    conflicts = []
+
+    def overlap(path, other):
+        return (path == other or path.startswith(other + '.') or
+                other.startswith(path + '.'))
+
+    for change in their_changes:
+        clashes = [c for c in our_changes if overlap(change.path, c.path)]
+        if not clashes:
+            merged.apply_patch([change], check=False)
+        elif not (len(clashes) == 1 and clashes[0].path == change.path and
+                  _equal(clashes[0].new, change.new)):
+            conflicts.append(Conflict(change.path, clashes, [change]))
+    return merged, conflicts
+
+
 class ParameterSet(dict):
     """
     A class to manage hierarchical parameter sets.
@@ -303,6 +996,11 @@ class ParameterSet(dict):
 
     """
 
+    # `_url` and `label` are stored in slots rather than in an instance
+    # dict, which is only created if other attributes are set, as this
+    # greatly reduces the memory used by trees with many small nodes
+    __slots__ = ('_url', 'label', '__dict__', '__weakref__')
+
     non_parameter_attributes = ['_url', 'label', 'names', 'parameters', 'flat',
                                 'flatten', 'non_parameter_attributes']
     invalid_names = ['parameters', 'names']  # should probably add dir(dict)
@@ -329,11 +1027,19 @@ class ParameterSet(dict):
         global_dict = dict(ref=ParameterReference,
                            url=ParameterSet,
                            ParameterSet=ParameterSet,
+                           ParameterSpace=ParameterSpace,
+                           _SpaceMembership=_SpaceMembership,
                            ParameterRange=ParameterRange,
                            ParameterTable=ParameterTable,
+                           ArrayParameterTable=ArrayParameterTable,
                            GammaDist=GammaDist,
                            UniformDist=UniformDist,
                            NormalDist=NormalDist,
+                           LogNormalDist=LogNormalDist,
+                           TruncatedNormalDist=TruncatedNormalDist,
+                           ChoiceDist=ChoiceDist,
+                           RandIntDist=RandIntDist,
+                           PoissonDist=PoissonDist,
                            pi=math.pi,
                            true=True,    # these are for reading JSON
                            false=False,  # files
@@ -343,14 +1049,15 @@ class ParameterSet(dict):
 
         D = None
         try:
-            if 'file://' in s:
-                path = s.split('file://')[1]
-                ifile = open(path, 'r')
-                content = ifile.read()
-                ifile.close()
-                D = eval(content, global_dict)
-            else:
-                D = eval(s, global_dict)
+            with _instrumentation.timed('parse'):
+                if 'file://' in s:
+                    path = s.split('file://')[1]
+                    ifile = open(path, 'r')
+                    content = ifile.read()
+                    ifile.close()
+                    D = eval(content, global_dict)
+                else:
+                    D = eval(s, global_dict)
         except SyntaxError as e:
             raise SyntaxError(
                 "Invalid string for ParameterSet definition: %s\n%s" % (s, e))
@@ -382,15 +1089,20 @@ class ParameterSet(dict):
 
         self._url = None
         if isinstance(initialiser, basestring):  # url or str
+            start = _instrumentation.clock() if _instrumentation.enabled else None
             if path.exists(initialiser):
                 f = open(initialiser, 'r')
                 pstr = f.read()
                 self._url = initialiser
                 f.close()
+            elif not urlparse(initialiser).scheme:
+                # not a URL, so no need to import urllib to find out
+                pstr = initialiser
             else:
                 try:
-                    f = urlopen(initialiser)
-                    pstr = f.read().decode()
+                    with _instrumentation.timed('fetch'):
+                        f = urlopen(initialiser)
+                        pstr = f.read().decode()
                     self._url = initialiser
                 except IOError as e:
                     pstr = initialiser
@@ -404,10 +1116,15 @@ class ParameterSet(dict):
                 base, ext = path.splitext(o.path)
                 if ext in ['.yaml', '.yml']:
                     import yaml
-                    initialiser = yaml.load(pstr)
+                    with _instrumentation.timed('parse'):
+                        initialiser = yaml.load(pstr)
                 else:
                     initialiser = ParameterSet.read_from_str(pstr,
                                                              update_namespace)
+                if start is not None:
+                    elapsed = _instrumentation.clock() - start
+                    _instrumentation.add_time('load', elapsed)
+                    _instrumentation.add_time('load:' + self._url, elapsed)
             else:
                 initialiser = ParameterSet.read_from_str(pstr,
                                                          update_namespace)
@@ -418,6 +1135,9 @@ class ParameterSet(dict):
         if isinstance(initialiser, dict):
             for k, v in initialiser.items():
                 ParameterSet.check_validity(k)
+                if type(k) is str:
+                    # the same names recur in many nodes of large trees
+                    k = intern(k)
                 if isinstance(v, ParameterSet):
                     self[k] = v
                 elif isinstance(v, dict):
@@ -428,17 +1148,40 @@ class ParameterSet(dict):
             raise TypeError(
                 "`initialiser` must be a `dict`, a `ParameterSet` object, a string, or a valid URL")
 
+        # keep the constraints of a ParameterSpace, including those of one
+        # created by `ParameterSpace({...}).constrain(...)` in a file
+        constraints = initialiser.constraints if isinstance(initialiser, ParameterSpace) else None
+        if constraints and isinstance(self, ParameterSpace):
+            self.constraints = list(constraints)
+
         # Set the label
         if hasattr(initialiser, 'label'):
             self.label = label or initialiser.label  # if initialiser was a ParameterSet, keep the existing label if the label arg is None
         else:
             self.label = label
 
-        # Define some aliases, allowing, e.g.:
-        # for name, value in P.parameters():
-        # for name in P.names():
-        self.names = self.keys
-        self.parameters = self.items
+    @classmethod
+    def aload(cls, url, update_namespace=None):
+        """
+        A coroutine which loads a parameter set from `url`, a URL or a
+        filename, like `ParameterSet(url)`, but without blocking the event
+        loop, and loading the parameter sets included with `url('...')`
+        concurrently::
+
+            >>> ps = await ParameterSet.aload('http://example.com/params')
+
+        Requires Python 3.7 or later.
+        """
+        return _aio().aload(cls, url, update_namespace)
+
+    # Aliases, allowing, e.g.:
+    # for name, value in P.parameters():
+    # for name in P.names():
+    def names(self):
+        return self.keys()
+
+    def parameters(self):
+        return self.items()
 
     def flat(self):
         __doc__ = nesteddictwalk.__doc__
@@ -466,6 +1209,8 @@ class ParameterSet(dict):
     def __getitem__(self, name):
         """ Modified get that detects dots '.' in the names and goes down the
         nested tree to find it"""
+        if _instrumentation.enabled or _tracking:
+            return _recorded_getitem(self, name)
         split = name.split('.', 1)
         if len(split) == 1:
             return dict.__getitem__(self, name)
@@ -519,8 +1264,15 @@ class ParameterSet(dict):
     # hierarchy? I think so.
 
     def __getstate__(self):
-        """For pickling."""
-        return self
+        """For pickling: the parameters are pickled as dict items."""
+        return {'label': getattr(self, 'label', None), '_url': getattr(self, '_url', None)}
+
+    def __setstate__(self, state):
+        # `label` and `_url` are missing from the state of old pickles
+        self.label = None
+        self._url = None
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def save(self, url=None, expand_urls=False):
         """
@@ -575,12 +1327,19 @@ class ParameterSet(dict):
     def tree_copy(self):
         """Return a copy of the `ParameterSet` tree structure.
         Nodes are not copied, but re-referenced."""
-
+        if _instrumentation.enabled:
+            _instrumentation.count('tree_copy')
+        if _tracking:
+            _record_use(self)
+        return self._tree_copy()
+
+    def _tree_copy(self):
+        if _instrumentation.enabled:
+            _instrumentation.count('tree_copy.nodes')
         tmp = ParameterSet({})
-        for key in self:
-            value = self[key]
+        for key, value in dict.items(self):
             if isinstance(value, ParameterSet):
-                tmp[key] = value.tree_copy()
+                tmp[key] = value._tree_copy()
             elif isinstance(value,ParameterReference):                
                 tmp[key] = value.copy()
             else:
@@ -589,14 +1348,59 @@ class ParameterSet(dict):
             tmp = ParameterSpace(tmp)
         return tmp
 
+    @classmethod
+    def from_flat(cls, values):
+        """
+        Return a parameter set built from the dict `values` of parameters
+        by dotted name, the inverse of `flatten()`::
+
+            >>> ParameterSet.from_flat({'cell.tau_m': 10.0, 'cell.cm': 0.25, 'dt': 0.1})
+            {'cell': {'tau_m': 10.0, 'cm': 0.25}, 'dt': 0.1}
+
+        The names are grouped by their first part, level by level, so that
+        each parameter set is created once and filled with `dict.__setitem__`
+        rather than by a lookup from the root for each name. Parameters and
+        parameter sets are in the order in which their first names come in
+        `values`, so `from_flat(P.flatten())` keeps the order of `P`.
+        """
+        return _fill_flat(cls({}), values)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Return a list of parameter sets built from `columns`, a dict of
+        sequences of values by dotted name, all of the same length, or a
+        NumPy structured array with dotted names as field names, e.g. a table
+        of the parameters of many runs. The i-th parameter set has the i-th
+        value of each column. One-dimensional NumPy arrays are converted to
+        lists of Python numbers; the values of columns with more dimensions
+        are arrays.
+        """
+        if getattr(getattr(columns, 'dtype', None), 'names', None):
+            columns = dict((name, columns[name]) for name in columns.dtype.names)
+        names = list(columns)
+        values = []
+        for name in names:
+            column = columns[name]
+            if hasattr(column, 'tolist') and getattr(column, 'ndim', None) == 1:
+                column = column.tolist()
+            values.append(column)
+        n = len(values[0]) if values else 0
+        for name, column in zip(names, values):
+            if len(column) != n:
+                raise ValueError("Column '%s' has %d values, not %d" % (name, len(column), n))
+        plan = _plan_flat(list(zip(names, values)))
+        return [_build_flat(cls({}), plan, i) for i in range(n)]
+
     def as_dict(self):
         """Return a copy of the `ParameterSet` tree structure
         as a nested dictionary"""
 
+        if _tracking:
+            _record_use(self)
         tmp = {}
 
-        for key in self:
-            value = self[key]
+        for key, value in dict.items(self):
             if isinstance(value, ParameterSet):
                 # recurse
                 tmp[key] = value.as_dict()
@@ -606,31 +1410,70 @@ class ParameterSet(dict):
 
     def __sub__(self, other):
         """
-        Return the difference between this `ParameterSet` and another.
-        Not yet properly implemented.
-        """
-        self_keys = set(self)
-        other_keys = set(other)
-        intersection = self_keys.intersection(other_keys)
-        difference1 = self_keys.difference(other_keys)
-        difference2 = other_keys.difference(self_keys)
-        result1 = dict([(key, self[key]) for key in difference1])
-        result2 = dict([(key, other[key]) for key in difference2])
-        # Now need to check values for intersection....
-        for item in intersection:
-            if isinstance(self[item], ParameterSet):
-                d1, d2 = self[item] - other[item]
-                if d1:
-                    result1[item] = d1
-                if d2:
-                    result2[item] = d2
-            elif self[item] != other[item]:
-                result1[item] = self[item]
-                result2[item] = other[item]
-        if len(result1) + len(result2) == 0:
-            assert self == other, "Error in ParameterSet.diff()"
+        Return the difference between this `ParameterSet` and another, as
+        two nested dicts of the parameters whose values differ, with the
+        values in this parameter set and in `other`. See also `diff()`.
+        """
+        result1, result2 = {}, {}
+        for change in self.diff(other):
+            for result, value in ((result1, change.old), (result2, change.new)):
+                if value is not _MISSING:
+                    parts = change.path.split('.')
+                    d = result
+                    for part in parts[:-1]:
+                        d = d.setdefault(part, {})
+                    d[parts[-1]] = value
         return result1, result2
 
+    def diff(self, other):
+        """
+        Return the changes from this parameter set to `other`, as a list of
+        `Change`s sorted by path, each with a `kind` ('added', 'removed' or
+        'changed'), the dotted `path` of the parameter or parameter set, and
+        the `old` and `new` values (`MISSING` for an added or removed
+        parameter)::
+
+            >>> old.diff(new)
+            [Change(kind='changed', path='cell.tau_m', old=10.0, new=15.0),
+             Change(kind='added', path='sim.seed', old=MISSING, new=42)]
+
+        Subtrees that are the same object, or are equal, are not examined
+        further, so most of the time goes into the parts that differ.
+        """
+        changes = []
+        _diff(self, other, '', changes)
+        changes.sort(key=lambda change: change.path)
+        return changes
+
+    def apply_patch(self, changes, check=True):
+        """
+        Apply `changes`, as returned by `diff()`, to this parameter set, so
+        that `old.apply_patch(old.diff(new))` makes `old` equal to `new`.
+        If `check` is True, raises `ValueError`, before changing anything,
+        if the parameter set does not have the `old` values of the changes.
+        Parameter sets in the changes are copied with `tree_copy()`.
+        """
+        if check:
+            for change in changes:
+                try:
+                    value = _lookup(self, change.path)
+                except KeyError:
+                    value = MISSING
+                if not _equal(value, change.old):
+                    raise ValueError("Cannot apply %r: the value of '%s' is %r" %
+                                     (change, change.path, value))
+        for change in changes:
+            parent, sep, name = change.path.rpartition('.')
+            if change.kind == 'removed':
+                node = _lookup(self, parent) if parent else self
+                del node[name]
+            else:
+                value = change.new
+                if isinstance(value, ParameterSet):
+                    value = value.tree_copy()
+                self.flat_add(change.path, value)
+        return self
+
     def _is_space(self):
         """
         Check for the presence of `ParameterRanges` or `ParameterDists` to
@@ -676,86 +1519,1074 @@ class ParameterSet(dict):
         This function replaces the values of each parameter in the args with the
         corresponding values supplied in the arguments.
         """
-        for k in args.keys():
-            self[k] = args[k]
+        self.set_many(args)
 
+    def set_many(self, values):
+        """
+        Set the parameters given by dotted names in the dict `values`, e.g.
+        `P.set_many({'cell.tau_m': 15.0, 'cell.cm': 0.5})`, as
+        `P[name] = value` does for each, but looking up each parameter set
+        on the way only once for all the names that go through it. Names of
+        parameter sets are set before the names of parameters in them.
+        """
+        groups = {}
+        for name, value in values.items():
+            head, sep, rest = name.partition('.')
+            if sep:
+                groups.setdefault(head, {})[rest] = value
+            else:
+                self[name] = value
+        for head, group in groups.items():
+            node = dict.__getitem__(self, head)
+            if isinstance(node, ParameterSet):
+                node.set_many(group)
+            else:
+                for rest, value in group.items():
+                    node[rest] = value
 
-class ParameterSpace(ParameterSet):
-    """
-    A collection of `ParameterSets`, representing multiple points in
-    parameter space. Created by putting `ParameterRange` and/or `ParameterDist`
-    objects within a `ParameterSet`.
-    """
+    def merge(self, other, strategy='override'):
+        """
+        Merge the parameter set or nested dict `other` into this parameter
+        set, walking both trees together: parameter sets at the same path
+        are merged, parameters and parameter sets only in `other` are
+        copied into this one, and, for parameters with different values in
+        both, `strategy` decides:
+
+        'override' - the value in `other` is used (a deep `update()`);
+        'keep'     - the value in this parameter set is kept;
+        'error'    - a `ValueError` is raised;
+        a function - `strategy(path, value, other_value)` returns the value.
+
+        Names in `other` may be dotted. Returns this parameter set.
+        """
+        if strategy == 'override':
+            resolve = lambda path, value, new: new
+        elif strategy == 'keep':
+            resolve = lambda path, value, new: value
+        elif strategy == 'error':
+            def resolve(path, value, new):
+                raise ValueError("Conflicting values for '%s': %r and %r" % (path, value, new))
+        elif callable(strategy):
+            resolve = strategy
+        else:
+            raise ValueError("Unknown merge strategy '%s'" % strategy)
+        _merge(self, other, '', resolve)
+        return self
 
-    def iter_range_key(self, range_key):
-        """ An iterator of the `ParameterSpace` which yields the
-        `ParameterSet` with the `ParameterRange` given by `range_key` replaced with
-        each of its values"""
+    def overlay(self, *overrides):
+        """
+        Return a `ParameterOverlay`, a view of this parameter set with the
+        values in `overrides` in place of its own, without copying it, e.g.
+        instead of `tree_copy()` followed by `replace_values()`::
+
+            >>> job = base.overlay({'cell.tau_m': 15.0, 'sim': {'seed': 2}})
+            >>> job.cell.tau_m, job.cell.cm, job.sim.dt
+            (15.0, 0.25, 0.1)
+
+        Each of `overrides` is a `ParameterSet`, or a dict of values by
+        dotted name, which may be nested, and takes precedence over the
+        parameter set and the overrides before it. A parameter set given in
+        `overrides` is used as it is, not copied, but parameters set in the
+        view are set in a new layer, not in `overrides` or this parameter set.
+        """
+        return ParameterOverlay([self] + list(overrides))
 
-        tmp = self.tree_copy()
-        for val in self[range_key]:
-            tmp[range_key] = val
-            yield tmp
+    def track_access(self):
+        """
+        Return an `AccessRecord`, a context manager which records the names
+        of the parameters read from this parameter set, and from the parameter
+        sets nested in it, within its block::
+
+            >>> with P.track_access() as record:
+            ...     run_model(P)
+            >>> record.paths
+            ['network.inhibitory_cells.tau_m', 'sim.dt']
+        """
+        return AccessRecord(self)
 
-    def iter_inner_range_keys(self, keys, copy=False):
-        """ An iterator of the `ParameterSpace` which yields
-        `ParameterSets` with all combinations of `ParameterRange` elements
-        which are given by the `keys` list.
+    def digest(self, paths=None):
+        """
+        Return a hash, as a hexadecimal string, of the names and values of
+        the parameters `paths` (dotted names, which may be missing), or of
+        all parameters if `paths` is None, e.g. for use as a key in a cache
+        of results. NumPy arrays are hashed by content; other values by their
+        `repr()`.
+        """
+        h = hashlib.sha1()
+        if paths is None:
+            _update_digest(h, self)
+        else:
+            for path in sorted(set(paths)):
+                try:
+                    value = _lookup(self, path)
+                except KeyError:
+                    value = _MISSING
+                h.update(_to_bytes(path))
+                h.update(b'=')
+                _update_digest(h, value)
+                h.update(b';')
+        return h.hexdigest()
+
+    def memory_report(self, depth=1):
+        """
+        Return an estimate of the memory used by the parameter set, in bytes,
+        as a dict with keys:
+
+        'total'      - the whole tree;
+        'nodes'      - the number of `ParameterSets` in the tree (not bytes);
+        'node_bytes' - the `ParameterSets` themselves, without their names
+                       and values;
+        'key_bytes'  - the names;
+        'by_type'    - a dict of the memory used by the values of each type,
+                       other than `ParameterSet`, by type name;
+        'by_subtree' - a dict of the memory used by each parameter and
+                       parameter set down to `depth` levels, by dotted name.
+
+        An object referred to more than once, e.g. a name shared by many
+        nodes, is counted once, where it is first found.
+        """
+        import gc
+        import sys
+        seen = set()
+        slot_bytes = type(self).__basicsize__ - dict.__basicsize__
+        report = {'total': 0, 'nodes': 0, 'node_bytes': 0, 'key_bytes': 0,
+                  'by_type': {}, 'by_subtree': {}}
+
+        def size(obj):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            n = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                n += sum(size(k) + size(v) for k, v in obj.items())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                n += sum(size(x) for x in obj)
+            elif hasattr(obj, 'nbytes') and getattr(obj, 'base', None) is not None:
+                n += size(obj.base)  # a view of a NumPy array
+            elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+                n += size(obj.__dict__)
+            return n
+
+        def node_size(node):
+            seen.add(id(node))
+            n = sys.getsizeof(node) + slot_bytes
+            for name in ('_url', 'label'):
+                n += size(getattr(node, name, None))
+            # reading `__dict__` would create it, so look for it among the
+            # objects the node refers to
+            values = set(id(v) for v in dict.values(node))
+            for obj in gc.get_referents(node):
+                if type(obj) is dict and id(obj) not in values:
+                    n += size(obj)
+            return n
+
+        def walk(node, prefix, level):
+            n = node_size(node)
+            report['nodes'] += 1
+            report['node_bytes'] += n
+            for key, value in dict.items(node):
+                key_size = size(key)
+                report['key_bytes'] += key_size
+                if isinstance(value, ParameterSet):
+                    value_size = 0 if id(value) in seen else walk(value, prefix + key + '.',
+                                                                 level + 1)
+                else:
+                    value_size = size(value)
+                    name = type(value).__name__
+                    report['by_type'][name] = report['by_type'].get(name, 0) + value_size
+                if level < depth:
+                    report['by_subtree'][prefix + key] = key_size + value_size
+                n += key_size + value_size
+            return n
+
+        report['total'] = walk(self, '', 0)
+        return report
+
+    def intern(self, pool):
+        """
+        Replace the subtrees and values of the parameter set that are equal
+        to ones already in `pool`, an `InternPool`, by those, add the others
+        to the pool, and return the parameter set from the pool equal to this
+        one (this one, if there was none), e.g. to store many points of a
+        `ParameterSpace` that differ only in a few values::
+
+            >>> pool = InternPool()
+            >>> points = [P.intern(pool) for P in space.iter_inner(copy=True)]
+
+        The subtrees and values are then shared between parameter sets, so
+        they must not be modified; use `tree_copy()` to get a parameter set
+        that can be.
+        """
+        return pool._intern(self)[0]
 
-        Note: each newly yielded value is one and the same object
-        so storing the returned values results in a collection
-        of many of the lastly yielded object.
+    def share(self, name=None):
+        """
+        Publish a copy of the parameter set in shared memory, returning a
+        `sharedmem.SharedParameterSet`, so that worker processes read one
+        copy of it, and of its NumPy arrays, rather than each having its own,
+        e.g.::
 
-        `copy=True` causes each yielded object to be a newly
-        created object, but be careful because this is
-        spawning many dictionaries!
+            >>> with P.share() as shared:
+            ...     pool.map(run_model, [(shared.view(), seed) for seed in range(64)])
 
+        Workers attach to it with `sharedmem.attach(shared.name)`, or are
+        passed `shared.view()`, which is pickled as the name. Requires
+        Python 3.8 or later.
         """
-        if len(keys) == 0:
-            # return an iterator over 1 copy for modifying
-            yield self.tree_copy()
-            return
+        return _sharedmem().SharedParameterSet(self, name)
 
-        if not copy:
-            # recursively iterate over remaining keys
-            for tmp in self.iter_inner_range_keys(keys[1:]):
-                # iterator over range of our present attention
-                for val in self[keys[0]]:
-                    tmp[keys[0]] = val
-                    if not tmp._is_space():
-                        tmp = ParameterSet(tmp)
-                    yield tmp
-        else:
-            # Each yielded ParameterSet is a tree_copy of self
 
-            # recursively iterate over remaining keys
-            for tmp in self.iter_inner_range_keys(keys[1:]):
-                # iterator over range of our present attention
-                for val in self[keys[0]]:
-                    tmp_copy = tmp.tree_copy()
-                    tmp_copy[keys[0]] = val
-                    if not tmp_copy._is_space():
-                        tmp = ParameterSet(tmp)
-                    yield tmp_copy
+class ParameterOverlay(Mapping):
+    """
+    A read-through view of a stack of parameter sets, created by
+    `ParameterSet.overlay()`, in which a parameter has its value in the
+    topmost layer that has it, and the parameter sets at the same path in
+    the layers are merged, down to the first layer in which the path is a
+    parameter rather than a parameter set. A view is read like a
+    `ParameterSet`, with dotted names or attributes, and `flat()`,
+    `flatten()`, `as_dict()` and `pretty()` give the merged tree, while
+    `collapse()` returns it as a new `ParameterSet`.
+
+    Setting a parameter in the view, or in a parameter set nested in it,
+    sets it in a new top layer of the view, so the layers given to it are
+    not modified. The view reflects later changes to the layers.
+    """
 
-    def range_keys(self):
-        """Return the list of keys for those elements which are `ParameterRanges`."""
-        return [key for key, value in self.flat() if isinstance(value, ParameterRange)]
+    _url = None
+    # a view of a parameter set nested in another view is given by the
+    # latter and its key, so that it sees parameters set in the top layer
+    # after it was created
+    _parent = None
+    _key = None
+    _attributes = ('_layers', '_parent', '_key', 'label')
+
+    def __init__(self, layers):
+        # stored top layer first
+        self._layers = []
+        for layer in reversed(layers):
+            if not isinstance(layer, (ParameterSet, ParameterOverlay)):
+                overrides = layer
+                layer = ParameterSet({})
+                for name, value in overrides.items():
+                    if isinstance(value, dict) and not isinstance(value, ParameterSet):
+                        value = ParameterSet(value)
+                    layer.flat_add(name, value)
+            self._layers.append(layer)
+        if not layers or layers[-1] is self._layers[0]:
+            # the top layer was given by the caller, set parameters in a new one
+            self._layers.insert(0, ParameterSet({}))
+        self.label = getattr(self._layers[-1], 'label', None)
+
+    @property
+    def layers(self):
+        """The parameter sets of the view, top layer first."""
+        if self._parent is None:
+            return self._layers
+        return self._parent._find(self._key)[0] or []
+
+    def _find(self, key):
+        """
+        Return the parameter sets at `key` in the layers, top layer first, and
+        None, or None and the value of `key` if it is not a parameter set.
+        """
+        subtrees = []
+        for layer in self.layers:
+            if key in layer:
+                value = layer[key]
+                if isinstance(value, (ParameterSet, ParameterOverlay)):
+                    subtrees.append(value)
+                elif subtrees:
+                    break
+                else:
+                    return None, value
+        if not subtrees:
+            raise KeyError(key)
+        return subtrees, None
+
+    def _get(self, key):
+        subtrees, value = self._find(key)
+        if subtrees is None:
+            return value
+        view = ParameterOverlay.__new__(ParameterOverlay)
+        view._parent = self
+        view._key = key
+        view.label = getattr(subtrees[-1], 'label', None)
+        return view
 
-    def iter_inner(self, copy=False):
-        """An iterator of the `ParameterSpace` which yields
-        `ParameterSets` with all combinations of `ParameterRange` elements"""
-        return self.iter_inner_range_keys(self.range_keys(), copy)
+    def __getitem__(self, name):
+        parts = name.split('.')
+        node = self
+        for i, part in enumerate(parts):
+            if not isinstance(node, ParameterOverlay):
+                return node['.'.join(parts[i:])]
+            node = node._get(part)
+        return node
 
-    def num_conditions(self):
-        """Return the number of `ParameterSets` that will be returned by the
-        `iter_inner()` method."""
-        # Not properly tested
-        n = 1
-        for key in self.range_keys():
-            n *= len(self[key])
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError("'ParameterOverlay' has no parameter '%s'" % name)
+
+    def __setattr__(self, name, value):
+        """Allow setting parameters using dot notation."""
+        if name in self._attributes:
+            object.__setattr__(self, name, value)
+        else:
+            self[name] = value
+
+    def __setitem__(self, name, value):
+        if self._parent is not None:
+            self._parent[self._key + '.' + name] = value
+        else:
+            self._layers[0].flat_add(name, value)
+
+    def __iter__(self):
+        seen = set()
+        for layer in self.layers:
+            for key in layer:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return len(set().union(*self.layers))
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def overlay(self, *overrides):
+        """Return a view with further `overrides`, see `ParameterSet.overlay()`."""
+        return ParameterOverlay(self.layers[::-1] + list(overrides))
+
+    def flat(self):
+        """Yield (dotted name, value) pairs for the parameters of the merged tree."""
+        for key, value in self.items():
+            if isinstance(value, (dict, ParameterOverlay)):
+                for name, leaf in ParameterOverlay.flat(value):
+                    yield key + '.' + name, leaf
+            else:
+                yield key, value
+
+    def flatten(self):
+        return dict(self.flat())
+
+    def as_dict(self):
+        """Return the merged tree as nested dicts."""
+        return dict((key, value.as_dict() if hasattr(value, 'as_dict') else value)
+                    for key, value in self.items())
+
+    def collapse(self):
+        """
+        Return the merged tree as a new `ParameterSet`. Values are not
+        copied, as for `ParameterSet.tree_copy()`.
+        """
+        ps = ParameterSet({}, label=self.label)
+        for key, value in self.items():
+            if isinstance(value, (ParameterSet, ParameterOverlay)):
+                value = value.collapse() if isinstance(value, ParameterOverlay) else value.tree_copy()
+            dict.__setitem__(ps, key, value)
+        if ps._is_space():
+            ps = ParameterSpace(ps)
+        return ps
+
+    tree_copy = collapse
+
+    def pretty(self, indent='  ', expand_urls=False):
+        return self.collapse().pretty(indent, expand_urls)
+
+    def __repr__(self):
+        return 'ParameterOverlay(%r)' % self.layers[::-1]
+
+
+class InternPool(object):
+    """
+    A pool of `ParameterSets` and parameter values, for sharing equal
+    subtrees and values between parameter sets with `ParameterSet.intern()`.
+    Subtrees and values are identified by a fingerprint of their content,
+    type and label, and are dropped from the pool when no parameter set uses
+    them any more. Only values which cannot be changed, such as numbers,
+    strings and read-only arrays, are shared on their own, and parameter
+    sets containing distributions are not shared, as each distribution has
+    its own random number generator state.
+    """
+
+    def __init__(self):
+        self._nodes = weakref.WeakValueDictionary()   # fingerprint: ParameterSet
+        # fingerprint: (weak reference to a pooled node, name of the value in it)
+        self._values = {}
+
+    def __len__(self):
+        """The number of subtrees in the pool."""
+        return len(self._nodes)
+
+    def _value(self, value):
+        """
+        Return the value in the pool equal to `value`, or `value` itself if
+        there is none or it can be changed, and its fingerprint.
+        """
+        h = hashlib.sha1(_to_bytes(type(value).__name__))
+        _update_digest(h, value)
+        fingerprint = h.digest()
+        if not _is_immutable(value):
+            return value, fingerprint
+        entry = self._values.get(fingerprint)
+        if entry is not None:
+            node = entry[0]()
+            if node is not None:
+                pooled = dict.get(node, entry[1], _MISSING)
+                if pooled is not _MISSING:
+                    return pooled, fingerprint
+        return value, fingerprint
+
+    def _intern(self, node):
+        """
+        Intern the subtrees and values of `node`, and return (node,
+        fingerprint), with a fingerprint of None if `node` cannot be shared.
+        """
+        items = []
+        new_values = []
+        # only plain ParameterSets are shared: other kinds, e.g.
+        # ParameterSpaces, may have attributes not included in the fingerprint
+        shared = type(node) is ParameterSet
+        for key, value in list(dict.items(node)):
+            if isinstance(value, ParameterSet):
+                pooled, fingerprint = self._intern(value)
+                shared = shared and fingerprint is not None
+            elif isinstance(value, ParameterDist):
+                # a distribution holds the state of its random number
+                # generator, so neither it nor its parameter set is shared
+                pooled, fingerprint = value, None
+                shared = False
+            else:
+                pooled, fingerprint = self._value(value)
+                if pooled is value and _is_immutable(value):
+                    new_values.append((fingerprint, key))
+            if pooled is not value:
+                dict.__setitem__(node, key, pooled)
+            items.append((repr(key), fingerprint))
+        if not shared:
+            return node, None
+        h = hashlib.sha1(_to_bytes(repr((getattr(node, 'label', None),
+                                         getattr(node, '_url', None)))))
+        for key, fingerprint in sorted(items):
+            h.update(_to_bytes(key))
+            h.update(fingerprint)
+        fingerprint = h.digest()
+        pooled = self._nodes.get(fingerprint)
+        if pooled is not None:
+            return pooled, fingerprint
+        self._nodes[fingerprint] = node
+        if new_values:
+            values = self._values
+
+            def evict(ref, new_values=new_values):
+                for value_fingerprint, key in new_values:
+                    entry = values.get(value_fingerprint)
+                    if entry is not None and entry[0] is ref:
+                        del values[value_fingerprint]
+
+            ref = weakref.ref(node, evict)
+            for value_fingerprint, key in new_values:
+                values[value_fingerprint] = (ref, key)
+        return node, fingerprint
+
+
+class AccessRecord(object):
+    """
+    The names of the parameters read from a `ParameterSet` with `[]` or `.`
+    within a `with` block, created by `ParameterSet.track_access()`. Only
+    the parameters needed by a model can then be saved, with `used()`, or
+    used as a cache key, with `digest()`, so that changing a parameter the
+    model does not read does not change the key::
+
+        >>> with P.track_access() as record:
+        ...     result = run_model(P)
+        >>> cache[record.digest()] = result
+        >>> # later, for another parameter set
+        >>> result = cache.get(record.digest(Q))
+
+    Names looked up with `get()` or `in` are recorded like those read with
+    `[]`, and a parameter set that is iterated over or otherwise used as a
+    whole, e.g. with `items()`, `len()` or `tree_copy()`, counts as used in
+    full, as does one read by name without reading any of its parameters.
+    Parameters of sub-sets taken from the parameter set before the block,
+    and reads made by other threads, are not recorded.
+    """
+
+    def __init__(self, parameter_set):
+        self.parameter_set = parameter_set
+        self._nodes = {id(parameter_set): (parameter_set, '')}
+        self._read_paths = set()
+        self._whole = set()     # paths of the parameter sets used in full
+        self._missing = set()
+
+    def __enter__(self):
+        _start_tracking(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _stop_tracking(self)
+
+    def _read(self, ps, name, value=None, missing=False):
+        path = self._nodes[id(ps)][1] + name
+        if missing:
+            # special attributes looked up via __getattr__ are not parameters
+            if not name.startswith('__'):
+                self._missing.add(path)
+        else:
+            self._read_paths.add(path)
+            if isinstance(value, ParameterSet):
+                self._nodes[id(value)] = (value, path + '.')
+
+    def _read_all(self, ps):
+        self._whole.add(self._nodes[id(ps)][1].rstrip('.'))
+
+    @property
+    def paths(self):
+        """
+        The sorted dotted names of the parameters read. Parameter sets from
+        which parameters were read by name are not listed themselves, unless
+        they were used in full, in which case the parameters in them are not
+        listed; '' stands for the whole of the recorded parameter set.
+        """
+        if '' in self._whole:
+            return ['']
+        prefixes = set()
+        for path in self._read_paths:
+            parts = path.split('.')
+            for i in range(1, len(parts)):
+                prefixes.add('.'.join(parts[:i]))
+        paths = (self._read_paths - prefixes) | self._whole
+        return sorted(path for path in paths
+                      if not any(path.startswith(whole + '.') for whole in self._whole))
+
+    @property
+    def missing(self):
+        """The sorted dotted names that were looked up but did not exist."""
+        return sorted(self._missing)
+
+    def used(self):
+        """Return a `ParameterSet` of the parameters read, with their current values."""
+        if self.paths == ['']:
+            return self.parameter_set.tree_copy()
+        subset = ParameterSet({})
+        for path in self.paths:
+            value = _lookup(self.parameter_set, path)
+            if isinstance(value, ParameterSet):
+                value = value.tree_copy()
+            subset.flat_add(path, value)
+        return subset
+
+    def digest(self, parameter_set=None):
+        """
+        Return `parameter_set.digest()` (of the recorded parameter set by
+        default) for only the parameters read and the names found missing.
+        """
+        if parameter_set is None:
+            parameter_set = self.parameter_set
+        return parameter_set.digest(self.paths + self.missing)
+
+
+def _dotted_names(expression):
+    """Return the names, such as 'cell.tau_m', used in a Python expression."""
+    tree = ast.parse(expression, mode='eval')
+    inner = set(id(node.value) for node in ast.walk(tree)
+                if isinstance(node, ast.Attribute))
+    names = set()
+    for node in ast.walk(tree):
+        if id(node) in inner or not isinstance(node, (ast.Attribute, ast.Name)):
+            continue
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if isinstance(node, ast.Name):
+            parts.append(node.id)
+            names.add('.'.join(reversed(parts)))
+    return names
+
+
+class _Constraint(object):
+    """A condition on the points of a `ParameterSpace`, see `ParameterSpace.constrain()`."""
+
+    def __init__(self, condition, keys=None):
+        if isinstance(condition, basestring):
+            self._code = compile(condition, '<constraint>', 'eval')
+            if keys is None:
+                keys = _dotted_names(condition)
+        elif callable(condition):
+            self._code = None
+        else:
+            raise TypeError("A constraint must be an expression string or a function")
+        self.condition = condition
+        # None means that the condition may depend on any parameter
+        self.names = None if keys is None else set(keys)
+
+    def depends_on(self, key):
+        if self.names is None:
+            return True
+        return any(key == name or key.startswith(name + '.') or name.startswith(key + '.')
+                   for name in self.names)
+
+    def __call__(self, ps):
+        if self._code is None:
+            return bool(self.condition(ps))
+        return bool(eval(self._code, {'math': math, 'pi': math.pi}, ps))
+
+    def __reduce__(self):
+        keys = None if self.names is None else sorted(self.names)
+        if not isinstance(self.condition, basestring):
+            try:
+                pickle.dumps(self.condition)
+            except Exception as e:
+                raise pickle.PicklingError(
+                    "Cannot pickle the constraint %r of a ParameterSpace (%s): use an "
+                    "expression string or a module-level function" % (self.condition, e))
+        return _Constraint, (self.condition, keys)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return '_Constraint(%r)' % (self.condition,)
+
+
+class _SpaceMembership(object):
+    """
+    The condition that a point is, or if `inside` is False is not, a point
+    of `space`, see `ParameterSpace.difference()`. Unlike a function, it can
+    be pickled and saved.
+    """
+
+    def __init__(self, space, inside=True):
+        if not isinstance(space, ParameterSpace):
+            space = ParameterSpace(space)
+        self.space = space
+        self.inside = inside
+
+    def __call__(self, ps):
+        return self.space.includes(ps) == self.inside
+
+    def pretty(self, indent='  ', expand_urls=False):
+        return '_SpaceMembership(%s, %r)' % (self.space.pretty(indent, expand_urls),
+                                             self.inside)
+
+    def __repr__(self):
+        return '_SpaceMembership(%r, %r)' % (self.space, self.inside)
+
+
+class _Odometer(object):
+    """
+    The combinations of range values of a `ParameterSpace`, enumerated like
+    the readings of an odometer whose wheels ("axes") are either single ranges
+    or groups of linked ranges, with the first axis turning fastest. Each
+    constraint is checked as soon as the axes it depends on have been set, so
+    that whole groups of points can be skipped at once.
+    """
+
+    def __init__(self, space):
+        self.axes = []
+        links = {}
+        for key in space.range_keys():
+            prange = space[key]
+            if prange.link is None:
+                self.axes.append([(key, prange)])
+            elif prange.link in links:
+                links[prange.link].append((key, prange))
+            else:
+                links[prange.link] = [(key, prange)]
+                self.axes.append(links[prange.link])
+        self.sizes = [len(axis[0][1]) for axis in self.axes]
+        for axis, size in zip(self.axes, self.sizes):
+            if any(len(prange) != size for key, prange in axis):
+                raise ValueError("The linked ranges %s must have the same length"
+                                 % ", ".join(key for key, prange in axis))
+        self.linked = bool(links)
+        self.constraints = list(space.constraints)
+        # each constraint is checked at the fastest axis it depends on, or
+        # before any axis is set if it depends on none of them
+        self.checks = [[] for axis in self.axes]
+        self.initial_checks = []
+        for constraint in self.constraints:
+            levels = [level for level, axis in enumerate(self.axes)
+                      if any(constraint.depends_on(key) for key, prange in axis)]
+            if levels:
+                self.checks[min(levels)].append(constraint)
+            else:
+                self.initial_checks.append(constraint)
+
+    def size(self, levels=None):
+        """Return the number of combinations of the first `levels` axes (all by default)."""
+        n = 1
+        for size in self.sizes[:levels]:
+            n *= size
         return n
 
+    def set(self, tmp, level, i):
+        for key, prange in self.axes[level]:
+            tmp[key] = prange.value_at(i)
+
+    def set_index(self, tmp, index):
+        """Set all the axes in `tmp` to the combination at position `index`."""
+        for level, size in enumerate(self.sizes):
+            index, i = divmod(index, size)
+            self.set(tmp, level, i)
+
+    def allowed(self, tmp):
+        return all(constraint(tmp) for constraint in self.constraints)
+
+    def count(self, tmp, level=None):
+        """
+        Return the number of allowed combinations of the axes below `level`,
+        given the values of the other axes in `tmp`, or of all the axes if
+        `level` is None. Groups of axes on which no constraint depends are
+        counted without being enumerated.
+        """
+        if level is None:
+            if not all(constraint(tmp) for constraint in self.initial_checks):
+                return 0
+            level = len(self.axes)
+        if not any(self.checks[:level]):
+            return self.size(level)
+        n = 0
+        for i in range(self.sizes[level - 1]):
+            self.set(tmp, level - 1, i)
+            if all(constraint(tmp) for constraint in self.checks[level - 1]):
+                n += self.count(tmp, level - 1)
+        return n
+
+    def walk(self, tmp, skip=0):
+        """
+        Set the axes in `tmp` to each allowed combination in turn, yielding
+        `tmp` each time, after skipping the first `skip` combinations.
+        """
+        if all(constraint(tmp) for constraint in self.initial_checks):
+            for point in self._walk(tmp, len(self.axes), [skip]):
+                yield point
+
+    def _walk(self, tmp, level, skip):
+        if level == 0:
+            if skip[0]:
+                skip[0] -= 1
+            else:
+                yield tmp
+            return
+        for i in range(self.sizes[level - 1]):
+            self.set(tmp, level - 1, i)
+            if not all(constraint(tmp) for constraint in self.checks[level - 1]):
+                continue
+            if skip[0]:
+                n = self.count(tmp, level - 1)
+                if n <= skip[0]:
+                    skip[0] -= n
+                    continue
+            for point in self._walk(tmp, level - 1, skip):
+                yield point
+
+
+class SweepCursor(object):
+    """
+    The position of an iteration over a `ParameterSpace` by `iter_inner()` or
+    `realize_dists()`, which can be saved to a file and passed back to the
+    same method to resume the iteration where it stopped, e.g.::
+
+        if os.path.exists('sweep.cursor'):
+            cursor = SweepCursor.load('sweep.cursor')
+        else:
+            cursor = SweepCursor(order='random', seed=42)
+        for P in space.iter_inner(cursor=cursor):
+            run_model(P)
+            cursor.save('sweep.cursor')
+
+    `position` is the number of points already yielded, so the cursor should
+    be saved once each point has been dealt with. `order` and `seed` are used
+    by `iter_inner()` in place of its own arguments; if the order is random
+    and no seed is given, one is chosen and stored in the cursor.
+    `rng_states` holds the state of the random number generator of each
+    distribution at `position` in `realize_dists()`, so that the iteration
+    resumes from there without drawing the earlier values again.
+    """
+
+    def __init__(self, position=0, order='sequential', seed=None, rng_states=None):
+        self.position = position
+        self.order = order
+        self.seed = seed
+        self.rng_states = rng_states
+
+    def as_dict(self):
+        return dict(position=self.position, order=self.order, seed=self.seed,
+                    rng_states=self.rng_states)
+
+    def save(self, filename):
+        """
+        Write the cursor to `filename`, in JSON format. The file is replaced
+        in a single step, so an interrupted save leaves the previous cursor.
+        """
+        import json
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(self.as_dict(), f)
+        getattr(os, 'replace', os.rename)(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """Read a cursor written by `save()`."""
+        import json
+        with open(filename) as f:
+            return cls(**json.load(f))
+
+    def __eq__(self, o):
+        return isinstance(o, SweepCursor) and self.as_dict() == o.as_dict()
+
+    def __ne__(self, o):
+        return not self.__eq__(o)
+
+    def __repr__(self):
+        return 'SweepCursor(position=%r, order=%r, seed=%r)' % (self.position, self.order,
+                                                               self.seed)
+
+
+def _advance(points, cursor):
+    """Yield the items of `points`, counting them in `cursor.position`."""
+    for point in points:
+        cursor.position += 1
+        yield point
+
+
+class ParameterSpace(ParameterSet):
+    """
+    A collection of `ParameterSets`, representing multiple points in
+    parameter space. Created by putting `ParameterRange` and/or `ParameterDist`
+    objects within a `ParameterSet`.
+
+    By default, each combination of the values of the ranges is a point of the
+    space. Ranges with the same `link` label vary together instead, and
+    `constrain()` excludes the points which do not satisfy a condition.
+    """
+
+    non_parameter_attributes = ParameterSet.non_parameter_attributes + ['constraints']
+    constraints = ()
+
+    def constrain(self, condition, keys=None):
+        """
+        Exclude the points of the space which do not satisfy `condition`,
+        either a Python expression in terms of the parameter names, e.g.
+        ``"tau_syn < tau_m"`` or ``"syn.tau < cell.tau_m"``, or a function
+        which takes a `ParameterSet` and returns True or False. For a
+        function, `keys` should list the range keys it depends on, otherwise
+        it is only checked once all the ranges have been given values.
+
+        A condition is checked as soon as the ranges it depends on have been
+        given values, and all the points sharing those values are skipped if it
+        is not satisfied. Returns the `ParameterSpace`, so that calls can be
+        chained.
+        """
+        self.constraints = list(self.constraints) + [_Constraint(condition, keys)]
+        return self
+
+    def _tree_copy(self):
+        tmp = ParameterSet._tree_copy(self)
+        if self.constraints and isinstance(tmp, ParameterSpace):
+            tmp.constraints = list(self.constraints)
+        return tmp
+
+    def __getstate__(self):
+        state = ParameterSet.__getstate__(self)
+        if self.constraints:
+            state['constraints'] = list(self.constraints)
+        return state
+
+    def pretty(self, indent='  ', expand_urls=False):
+        """
+        Return a string representing the `ParameterSpace`, which evaluates
+        to a copy of it, with its constraints if they are expressions.
+        Constraints which are functions are shown as comments.
+        """
+        s = ParameterSet.pretty(self, indent, expand_urls)
+        if not self.constraints:
+            return s
+        s = 'ParameterSpace(' + s + ')'
+        for constraint in self.constraints:
+            if isinstance(constraint.condition, basestring):
+                s += '.constrain(%r)' % (constraint.condition,)
+            elif isinstance(constraint.condition, _SpaceMembership):
+                s += '.constrain(%s)' % constraint.condition.pretty(indent, expand_urls)
+            else:
+                s = s[:-1] + '  # constraint not saved: %r\n)' % (constraint.condition,)
+        return s
+
+    def save(self, url=None, expand_urls=False):
+        """
+        Write the space to a text file, see `ParameterSet.save()`. Raises
+        `ValueError` if a constraint is a function, as it cannot be saved.
+        """
+        for constraint in self.constraints:
+            if not isinstance(constraint.condition, (basestring, _SpaceMembership)):
+                raise ValueError("Cannot save the constraint %r: only expression strings "
+                                 "can be saved" % (constraint.condition,))
+        ParameterSet.save(self, url, expand_urls)
+
+    def iter_range_key(self, range_key):
+        """ An iterator of the `ParameterSpace` which yields the
+        `ParameterSet` with the `ParameterRange` given by `range_key` replaced with
+        each of its values"""
+
+        tmp = self.tree_copy()
+        for val in self[range_key]:
+            tmp[range_key] = val
+            yield tmp
+
+    def iter_inner_range_keys(self, keys, copy=False):
+        """ An iterator of the `ParameterSpace` which yields
+        `ParameterSets` with all combinations of `ParameterRange` elements
+        which are given by the `keys` list.
+
+        Note: each newly yielded value is one and the same object
+        so storing the returned values results in a collection
+        of many of the lastly yielded object.
+
+        `copy=True` causes each yielded object to be a newly
+        created object, but be careful because this is
+        spawning many dictionaries!
+
+        """
+        if len(keys) == 0:
+            # return an iterator over 1 copy for modifying
+            yield self.tree_copy()
+            return
+
+        if not copy:
+            # recursively iterate over remaining keys
+            for tmp in self.iter_inner_range_keys(keys[1:]):
+                # iterator over range of our present attention
+                for val in self[keys[0]]:
+                    tmp[keys[0]] = val
+                    if not tmp._is_space():
+                        tmp = ParameterSet(tmp)
+                    yield tmp
+        else:
+            # Each yielded ParameterSet is a tree_copy of self
+
+            # recursively iterate over remaining keys
+            for tmp in self.iter_inner_range_keys(keys[1:]):
+                # iterator over range of our present attention
+                for val in self[keys[0]]:
+                    tmp_copy = tmp.tree_copy()
+                    tmp_copy[keys[0]] = val
+                    if not tmp_copy._is_space():
+                        tmp = ParameterSet(tmp)
+                    yield tmp_copy
+
+    def range_keys(self):
+        """Return the list of keys for those elements which are `ParameterRanges`."""
+        return [key for key, value in self.flat() if isinstance(value, ParameterRange)]
+
+    def iter_inner(self, copy=False, order='sequential', seed=None, start=0,
+                   cursor=None):
+        """An iterator of the `ParameterSpace` which yields
+        `ParameterSets` with all combinations of `ParameterRange` elements.
+
+        With `order='random'`, every combination is still visited exactly
+        once, but in a pseudo-random order determined by `seed`, so that any
+        first part of the sweep is spread over the whole space. The order is
+        computed point by point, without building a list of the combinations.
+
+        The first `start` points are skipped without being computed, so an
+        interrupted sweep can be resumed by passing the number of points
+        already done (and the same `seed`). In a space with constraints, the
+        skipped points of a random order must still be checked.
+
+        If a `SweepCursor` is given, its order, seed and position are used
+        instead, and its position is advanced as points are yielded."""
+        if cursor is not None:
+            if cursor.order == 'random' and cursor.seed is None:
+                cursor.seed = random.getrandbits(32)
+            order, seed, start = cursor.order, cursor.seed, cursor.position
+        if order not in ('sequential', 'random'):
+            raise ValueError("Unknown order '%s', use 'sequential' or 'random'" % order)
+        odometer = _Odometer(self)
+        if order == 'random':
+            points = self._iter_random(odometer, seed, start, copy)
+        elif start == 0 and not (odometer.linked or odometer.constraints):
+            points = self.iter_inner_range_keys(self.range_keys(), copy)
+        else:
+            points = self._iter_odometer(odometer, start, copy)
+        if cursor is not None:
+            points = _advance(points, cursor)
+        return points
+
+    def aiter_inner(self, batch=100, **kwargs):
+        """
+        An asynchronous iterator over the points yielded by `iter_inner()`,
+        to which the other arguments are passed, which lets other tasks of the
+        event loop run after each `batch` points::
+
+            >>> async for P in space.aiter_inner(copy=True):
+            ...     await client.submit(P)
+
+        Requires Python 3.7 or later.
+        """
+        return _aio().aiter_inner(self, batch, **kwargs)
+
+    def _work_copy(self):
+        """
+        Return a copy of the tree in which to set range values, of the type of
+        the points yielded by `iter_inner()`.
+        """
+        tmp = self.tree_copy()
+        if not any(isinstance(value, ParameterDist) for key, value in self.flat()):
+            tmp = ParameterSet(tmp)
+        return tmp
+
+    def _iter_odometer(self, odometer, start, copy):
+        for tmp in odometer.walk(self._work_copy(), start):
+            yield tmp.tree_copy() if copy else tmp
+
+    def _iter_random(self, odometer, seed, start, copy):
+        n = odometer.size()
+        permutation = IndexPermutation(n, seed)
+        skip = start if odometer.constraints else 0
+        tmp = self._work_copy()
+        for position in range(start - skip, n):
+            odometer.set_index(tmp, permutation[position])
+            if odometer.constraints and not odometer.allowed(tmp):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            yield tmp.tree_copy() if copy else tmp
+
+    def point(self, index):
+        """
+        Return, as a new object, the `ParameterSet` at position `index` in the
+        sequence yielded by `iter_inner()`, in which the first range key
+        varies fastest.
+        """
+        if index >= 0:
+            for tmp in self._iter_odometer(_Odometer(self), index, False):
+                return tmp
+        raise IndexError("index %d out of range for a space of %d points"
+                         % (index, self.num_conditions()))
+
+    def num_conditions(self):
+        """Return the number of `ParameterSets` that will be returned by the
+        `iter_inner()` method. In a space with constraints, only the
+        combinations of the ranges on which constraints depend are checked."""
+        odometer = _Odometer(self)
+        if not odometer.constraints:
+            return odometer.size()
+        return odometer.count(self._work_copy())
+
     def dist_keys(self):
         """Return the list of keys for those elements which are `ParameterDists`."""
         def is_or_contains_dist(value):
@@ -763,45 +2594,157 @@ class ParameterSpace(ParameterSet):
                 isiterable(value) and contains_instance(value, ParameterDist))
         return [key for key, value in self.flat() if is_or_contains_dist(value)]
 
-    def realize_dists(self, n=1, copy=False):
+    def _dists(self):
+        """Return a list of (label, dist) pairs, for the dists alone or in lists."""
+        dists = []
+        for key in self.dist_keys():
+            value = _lookup(self, key)
+            if isinstance(value, ParameterDist):
+                dists.append((key, value))
+            else:
+                dists.extend(('%s[%d]' % (key, j), item) for j, item in enumerate(value)
+                             if isinstance(item, ParameterDist))
+        return dists
+
+    def realize_dists(self, n=1, copy=False, cursor=None):
         """For each `ParameterDist`, realize the distribution and yield the result.
 
         If `copy==True`, causes each yielded object to be a newly
         created object, but be careful because this is
-        spawning many dictionaries!"""
+        spawning many dictionaries!
+
+        If a `SweepCursor` is given, the samples are drawn one point at a
+        time, and the states of the random number generators after each
+        point are stored in the cursor with its position; when it is passed
+        again, they are restored and only the remaining points are drawn,
+        yielding the same values as an uninterrupted iteration. Buffered
+        samples are discarded and not used."""
         def next(item, n):
             if isinstance(item, ParameterDist):
                 return item.next(n)
             else:
                 return [item]*n
+        if cursor is not None:
+            return self._resumable_dists(n, copy, cursor)
         # pre-generate random numbers
         rngs = {}
+        iterable = {}
         for key in self.dist_keys():
-            if isiterable(self[key]):
-                rngs[key] = [next(item, n) for item in self[key]]
+            value = _lookup(self, key)
+            iterable[key] = isiterable(value)
+            if iterable[key]:
+                rngs[key] = [next(item, n) for item in value]
             else:
-                rngs[key] = self[key].next(n)
+                rngs[key] = value.next(n)
+        return self._realized(n, copy, rngs, iterable)
+
+    def _realized(self, n, copy, rngs, iterable):
         # get a copy to fill in the rngs
-        if copy:
-            tmp = self.tree_copy()
-            for i in range(n):
-                for key in rngs:
-                    if isiterable(self[key]):
-                        tmp[key] = [rngs[key][j][i]
-                                    for j in range(len(rngs[key]))]
-                    else:
-                        tmp[key] = rngs[key][i]
-                yield tmp.tree_copy()
-        else:
-            tmp = self.tree_copy()
-            for i in range(n):
-                for key in rngs:
-                    if isiterable(self[key]):
-                        tmp[key] = [rngs[key][j][i]
-                                    for j in range(len(rngs[key]))]
+        tmp = self.tree_copy()
+        for i in range(n):
+            for key in rngs:
+                if iterable[key]:
+                    tmp[key] = [rngs[key][j][i]
+                                for j in range(len(rngs[key]))]
+                else:
+                    tmp[key] = rngs[key][i]
+            yield tmp.tree_copy() if copy else tmp
+
+    def _resumable_dists(self, n, copy, cursor):
+        """`realize_dists()` with a `SweepCursor`."""
+        dists = self._dists()
+        for label, dist in dists:
+            dist.clear_buffer()
+        if cursor.rng_states is not None:
+            for label, dist in dists:
+                dist.set_rng_state(cursor.rng_states[label])
+        values = []     # (key, value or list of values and dists)
+        for key in self.dist_keys():
+            values.append((key, _lookup(self, key)))
+        tmp = self.tree_copy()
+        for i in range(cursor.position, n):
+            for key, value in values:
+                # drawn without the buffer, so that the generator states
+                # are those after this point
+                if isinstance(value, ParameterDist):
+                    tmp[key] = value._draw(1)[0]
+                else:
+                    tmp[key] = [item._draw(1)[0] if isinstance(item, ParameterDist) else item
+                                for item in value]
+            cursor.position = i + 1
+            cursor.rng_states = dict((label, dist.rng_state()) for label, dist in dists)
+            yield tmp.tree_copy() if copy else tmp
+
+    def arealize_dists(self, n=1, batch=100, **kwargs):
+        """
+        An asynchronous iterator over the points yielded by `realize_dists()`,
+        which lets other tasks of the event loop run after each `batch`
+        points. Requires Python 3.7 or later.
+        """
+        return _aio().arealize_dists(self, n, batch, **kwargs)
+
+    def sample(self, n, method='lhs', seed=None, ranges=False, block_size=1024,
+               copy=False):
+        """
+        Yield `n` `ParameterSets` covering the space of the `ParameterDists`
+        jointly, rather than with independent draws as in `realize_dists()`.
+
+        Points of the unit hypercube, with one dimension per distribution, are
+        generated by `method`: 'lhs' (a Latin hypercube), 'sobol' or 'halton'
+        (low-discrepancy sequences), and mapped through the inverse cumulative
+        distribution function (`ppf()`) of each distribution. Points are
+        generated and mapped in blocks of `block_size`.
+
+        If `ranges` is True, each `ParameterRange` is treated as a further,
+        discrete, dimension; otherwise the ranges are left in place.
+
+        `seed` makes 'lhs' reproducible, and randomizes the 'sobol' and
+        'halton' sequences (which are deterministic if `seed` is None).
+
+        As for `realize_dists()`, `copy=True` causes each yielded object to be
+        a newly created object.
+        """
+        import numpy
+        from .sampling import unit_samples
+        rng = None if seed is None else numpy.random.default_rng(seed)
+        # each axis is (key, position in list or None, dist or range)
+        axes = []
+        for key in self.dist_keys():
+            value = _lookup(self, key)
+            if isinstance(value, ParameterDist):
+                axes.append((key, None, value))
+            else:
+                axes.extend((key, i, item) for i, item in enumerate(value)
+                            if isinstance(item, ParameterDist))
+        if ranges:
+            axes.extend((key, None, _lookup(self, key)) for key in self.range_keys())
+        if not axes:
+            raise ValueError("The ParameterSpace has nothing to sample")
+        tmp = self.tree_copy()
+        if ranges or not self.range_keys():
+            tmp = ParameterSet(tmp)
+        for u in unit_samples(method, n, len(axes), block_size, rng):
+            columns = []
+            for j, (key, position, item) in enumerate(axes):
+                if isinstance(item, ParameterRange):
+                    values = item._values
+                    index = numpy.minimum((u[:, j]*len(values)).astype(int),
+                                          len(values) - 1)
+                    columns.append([values[i] for i in index])
+                else:
+                    columns.append(item.ppf(u[:, j]).tolist())
+            for i in range(len(u)):
+                for (key, position, item), column in zip(axes, columns):
+                    if position is None:
+                        tmp[key] = column[i]
                     else:
-                        tmp[key] = rngs[key][i]
-                yield tmp
+                        value = list(tmp[key])
+                        value[position] = column[i]
+                        tmp[key] = value
+                if copy:
+                    yield tmp.tree_copy()
+                else:
+                    yield tmp
 
     def parameter_space_dimension_labels(self):
         """
@@ -815,7 +2758,7 @@ class ParameterSpace(ParameterSet):
         label = []
         for key in range_keys:
             label.append(key)
-            dim.append(len(eval('self.'+key)))
+            dim.append(len(_lookup(self, key)))
 
         return dim, label
 
@@ -843,9 +2786,9 @@ class ParameterSpace(ParameterSet):
         range_keys = self.range_keys()
         range_keys.sort()
         for key in range_keys:
-            value = eval('current_experiment.'+key)
+            value = current_experiment[key]
             try:
-                value_index = list(eval('self.'+key)._values).index(value)
+                value_index = _lookup(self, key).index(value)
             except ValueError:
                 raise ValueError(
                     "The ParameterSet provided is not within the ParameterSpace")
@@ -870,22 +2813,233 @@ class ParameterSpace(ParameterSet):
         range_keys = self.range_keys()
         range_keys.sort()
         for key in range_keys:
-            data[key] = eval('self.'+key)._values
+            data[key] = _lookup(self, key)._values
         return data
 
+    def _factors(self):
+        """
+        Return a dict mapping each sorted tuple of keys which vary together (a
+        single parameter, or a group of linked ranges) to the list of their
+        `ParameterRanges` or fixed values.
+        """
+        factors = {}
+        for key, value in self.flat():
+            if not isinstance(value, ParameterRange):
+                factors[(key,)] = [value]
+        for axis in _Odometer(self).axes:
+            axis = sorted(axis, key=lambda item: item[0])
+            factors[tuple(key for key, prange in axis)] = [prange for key, prange in axis]
+        return factors
+
+    def _subspace(self, factors, selected):
+        """
+        Return a copy of the space in which the parameters of each factor in
+        `selected` take only the given rows of values.
+        """
+        tmp = self.tree_copy()
+        for keys, rows in selected.items():
+            for j, key in enumerate(keys):
+                values = [row[j] for row in rows]
+                if len(rows) == 1:
+                    tmp[key] = values[0]
+                else:
+                    prange = factors[keys][j]
+                    tmp[key] = ParameterRange(values, prange.units, prange.name,
+                                              link=prange.link)
+        if not isinstance(tmp, ParameterSpace):
+            tmp = ParameterSpace(tmp)
+        return tmp
+
+    def includes(self, point):
+        """Return True if the `ParameterSet` `point` is one of the points of the space."""
+        values = dict(ParameterSet(point).flat())
+        factors = self._factors()
+        if set(values) != set(key for keys in factors for key in keys):
+            return False
+        for keys, items in factors.items():
+            if not _has_row(items, tuple(values[key] for key in keys)):
+                return False
+        return all(constraint(point) for constraint in self.constraints)
+
+    def _split(self, other):
+        """
+        Return the sub-space of the points shared with `other` (or None if
+        there are none) and a list of disjoint sub-spaces of the points which
+        are not in `other`, or None if this cannot be done analytically.
+        """
+        A = self._factors()
+        B = other._factors()
+        if set(key for keys in A for key in keys) != set(key for keys in B for key in keys):
+            return None, [self._subspace(A, {})]
+        if set(A) != set(B) or other.constraints:
+            return None
+        common = {}
+        new = {}
+        unchanged = set()
+        for keys in A:
+            if _same_factor(A[keys], B[keys]):
+                # compared in constant time for lazy ranges, which are not enumerated
+                common[keys] = A[keys]
+                new[keys] = []
+                unchanged.add(keys)
+                continue
+            common[keys] = []
+            new[keys] = []
+            in_other = _row_lookup(B[keys])
+            for row in _rows(A[keys]):
+                if in_other(row):
+                    common[keys].append(row)
+                else:
+                    new[keys].append(row)
+        # unchanged factors are left as they are, which keeps lazy ranges lazy
+        unchanged.update(keys for keys in A if not new[keys])
+        # A - B is the union over factors j of the points whose factors before
+        # j are in B, whose factor j is not, and whose later factors are anything
+        differences = []
+        order = sorted(A)
+        for j, keys in enumerate(order):
+            if new[keys]:
+                selected = dict((k, common[k]) for k in order[:j] if k not in unchanged)
+                selected[keys] = new[keys]
+                differences.append(self._subspace(A, selected))
+            if not common[keys] or isinstance(common[keys][0], ParameterRange) \
+                    and not len(common[keys][0]):
+                return None, differences
+        selected = dict((k, common[k]) for k in order if k not in unchanged)
+        return self._subspace(A, selected), differences
+
+    def difference(self, other):
+        """
+        Return the points of this space which are not points of `other` (a
+        `ParameterSpace` or `ParameterSet`), as a `ParameterSpaceUnion` of
+        disjoint spaces. The spaces are worked out from the values of each
+        parameter, without enumerating the points of either space. For
+        example, if `other` is this space with two values removed from one
+        range, the difference is a single space in which that parameter only
+        takes the two values.
+
+        If the spaces do not have the same linked ranges, or `other` has
+        constraints, the difference is instead a copy of this space with the
+        constraint that points are not in `other`, which can be pickled and
+        saved.
+        """
+        if not isinstance(other, ParameterSpace):
+            other = ParameterSpace(other)
+        split = self._split(other)
+        if split is None:
+            space = self._subspace(self._factors(), {})
+            return ParameterSpaceUnion([space.constrain(_SpaceMembership(other, False))])
+        return ParameterSpaceUnion(split[1])
+
+    def intersection(self, other):
+        """
+        Return the points of this space which are also points of `other`, as
+        a `ParameterSpaceUnion` of at most one space. See `difference()`.
+        """
+        if not isinstance(other, ParameterSpace):
+            other = ParameterSpace(other)
+        split = self._split(other)
+        if split is None:
+            space = self._subspace(self._factors(), {})
+            return ParameterSpaceUnion([space.constrain(_SpaceMembership(other))])
+        return ParameterSpaceUnion([split[0]] if split[0] is not None else [])
+
+
+def _rows(items):
+    """Yield the tuples of values taken together by `items`, see `ParameterSpace._factors()`."""
+    if isinstance(items[0], ParameterRange):
+        for i in range(len(items[0])):
+            yield tuple(prange.value_at(i) for prange in items)
+    else:
+        yield tuple(items)
+
+
+def _same_factor(items, other):
+    """
+    Return True if the factors `items` and `other` take the same tuples of
+    values, in the same order, see `ParameterSpace._factors()`; in constant
+    time for lazy ranges.
+    """
+    if len(items) != len(other):
+        return False
+    for a, b in zip(items, other):
+        if isinstance(a, ParameterRange) != isinstance(b, ParameterRange):
+            return False
+        if isinstance(a, ParameterRange):
+            a, b = a._values, b._values
+        if not _equal(a, b):
+            return False
+    return True
+
+
+def _row_lookup(items):
+    """Return a function telling whether a tuple is one of `_rows(items)`."""
+    if isinstance(items[0], ParameterRange) and len(items) > 1:
+        try:
+            return set(_rows(items)).__contains__
+        except TypeError:   # unhashable values
+            pass
+    return lambda row: _has_row(items, row)
+
+
+def _has_row(items, row):
+    """Return True if `row` is one of the tuples of values yielded by `_rows(items)`."""
+    if not isinstance(items[0], ParameterRange):
+        return tuple(items) == row
+    if len(items) == 1:
+        try:
+            items[0].index(row[0])
+        except ValueError:
+            return False
+        return True
+    return any(all(prange.value_at(i) == value for prange, value in zip(items, row))
+               for i in range(len(items[0])))
+
+
+class ParameterSpaceUnion(object):
+    """
+    A union of disjoint `ParameterSpaces`, as returned by
+    `ParameterSpace.difference()` and `ParameterSpace.intersection()`, which
+    can be iterated over like a single space.
+    """
+
+    def __init__(self, spaces):
+        self.spaces = list(spaces)
+
+    def __len__(self):
+        return len(self.spaces)
+
+    def __iter__(self):
+        return iter(self.spaces)
+
+    def __getitem__(self, i):
+        return self.spaces[i]
+
+    def iter_inner(self, copy=False):
+        """Yield the points of each space in turn, see `ParameterSpace.iter_inner()`."""
+        for space in self.spaces:
+            for point in space.iter_inner(copy):
+                yield point
+
+    def num_conditions(self):
+        """Return the total number of points in the spaces."""
+        return sum(space.num_conditions() for space in self.spaces)
+
+    def includes(self, point):
+        """Return True if the `ParameterSet` `point` is in one of the spaces."""
+        return any(space.includes(point) for space in self.spaces)
+
+    def __repr__(self):
+        return 'ParameterSpaceUnion(%r)' % (self.spaces,)
+
 
 def string_table(tablestring):
-    """Convert a table written as a multi-line string into a dict of dicts."""
-    tabledict = {}
-    rows = tablestring.strip().split('\n')
-    column_headers = rows[0].split()
-    for row in rows[1:]:
-        row = row.split()
-        row_header = row[0]
-        tabledict[row_header] = {}
-        for col_header, item in zip(column_headers[1:], row[1:]):
-            tabledict[row_header][col_header] = float(item)
-    return tabledict
+    """
+    Convert a table written as a multi-line string into a dict of dicts of
+    floats. The string is read as by `ParameterTable.load()`.
+    """
+    from io import StringIO
+    return _table_dict(*_read_table(StringIO(u"%s" % tablestring), float))
 
 
 class ParameterTable(ParameterSet):
@@ -932,6 +3086,34 @@ class ParameterTable(ParameterSet):
         self.row_labels = self.keys
         # self.row_labels.__doc__ = "Return a list of row labels."
 
+    @classmethod
+    def load(cls, source, dtypes=None, delimiter=None, chunk_size=10000, label=None):
+        """
+        Read a table from a file name or file-like object, in chunks of
+        `chunk_size` rows, with the same layout as a table string: a header
+        line (by default starting with '#') giving the column labels, then one
+        line per row, starting with the row label. Other lines starting with
+        '#' are ignored. Use `delimiter=','` to read CSV files.
+
+        `dtypes` may be int, float or str, to be used for all columns, or a
+        dict mapping column labels to types. Otherwise the type of each column
+        is the narrowest of int, float and str which can hold its values.
+        A table string given to the constructor is read in the same way, with
+        float values.
+        """
+        row_labels, column_labels, array = _load_table(source, dtypes, delimiter,
+                                                       chunk_size)
+        # fill the rows directly rather than through `ParameterSet.__init__()`
+        for name in row_labels + column_labels:
+            ParameterSet.check_validity(name)
+        column_labels = [intern(name) for name in column_labels]
+        table = cls({}, label)
+        for row_label, values in zip(row_labels, array.tolist()):
+            row = ParameterSet({}, row_label)
+            dict.update(row, zip(column_labels, values))
+            dict.__setitem__(table, row_label, row)
+        return table
+
     def _check_is_table(self):
         """
         Checks that the contents actually define a table, i.e.
@@ -984,3 +3166,456 @@ class ParameterTable(ParameterSet):
                 row_label + "\t" + "\t".join(["%s" % row[col]
                                               for col in column_labels]))
         return "\n".join(lines)
+
+
+class TableSlice(object):
+    """
+    A labelled, one-dimensional view of a row or column of an
+    `ArrayParameterTable`.
+
+    It behaves like a read/write mapping from labels to values, but shares its
+    data with the table: no values are copied, and assigning to an element
+    modifies the table. The underlying NumPy view is available as `array`.
+    """
+
+    def __init__(self, array, labels, index):
+        object.__setattr__(self, 'array', array)
+        object.__setattr__(self, '_labels', labels)
+        object.__setattr__(self, '_index', index)
+
+    def __getitem__(self, label):
+        try:
+            return self.array[self._index[label]]
+        except KeyError:
+            raise KeyError(label)
+
+    def __setitem__(self, label, value):
+        self.array[self._index[label]] = value
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __iter__(self):
+        return iter(self._labels)
+
+    def __contains__(self, label):
+        return label in self._index
+
+    def keys(self):
+        return list(self._labels)
+
+    def values(self):
+        return list(self.array)
+
+    def items(self):
+        return list(zip(self._labels, self.array))
+
+    def as_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, o):
+        if isinstance(o, TableSlice):
+            o = o.as_dict()
+        return self.as_dict() == o
+
+    def __ne__(self, o):
+        return not self.__eq__(o)
+
+    def __repr__(self):
+        return repr(self.as_dict())
+
+
+class ArrayParameterTable(object):
+    """
+    A variant of `ParameterTable` whose values are stored in a single 2D NumPy
+    array, with dicts mapping row and column labels to array indices.
+
+    Rows and columns are returned as `TableSlice` views of the array, so
+    accessing a column costs the same as accessing a row and copies nothing,
+    and `transpose()` returns a view of the same data. It can be initialised
+    from a table string, a `ParameterTable` or dict of dicts, or from a 2D
+    array together with the row and column labels::
+
+        >>> pt = ArrayParameterTable('''
+        ...     #       col1    col2    col3
+        ...     row1     1       2       3
+        ...     row2     4       5       6
+        ... ''')
+        >>> pt.row2.col3
+        6.0
+        >>> pt.column('col1')
+        {'row1': 1.0, 'row2': 4.0}
+        >>> weights = ArrayParameterTable(numpy.zeros((5000, 200)),
+        ...                               row_labels=pre, column_labels=post)
+
+    The table can be placed inside a `ParameterSet`, and is then saved as a
+    table string.
+    """
+
+    def __init__(self, initialiser, row_labels=None, column_labels=None,
+                 dtype=float, label=None):
+        import numpy
+        if isinstance(initialiser, basestring):
+            from io import StringIO
+            row_labels, column_labels, data = _read_table(StringIO(u"%s" % initialiser),
+                                                          dtype)
+        elif isinstance(initialiser, ArrayParameterTable):
+            row_labels = row_labels or initialiser.row_labels()
+            column_labels = column_labels or initialiser.column_labels()
+            data = initialiser.array
+        elif isinstance(initialiser, dict):
+            if row_labels is None:
+                row_labels = list(initialiser.keys())
+            if column_labels is None:
+                column_labels = row_labels and list(initialiser[row_labels[0]].keys()) or []
+            data = [[initialiser[r][c] for c in column_labels] for r in row_labels]
+        else:
+            data = initialiser
+            if row_labels is None or column_labels is None:
+                raise TypeError("`row_labels` and `column_labels` must be given "
+                                "when initialising from an array")
+        self.array = numpy.asarray(data, dtype=dtype).reshape(
+            (len(row_labels), len(column_labels)))
+        self._row_labels = list(row_labels)
+        self._column_labels = list(column_labels)
+        self._row_index = dict((l, i) for i, l in enumerate(self._row_labels))
+        self._column_index = dict((l, i) for i, l in enumerate(self._column_labels))
+        if len(self._row_index) != len(self._row_labels) or \
+           len(self._column_index) != len(self._column_labels):
+            raise ValueError("Row and column labels must be unique")
+        self.label = label
+
+    @classmethod
+    def load(cls, source, dtypes=None, delimiter=None, chunk_size=10000, label=None):
+        """
+        Read a table from a file name or file-like object, in chunks of
+        `chunk_size` rows, with the same layout as a table string: a header
+        line (by default starting with '#') giving the column labels, then one
+        line per row, starting with the row label. Other lines starting with
+        '#' are ignored. Use `delimiter=','` to read CSV files.
+
+        `dtypes` may be int, float or str, to be used for all columns, or a
+        dict mapping column labels to types. Otherwise the type of each column
+        is the narrowest of int, float and str which can hold its values::
+
+            >>> weights = ArrayParameterTable.load('weights.txt', dtypes=float)
+            >>> cells = ArrayParameterTable.load('cells.csv', delimiter=',',
+            ...                                  dtypes={'model': str})
+        """
+        row_labels, column_labels, array = _load_table(source, dtypes, delimiter,
+                                                       chunk_size)
+        return cls(array, row_labels, column_labels, array.dtype, label)
+
+    @classmethod
+    def _view(cls, array, row_labels, row_index, column_labels, column_index):
+        """Create a table sharing `array` and the label indexes, without copying."""
+        table = cls.__new__(cls)
+        table.array = array
+        table._row_labels = row_labels
+        table._row_index = row_index
+        table._column_labels = column_labels
+        table._column_index = column_index
+        table.label = None
+        return table
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    def row(self, row_label):
+        """Return a `TableSlice` view of the requested row."""
+        return TableSlice(self.array[self._row_index[row_label]],
+                          self._column_labels, self._column_index)
+
+    def column(self, column_label):
+        """Return a `TableSlice` view of the requested column."""
+        return TableSlice(self.array[:, self._column_index[column_label]],
+                          self._row_labels, self._row_index)
+
+    def rows(self):
+        """Return a list of `(row_label, row)` pairs, as 2-tuples."""
+        return [(row_label, self.row(row_label)) for row_label in self._row_labels]
+
+    def columns(self):
+        """Return a list of `(column_label, column)` pairs, as 2-tuples."""
+        return [(column_label, self.column(column_label))
+                for column_label in self._column_labels]
+
+    def row_labels(self):
+        """Return a list of row labels."""
+        return list(self._row_labels)
+
+    def column_labels(self):
+        """Return a list of column labels."""
+        return list(self._column_labels)
+
+    def transpose(self):
+        """
+        Return a view of the table with rows and columns swapped. The data are
+        not copied.
+        """
+        return self._view(self.array.T, self._column_labels, self._column_index,
+                          self._row_labels, self._row_index)
+
+    def __getitem__(self, name):
+        split = name.split('.', 1)
+        try:
+            row = self.row(split[0])
+        except KeyError:
+            raise KeyError(name)
+        if len(split) == 1:
+            return row
+        return row[split[1]]
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name in ('array', 'label'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __len__(self):
+        return len(self._row_labels)
+
+    def __iter__(self):
+        return iter(self._row_labels)
+
+    def __contains__(self, row_label):
+        return row_label in self._row_index
+
+    keys = row_labels
+
+    def as_dict(self):
+        """Return a copy of the table as a dict of dicts."""
+        return dict((row_label, row.as_dict()) for row_label, row in self.rows())
+
+    def tree_copy(self):
+        """Return a copy of the table, with its own copy of the data."""
+        return ArrayParameterTable(self.array.copy(), self._row_labels,
+                                   self._column_labels, self.array.dtype, self.label)
+
+    def __eq__(self, o):
+        if isinstance(o, ArrayParameterTable):
+            return (self._row_labels == o._row_labels and
+                    self._column_labels == o._column_labels and
+                    self.array.shape == o.array.shape and
+                    bool((self.array == o.array).all()))
+        if isinstance(o, dict):
+            return self.as_dict() == o
+        return False
+
+    def __ne__(self, o):
+        return not self.__eq__(o)
+
+    def table_string(self):
+        """
+        Returns the table as a string, suitable for being used as the
+        initialiser for a new `ParameterTable` or `ArrayParameterTable`.
+        """
+        lines = ["#\t " + "\t".join(self._column_labels)]
+        for row_label, values in zip(self._row_labels, self.array.tolist()):
+            lines.append(row_label + "\t" + "\t".join(["%s" % v for v in values]))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return 'ArrayParameterTable(%r)' % self.table_string()
+
+
+def _table_lines(f, delimiter):
+    """
+    Yield the header of a table file as a list of strings, and then each
+    data row, skipping blank lines and comments. If the first line does not
+    begin with '#' it is the header; otherwise the leading lines beginning
+    with '#' are comments, except the header, which is the first of them
+    with as many fields as the first data row (or the last of them if none
+    has). Data rows of CSV files are lists of strings; those of whitespace
+    separated files are lists of the row label and the rest of the line.
+    """
+    if delimiter is None:
+        lines = iter(f)
+        leading = (line.split() for line in lines)
+        rows = (line.split(None, 1) for line in lines)
+    else:
+        import csv
+        leading = rows = ([item.strip() for item in row]
+                          for row in csv.reader(f, delimiter=delimiter))
+    comments = []
+    for row in leading:
+        if not row or row == ['']:
+            continue
+        if row[0].startswith('#'):
+            comments.append(row)
+            continue
+        if not comments:
+            yield row
+            break
+        headers = [comment for comment in comments if len(comment) == len(row)]
+        yield headers[0] if headers else comments[-1]
+        if delimiter is None:
+            row = [row[0], ' '.join(row[1:])]
+        yield row
+        break
+    else:
+        if comments:
+            yield comments[-1]
+        return
+    for row in rows:
+        if row and row != [''] and not row[0].startswith('#'):
+            yield row
+
+
+def _convert_column(values, dtype):
+    """
+    Convert a list of strings to an array of `dtype`, or of the narrowest of
+    int, float and str that can hold all the values if `dtype` is None.
+    Returns the array and its Python type.
+    """
+    import numpy
+    if dtype in (int, float):
+        return numpy.array(values, dtype=dtype), dtype
+    if dtype is None:
+        for candidate in (int, float):
+            try:
+                return numpy.array(values, dtype=candidate), candidate
+            except (ValueError, OverflowError):
+                pass
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array, str
+
+
+def _read_table(f, dtypes=None, delimiter=None, chunk_size=10000):
+    """
+    Read a table from the file-like object `f`, `chunk_size` rows at a time,
+    converting each chunk column by column with NumPy.
+
+    `dtypes` may be one of int, float or str for all columns, or a dict mapping
+    column labels to types; the types of the other columns are inferred.
+    Returns the row labels, the column labels and a 2D array, which has
+    `object` dtype if the columns do not all have the same type.
+    """
+    import numpy
+    lines = _table_lines(f, delimiter)
+    try:
+        column_labels = next(lines)[1:]
+    except StopIteration:
+        return [], [], numpy.empty((0, 0))
+    ncols = len(column_labels)
+    if not isinstance(dtypes, dict):
+        dtypes = dict((label, dtypes) for label in column_labels)
+    forced_types = [dtypes.get(label) for label in column_labels]
+    column_types = list(forced_types)
+    chunks = [[] for label in column_labels]
+    row_labels = []
+    while True:
+        texts = []  # the rest of each line of a whitespace separated table
+        cells = []
+        n = 0
+        for row in lines:
+            if delimiter is None:
+                texts.append(row[1] if len(row) > 1 else '')
+            elif len(row) != ncols + 1:
+                raise ValueError("Row %s has %d values, expected %d" % (
+                    row[0], len(row) - 1, ncols))
+            else:
+                cells.extend(row[1:])
+            row_labels.append(row[0])
+            n += 1
+            if n == chunk_size:
+                break
+        if n == 0:
+            break
+        if delimiter is None:
+            # only split into cells if NumPy cannot parse the lines
+            cells = None if ncols else []
+        columns = None
+        if len(set(forced_types)) == 1 and forced_types[0] in (int, float):
+            block_type = forced_types[0]
+        elif forced_types.count(None) == ncols and set(column_types) <= set([None, int]):
+            block_type = int
+        else:
+            block_type = None
+        if block_type is not None:
+            # fast path: convert the whole chunk at once
+            try:
+                if cells is None:
+                    # NumPy's parser also checks the number of values in each row
+                    block = numpy.loadtxt(texts, dtype=block_type, comments=None, ndmin=2)
+                    if block.shape != (n, ncols):
+                        raise ValueError("Wrong number of values")
+                else:
+                    block = numpy.array(cells, dtype=block_type).reshape((n, ncols))
+                columns = [(block[:, j], block_type) for j in range(ncols)]
+            except (ValueError, OverflowError):
+                if block_type is forced_types[0] and cells is not None:
+                    raise
+        if columns is None:
+            if cells is None:
+                cells = _split_cells(texts, row_labels[-n:], ncols)
+            columns = [_convert_column(cells[j::ncols], forced_types[j])
+                       for j in range(ncols)]
+        for j, (values, found) in enumerate(columns):
+            if chunks[j] and found != column_types[j]:
+                # an earlier chunk was inferred with a narrower type: widen
+                if str in (found, column_types[j]):
+                    found = str
+                    if cells is None:
+                        cells = _split_cells(texts, row_labels[-n:], ncols)
+                    values = _convert_column(cells[j::ncols], str)[0]
+                    chunks[j] = [c.astype(str).astype(object) for c in chunks[j]]
+                else:
+                    found = float
+                    values = values.astype(float)
+                    chunks[j] = [c.astype(float) for c in chunks[j]]
+            column_types[j] = found
+            chunks[j].append(values)
+    if len(set(column_types)) == 1 and column_types[0] in (int, float):
+        dtype = column_types[0]
+    else:
+        dtype = object
+    array = numpy.empty((len(row_labels), ncols), dtype=dtype)
+    for j in range(ncols):
+        if chunks[j]:
+            array[:, j] = numpy.concatenate(chunks[j])
+    return row_labels, column_labels, array
+
+
+def _split_cells(texts, row_labels, ncols):
+    """
+    Split the rest of each line of a whitespace separated table into cells,
+    see `_read_table()`, checking that each row has `ncols` values.
+    """
+    cells = []
+    for row_label, text in zip(row_labels, texts):
+        row = text.split()
+        if len(row) != ncols:
+            raise ValueError("Row %s has %d values, expected %d" % (row_label, len(row), ncols))
+        cells.extend(row)
+    return cells
+
+
+def _load_table(source, dtypes, delimiter, chunk_size):
+    """`_read_table()` for a file name or a file-like object."""
+    if isinstance(source, basestring):
+        f = open(source, 'r')
+        try:
+            return _read_table(f, dtypes, delimiter, chunk_size)
+        finally:
+            f.close()
+    return _read_table(source, dtypes, delimiter, chunk_size)
+
+
+def _table_dict(row_labels, column_labels, array):
+    """Return the table read by `_read_table()` as a dict of dicts."""
+    return dict((row_label, dict(zip(column_labels, values)))
+                for row_label, values in zip(row_labels, array.tolist()))
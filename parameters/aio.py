@@ -0,0 +1,146 @@
+"""
+parameters.aio
+==============
+
+Counterparts of the loading and iteration methods of `ParameterSet` and
+`ParameterSpace` for use with `asyncio`, which do not block the event loop.
+Requires Python 3.7 or later; the methods `ParameterSet.aload()`,
+`ParameterSpace.aiter_inner()` and `ParameterSpace.arealize_dists()` use this
+module.
+
+Functions
+---------
+
+aload          - load a ParameterSet from a URL or file, fetching included
+                 parameter sets concurrently.
+aiter_inner    - iterate over the points of a ParameterSpace, yielding control
+                 to the event loop between batches.
+arealize_dists - the same for the realizations of the distributions.
+amap           - run a coroutine function on many points, with a limit on the
+                 number running at once.
+
+"""
+
+import asyncio
+from os import path
+from urllib.parse import urlparse
+
+
+class _Include(object):
+    """Stands for `url('...')` in a parameter file until the URL has been loaded."""
+
+    def __init__(self, url):
+        self.url = url
+
+
+def _read(url):
+    """Return the text of the file or URL `url` (blocking)."""
+    if path.exists(url):
+        with open(url) as f:
+            return f.read()
+    from . import urlopen
+    f = urlopen(url)
+    try:
+        return f.read().decode()
+    finally:
+        f.close()
+
+
+def _includes(d):
+    """
+    Yield (container, key, include) for each `_Include` in the nested dict or
+    list `d`, where `key` is an index for a list.
+    """
+    for key, value in (d.items() if isinstance(d, dict) else enumerate(d)):
+        if isinstance(value, _Include):
+            yield d, key, value
+        elif isinstance(value, (dict, list)):
+            for item in _includes(value):
+                yield item
+
+
+async def aload(cls, url, update_namespace=None):
+    """
+    Return a `cls` (e.g. `ParameterSet`) loaded from `url`, a URL or a
+    filename, reading it in a thread so as not to block the event loop. The
+    parameter sets included with `url('...')` are loaded concurrently.
+    """
+    from . import ParameterSet
+    loop = asyncio.get_running_loop()
+    text = await loop.run_in_executor(None, _read, url)
+    ext = path.splitext(urlparse(url).path)[1]
+    if ext in ('.yaml', '.yml'):
+        import yaml
+        d = yaml.safe_load(text)
+    else:
+        namespace = dict(update_namespace or {}, url=_Include)
+        d = ParameterSet.read_from_str(text, namespace)
+    found = list(_includes(d))
+    included = await asyncio.gather(*[aload(ParameterSet, include.url, update_namespace)
+                                      for parent, key, include in found])
+    for (parent, key, include), ps in zip(found, included):
+        parent[key] = ps
+    ps = cls(d)
+    ps._url = url
+    return ps
+
+
+async def _batched(iterable, batch):
+    for i, item in enumerate(iterable):
+        if i and i % batch == 0:
+            await asyncio.sleep(0)
+        yield item
+
+
+def aiter_inner(space, batch=100, **kwargs):
+    """
+    An asynchronous iterator over the points of `space`, which yields
+    control to the event loop after each `batch` points. Other arguments are
+    passed to `ParameterSpace.iter_inner()`.
+    """
+    return _batched(space.iter_inner(**kwargs), batch)
+
+
+def arealize_dists(space, n=1, batch=100, **kwargs):
+    """
+    An asynchronous iterator over `n` realizations of the distributions in
+    `space`, which yields control to the event loop after each `batch`
+    points. Other arguments are passed to `ParameterSpace.realize_dists()`.
+    """
+    return _batched(space.realize_dists(n, **kwargs), batch)
+
+
+async def amap(func, items, limit=8):
+    """
+    Call the coroutine function `func` on each of `items`, an iterable or
+    asynchronous iterable, with at most `limit` calls running at once, and
+    yield `(item, result)` pairs as the calls finish, e.g.::
+
+        >>> async for P, result in amap(client.run, space.aiter_inner(copy=True)):
+        ...     store(P, result)
+
+    Since calls run concurrently, the items must be distinct objects, e.g.
+    points yielded with `copy=True`. If a call raises an exception, the other
+    calls are cancelled and the exception is raised.
+    """
+    async def call(item):
+        return item, await func(item)
+
+    if not hasattr(items, '__aiter__'):
+        items = _batched(items, limit)
+    running = set()
+    try:
+        async for item in items:
+            if len(running) >= limit:
+                done, running = await asyncio.wait(running,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            running.add(asyncio.ensure_future(call(item)))
+        while running:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in running:
+            task.cancel()
@@ -1,6 +1,7 @@
 
 from .parameters import ParameterRange
 from .parameters import ParameterTable
+from .parameters import ArrayParameterTable
 
 
 def parameters_to_latex(filename, d, indent=0.5):
@@ -69,13 +70,13 @@ def parameters_to_latex(filename, d, indent=0.5):
         for key in keys:
             k = key
             v = d[key]
-            if hasattr(v, 'items') and not isinstance(v, ParameterTable):
+            if hasattr(v, 'items') and not isinstance(v, (ParameterTable, ArrayParameterTable)):
                 s.append("\\hspace*{%scm} %s: " % (indent, k))
                 s.append(walk(v, indent+ind_incr,  ind_incr))
                 s.append('\\hspace*{%scm} ' % indent)
             elif isinstance(v, ParameterRange):
                 s.append("\\hspace*{%scm} %s : %s" % (indent, k, str(v._values)))
-            elif isinstance(v, ParameterTable):
+            elif isinstance(v, (ParameterTable, ArrayParameterTable)):
                 s.append("\\hspace*{%scm} %s : see Table~\\ref{%s} " % (indent, k, k))
                 latex_table(k, v)
             elif isinstance(v, basestring):
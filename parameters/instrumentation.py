@@ -0,0 +1,187 @@
+"""
+parameters.instrumentation
+==========================
+
+Optional counters and timers for the work done by `parameters`, to find out
+where the time goes in a slow job. Instrumentation is off by default, and then
+costs no more than a test of `enabled` in each instrumented function. It can
+be switched on with `enable()`, with `measure()` for a block of code, or by
+setting the environment variable `PARAMETERS_INSTRUMENTATION=1`.
+
+The following are recorded:
+
+=====================  ====================================================
+load, load:<source>    timer: reading and parsing files and URLs
+fetch                  timer: reading the contents of URLs
+parse                  timer: evaluating parameter set definitions
+tree_copy              counter: calls of `tree_copy()`
+tree_copy.nodes        counter: `ParameterSets` copied by `tree_copy()`
+getitem                counter: lookups of parameters by name
+getitem.depth          counter: total number of levels descended by lookups
+reference.evaluate     counter: evaluations of `ParameterReferences`
+validate               timer: validation with `CongruencyValidator`
+=====================  ====================================================
+
+Functions
+---------
+
+enable         - start recording.
+disable        - stop recording.
+reset          - set all counters and timers to zero.
+snapshot       - return the current counters and timers.
+measure        - a context manager which records the counters and timers for a
+                 block of code.
+add_callback   - call a function on each recorded event, e.g. to export it.
+remove_callback
+
+"""
+
+from __future__ import absolute_import
+import os
+import threading
+import time
+
+enabled = bool(os.environ.get('PARAMETERS_INSTRUMENTATION'))
+
+clock = getattr(time, 'perf_counter', time.time)
+
+_counters = {}
+_timers = {}    # name: [count, seconds]
+_callbacks = []
+_lock = threading.Lock()
+
+
+def enable():
+    """Start recording counters and timers."""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Stop recording counters and timers. The values recorded are kept."""
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Set all counters and timers to zero."""
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+
+def count(name, n=1):
+    """Add `n` to the counter `name`."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+    for callback in _callbacks:
+        callback('count', name, n)
+
+
+def add_time(name, seconds):
+    """Add a duration, in seconds, to the timer `name`."""
+    with _lock:
+        timer = _timers.setdefault(name, [0, 0.0])
+        timer[0] += 1
+        timer[1] += seconds
+    for callback in _callbacks:
+        callback('time', name, seconds)
+
+
+class _Timer(object):
+
+    def __init__(self, names):
+        self.names = names
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = clock() - self.start
+        for name in self.names:
+            add_time(name, elapsed)
+
+
+class _NullTimer(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_null_timer = _NullTimer()
+
+
+def timed(*names):
+    """
+    Return a context manager which adds the time taken by a block of code to
+    the timers `names`, or does nothing if instrumentation is disabled.
+    """
+    if not enabled:
+        return _null_timer
+    return _Timer(names)
+
+
+def snapshot():
+    """
+    Return the current values as a dict with keys 'counters', mapping names
+    to numbers, and 'timers', mapping names to dicts with keys 'count' and
+    'seconds'.
+    """
+    with _lock:
+        return {'counters': dict(_counters),
+                'timers': dict((name, {'count': c, 'seconds': s})
+                               for name, (c, s) in _timers.items())}
+
+
+def _difference(after, before):
+    counters = dict((name, n - before['counters'].get(name, 0))
+                    for name, n in after['counters'].items())
+    timers = {}
+    for name, timer in after['timers'].items():
+        old = before['timers'].get(name, {'count': 0, 'seconds': 0.0})
+        timers[name] = {'count': timer['count'] - old['count'],
+                        'seconds': timer['seconds'] - old['seconds']}
+    return {'counters': dict((k, v) for k, v in counters.items() if v),
+            'timers': dict((k, v) for k, v in timers.items() if v['count'])}
+
+
+class measure(object):
+    """
+    A context manager which enables instrumentation for a block of code, and
+    then holds the counters and timers recorded in the block, e.g.::
+
+        >>> with instrumentation.measure() as m:
+        ...     ps = ParameterSet('http://example.com/params')
+        >>> m.timers['fetch']['seconds']
+
+    Instrumentation is left as it was before the block.
+    """
+
+    def __enter__(self):
+        global enabled
+        self._was_enabled = enabled
+        self._start = snapshot()
+        enabled = True
+        return self
+
+    def __exit__(self, *exc_info):
+        global enabled
+        enabled = self._was_enabled
+        result = _difference(snapshot(), self._start)
+        self.counters = result['counters']
+        self.timers = result['timers']
+
+
+def add_callback(callback):
+    """
+    Call `callback(kind, name, value)` on each event recorded, where `kind`
+    is 'count' (`value` is the increment) or 'time' (`value` is in seconds).
+    """
+    _callbacks.append(callback)
+
+
+def remove_callback(callback):
+    _callbacks.remove(callback)
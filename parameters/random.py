@@ -8,25 +8,227 @@ is compatible with the ParameterSpace class in the parameters module.
 Classes
 -------
 
-GammaDist   - gamma.pdf(x,a,b) = x**(a-1)*exp(-x/b)/gamma(a)/b**a
-NormalDist  - normal distribution
-UniformDist - uniform distribution
+GammaDist           - gamma.pdf(x,a,b) = x**(a-1)*exp(-x/b)/gamma(a)/b**a
+NormalDist          - normal distribution
+UniformDist         - uniform distribution
+LogNormalDist       - log-normal distribution
+TruncatedNormalDist - normal distribution truncated to an interval
+ChoiceDist          - random choice from a list of values
+RandIntDist         - uniform distribution over the integers in an interval
+PoissonDist         - Poisson distribution
+
+Functions
+---------
+
+norm_ppf  - inverse of the standard normal cumulative distribution function
+norm_cdf  - standard normal cumulative distribution function
+gammainc  - regularized lower incomplete gamma function
+gamma_ppf - inverse of the cumulative distribution function of the gamma distribution
+
+All distributions take an optional `rng` argument, which may be a
+`numpy.random.Generator`, a `numpy.random.RandomState` or an integer seed for a
+new `Generator`. By default the global NumPy random state is used, so
+`numpy.random.seed()` makes realizations reproducible.
 
 """
 
 from __future__ import absolute_import
+import math
+import numbers
+from importlib import import_module
 try:
-    import numpy
-    import numpy.random
-    have_numpy = True
-except ImportError:
-    have_numpy = False
-try:
-    import scipy.stats
-    have_scipy = True
+    from importlib.util import find_spec  # Python 3
 except ImportError:
-    have_scipy = False
-import math
+    from imp import find_module  # Python 2
+
+    def find_spec(name):
+        try:
+            return find_module(name)
+        except ImportError:
+            return None
+
+# NumPy and SciPy are slow to import, so they are only imported when a
+# distribution is first sampled, see `_require()`.
+have_numpy = find_spec('numpy') is not None
+have_scipy = find_spec('scipy') is not None
+
+
+def _require(module_name, dist_name):
+    """Import and return `module_name`, which `dist_name` needs for realization."""
+    try:
+        return import_module(module_name)
+    except ImportError:
+        raise Exception('Error: %s was not found.  %s realization disabled.' % (
+            module_name.split('.')[0], dist_name))
+
+
+def _as_rng(rng):
+    """Return a random number generator for the `rng` argument of a distribution."""
+    if isinstance(rng, numbers.Integral):
+        return _require('numpy', 'seeded distribution').random.default_rng(rng)
+    return rng
+
+
+def _plain(x):
+    """Convert the arrays and tuples in `x`, e.g. a generator state, to lists."""
+    if hasattr(x, 'tolist'):
+        return x.tolist()
+    if isinstance(x, dict):
+        return dict((key, _plain(value)) for key, value in x.items())
+    if isinstance(x, (tuple, list)):
+        return [_plain(value) for value in x]
+    return x
+
+
+def _integers(rng, low, high, size):
+    """Draw integers from [`low`, `high`) with a `Generator` or a `RandomState`."""
+    if hasattr(rng, 'integers'):
+        return rng.integers(low, high, size=size)
+    return rng.randint(low, high, size=size)
+
+
+# coefficients of the rational approximations to the inverse of the standard
+# normal cumulative distribution function, from P. J. Acklam (relative error
+# less than 1.15e-9)
+_ppf_a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_ppf_b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_ppf_c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_ppf_d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+
+
+def _polyval(coefficients, x):
+    result = coefficients[0]
+    for c in coefficients[1:]:
+        result = result*x + c
+    return result
+
+
+def norm_ppf(p):
+    """
+    Return the inverse of the standard normal cumulative distribution function
+    at `p`, which may be a number or an array, using NumPy only.
+    """
+    numpy = _require('numpy', 'norm_ppf')
+    p = numpy.asarray(p, dtype=float)
+    x = numpy.empty_like(p)
+    low = p < 0.02425
+    high = p > 1 - 0.02425
+    central = ~(low | high)
+    q = p[central] - 0.5
+    r = q*q
+    x[central] = _polyval(_ppf_a, r)*q/(_polyval(_ppf_b, r)*r + 1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        q = numpy.sqrt(-2*numpy.log(p[low]))
+        x[low] = _polyval(_ppf_c, q)/(_polyval(_ppf_d, q)*q + 1)
+        q = numpy.sqrt(-2*numpy.log1p(-p[high]))
+        x[high] = -_polyval(_ppf_c, q)/(_polyval(_ppf_d, q)*q + 1)
+    x[p == 0] = -numpy.inf
+    x[p == 1] = numpy.inf
+    return x
+
+
+def norm_cdf(x):
+    """Return the standard normal cumulative distribution function at the number `x`."""
+    return 0.5*math.erfc(-x/math.sqrt(2))
+
+
+def gammainc(a, x, tol=1e-14, max_iter=1000):
+    """
+    Return the regularized lower incomplete gamma function P(a, x), for a
+    number `a` and an array `x`, using NumPy only: a series for x < a+1 and a
+    continued fraction otherwise (Numerical Recipes, section 6.2). Each
+    element stops iterating once it has converged, so the result for an
+    element does not depend on the other elements of `x`.
+    """
+    numpy = _require('numpy', 'gammainc')
+    x = numpy.asarray(x, dtype=float)
+    result = numpy.zeros_like(x)
+    positive = x > 0
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        prefactor = numpy.exp(-x + a*numpy.log(x) - math.lgamma(a))
+    series = positive & (x < a + 1)
+    xs = x[series]
+    ap = a
+    term = total = numpy.full_like(xs, 1.0/a)
+    converged = numpy.zeros(xs.shape, dtype=bool)
+    for i in range(max_iter):
+        ap += 1
+        term = numpy.where(converged, 0.0, term*xs/ap)
+        total = total + term
+        converged |= numpy.abs(term) < numpy.abs(total)*tol
+        if converged.all():
+            break
+    result[series] = total*prefactor[series]
+    fraction = positive & ~series
+    xf = x[fraction]
+    tiny = 1e-300
+    b = xf + 1 - a
+    c = numpy.full_like(xf, 1/tiny)
+    d = 1/b
+    h = d
+    converged = numpy.zeros(xf.shape, dtype=bool)
+    for i in range(1, max_iter):
+        an = -i*(i - a)
+        b = b + 2
+        d = an*d + b
+        d[numpy.abs(d) < tiny] = tiny
+        c = b + an/c
+        c[numpy.abs(c) < tiny] = tiny
+        d = 1/d
+        delta = numpy.where(converged, 1.0, d*c)
+        h = h*delta
+        converged |= numpy.abs(delta - 1) < tol
+        if converged.all():
+            break
+    result[fraction] = 1 - prefactor[fraction]*h
+    return result
+
+
+def gamma_ppf(p, a, max_iter=20):
+    """
+    Return the inverse of the cumulative distribution function of the gamma
+    distribution with shape `a` and unit scale at `p` (an array), by Halley's
+    method from an approximate starting point (Numerical Recipes, section 6.2).
+    """
+    numpy = _require('numpy', 'gamma_ppf')
+    p = numpy.asarray(p, dtype=float)
+    gln = math.lgamma(a)
+    a1 = a - 1
+    if a > 1:
+        lna1 = math.log(a1)
+        afac = math.exp(a1*(lna1 - 1) - gln)
+        pp = numpy.where(p < 0.5, p, 1 - p)
+        t = numpy.sqrt(-2*numpy.log(pp))
+        x = (2.30753 + t*0.27061)/(1 + t*(0.99229 + t*0.04481)) - t
+        x = numpy.where(p < 0.5, -x, x)
+        x = numpy.maximum(1e-3, a*(1 - 1/(9*a) - x/(3*math.sqrt(a)))**3)
+    else:
+        t = 1 - a*(0.253 + a*0.12)
+        with numpy.errstate(divide='ignore'):
+            x = numpy.where(p < t, (p/t)**(1/a), 1 - numpy.log(1 - (p - t)/(1 - t)))
+    converged = numpy.zeros(x.shape, dtype=bool)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for i in range(max_iter):
+            err = gammainc(a, x) - p
+            if a > 1:
+                t = afac*numpy.exp(-(x - a1) + a1*(numpy.log(x) - lna1))
+            else:
+                t = numpy.exp(-x + a1*numpy.log(x) - gln)
+            u = err/t
+            step = u/(1 - 0.5*numpy.minimum(1, u*((a - 1)/x - 1)))
+            step[~numpy.isfinite(step) | converged] = 0
+            x_new = x - step
+            x = numpy.where(x_new <= 0, 0.5*x, x_new)
+            converged |= numpy.abs(step) < 1e-12*x
+            if converged.all():
+                break
+    x[p <= 0] = 0
+    x[p >= 1] = numpy.inf
+    return x
 
 
 class ParameterDist(object):
@@ -34,6 +236,11 @@ class ParameterDist(object):
     missing docstring
     """
 
+    rng = None
+    buffer_size = 0
+    _buffer = ()
+    _buffer_pos = 0
+
     def __init__(self, **params):
         self.params = params
         self.dist_name = 'ParameterDist'
@@ -47,16 +254,106 @@ class ParameterDist(object):
         return s[:-1]+')'
 
     def next(self, n=1):
+        """
+        Return an array of `n` samples from the distribution.
+
+        If a buffer has been enabled with `buffered()`, samples are drawn in
+        blocks of `buffer_size` and handed out from the buffer.
+        """
+        if not self.buffer_size:
+            return self._draw(n)
+        available = len(self._buffer) - self._buffer_pos
+        if n > available:
+            block = self._draw(max(self.buffer_size, n - available))
+            if available:
+                numpy = _require('numpy', self.dist_name)
+                block = numpy.concatenate((self._buffer[self._buffer_pos:], block))
+            self._buffer = block
+            self._buffer_pos = 0
+        vals = self._buffer[self._buffer_pos:self._buffer_pos + n].copy()
+        self._buffer_pos += n
+        return vals
+
+    def _draw(self, n):
+        """Return an array of `n` new samples from the distribution."""
         raise NotImplementedError(
             'This is an abstract base class and cannot be used directly')
 
+    def ppf(self, q):
+        """
+        Return the inverse of the cumulative distribution function at the
+        array of probabilities `q`, i.e. map uniform samples to samples from
+        this distribution.
+        """
+        raise NotImplementedError(
+            '%s does not define an inverse cumulative distribution function' % self.dist_name)
+
+    def buffered(self, buffer_size=4096):
+        """
+        Draw samples in blocks of `buffer_size`, and return them from a buffer
+        when `next()` is called, which is much faster when drawing one or a
+        few samples at a time. `buffer_size=0` disables the buffer. Returns the
+        distribution itself, e.g.::
+
+            >>> noise = NormalDist(std=0.1, rng=1234).buffered(10000)
+
+        Buffering does not change the sequence of values obtained from a
+        distribution with its own `rng`. With the global NumPy random state,
+        the values are drawn earlier than they would otherwise be, so the
+        sequence differs if other code draws from the global state in between.
+        """
+        self.buffer_size = buffer_size
+        self.clear_buffer()
+        return self
+
+    def clear_buffer(self):
+        """Discard any buffered samples, e.g. after reseeding the generator."""
+        self._buffer = ()
+        self._buffer_pos = 0
+
+    def _rng(self):
+        """
+        Return the random number generator for this distribution: `self.rng`,
+        or the global NumPy random state if it is `None`.
+        """
+        if self.rng is None:
+            return _require('numpy', self.dist_name).random
+        return self.rng
+
+    def rng_state(self):
+        """
+        Return the state of the random number generator for this distribution
+        as a JSON-serializable object, for `set_rng_state()`. Any buffered
+        samples are not included.
+        """
+        rng = self._rng()
+        if hasattr(rng, 'integers'):
+            return _plain(rng.bit_generator.state)
+        return _plain(rng.get_state())
+
+    def set_rng_state(self, state):
+        """
+        Restore a state returned by `rng_state()`, discarding any buffered
+        samples.
+        """
+        rng = self._rng()
+        if hasattr(rng, 'integers'):
+            rng.bit_generator.state = state
+        else:
+            rng.set_state(tuple(state))
+        self.clear_buffer()
+
     def from_stats(self, vals, bias=0.0, expand=1.0):
         """missing docstring"""
-        if have_numpy:
-            self.__init__(mean=numpy.mean(vals)+bias,
-                          std=numpy.std(vals)*expand)
-        else:
-            raise Exception("Error: numpy was not found at import time.")
+        try:
+            import numpy
+        except ImportError:
+            raise Exception("Error: numpy was not found.")
+        rng = self.rng
+        self.__init__(mean=numpy.mean(vals)+bias,
+                      std=numpy.std(vals)*expand)
+        self.rng = rng
+        self.clear_buffer()
 
     def __eq__(self, o):
         # should we track the state of the rng and return False if it is
@@ -74,14 +371,14 @@ class GammaDist(ParameterDist):
     gamma.pdf(x,a,b) = x**(a-1)*exp(-x/b)/gamma(a)/b**a
 
     Yields strictly positive numbers.
-    Generally the distribution is implemented by `scipy.stats.gamma.pdf(x/b,a)/b`
+    Samples are drawn with `numpy.random.Generator.gamma(a, b)`.
     For more info, in ipython type::
 
-        >>> ? scipy.stats.gamma
+        >>> ? numpy.random.Generator.gamma
 
     """
 
-    def __init__(self, mean=None, std=None, repr_mode='ms', **params):
+    def __init__(self, mean=None, std=None, repr_mode='ms', rng=None, **params):
         """
         repr_mode specifies how the dist is displayed,
         either mean,var ('ms', the default) or a,b ('ab')
@@ -111,14 +408,13 @@ class GammaDist(ParameterDist):
             b = mean/a
         ParameterDist.__init__(self, a=a, b=b)
         self.dist_name = 'GammaDist'
+        self.rng = _as_rng(rng)
 
-    if have_scipy:
-        def next(self, n=1):
-            return scipy.stats.gamma.rvs(self.params['a'], size=n)*self.params['b']
-    else:
-        def next(self, n=1):
-            raise Exception(
-                'Error: scipy was not found at import time.  GammaDist realization disabled.')
+    def _draw(self, n):
+        return self._rng().gamma(self.params['a'], self.params['b'], size=n)
+
+    def ppf(self, q):
+        return self.params['b']*gamma_ppf(q, self.params['a'])
 
     def mean(self):
         return self.params['a']*self.params['b']
@@ -139,17 +435,16 @@ class NormalDist(ParameterDist):
     mean + std
     """
 
-    def __init__(self, mean=0.0, std=1.0):
+    def __init__(self, mean=0.0, std=1.0, rng=None):
         ParameterDist.__init__(self, mean=mean, std=std)
         self.dist_name = 'NormalDist'
+        self.rng = _as_rng(rng)
 
-    if have_numpy:
-        def next(self, n=1):
-            return numpy.random.normal(loc=self.params['mean'], scale=self.params['std'], size=n)
-    else:
-        def next(self, n=1):
-            raise Exception(
-                'Error: numpy was not found at import time.  NormalDist realization disabled.')
+    def _draw(self, n):
+        return self._rng().normal(loc=self.params['mean'], scale=self.params['std'], size=n)
+
+    def ppf(self, q):
+        return self.params['mean'] + self.params['std']*norm_ppf(q)
 
 
 class UniformDist(ParameterDist):
@@ -157,27 +452,175 @@ class UniformDist(ParameterDist):
     uniform distribution with min,max
     """
 
-    def __init__(self, min=0.0, max=1.0, return_type=float):
+    def __init__(self, min=0.0, max=1.0, return_type=float, rng=None):
         ParameterDist.__init__(self, min=min, max=max)
         self.dist_name = 'UniformDist'
         self.return_type = return_type
-
-    if have_numpy:
-        def next(self, n=1):
-            vals = numpy.random.uniform(low=self.params['min'],
-                                        high=self.params['max'],
-                                        size=n)
-            if self.return_type != float:
-                vals = vals.astype(self.return_type)
-            return vals
-    else:
-        def next(self, n=1):
-            raise Exception(
-                'Error: numpy was not found at import time.  UniformDist realization disabled.')
+        self.rng = _as_rng(rng)
+
+    def _draw(self, n):
+        vals = self._rng().uniform(low=self.params['min'],
+                                   high=self.params['max'],
+                                   size=n)
+        if self.return_type != float:
+            vals = vals.astype(self.return_type)
+        return vals
+
+    def ppf(self, q):
+        numpy = _require('numpy', self.dist_name)
+        vals = self.params['min'] + numpy.asarray(q)*(self.params['max'] - self.params['min'])
+        if self.return_type != float:
+            vals = vals.astype(self.return_type)
+        return vals
 
     def from_stats(self, vals, bias=0.0, expand=1.0):
         mn = min(vals)
         mx = max(vals)
         center = 0.5*(mx+mn)+bias
         hw = 0.5*(mx-mn)*expand
+        rng = self.rng
         self.__init__(min=center-hw, max=center+hw)
+        self.rng = rng
+        self.clear_buffer()
+
+
+class LogNormalDist(ParameterDist):
+    """
+    log-normal distribution, i.e. the distribution of exp(x) where x has a
+    normal distribution with mean `mu` and standard deviation `sigma`
+    """
+
+    def __init__(self, mu=0.0, sigma=1.0, rng=None):
+        ParameterDist.__init__(self, mu=mu, sigma=sigma)
+        self.dist_name = 'LogNormalDist'
+        self.rng = _as_rng(rng)
+
+    def _draw(self, n):
+        return self._rng().lognormal(mean=self.params['mu'], sigma=self.params['sigma'], size=n)
+
+    def ppf(self, q):
+        numpy = _require('numpy', self.dist_name)
+        return numpy.exp(self.params['mu'] + self.params['sigma']*norm_ppf(q))
+
+    def mean(self):
+        return math.exp(self.params['mu'] + 0.5*self.params['sigma']**2)
+
+
+class TruncatedNormalDist(ParameterDist):
+    """
+    normal distribution with parameters mean + std, truncated to the interval
+    [min, max] (`None` means unbounded).
+
+    Samples are obtained by inverting the cumulative distribution function,
+    so narrow or distant intervals are as fast as wide ones.
+    """
+
+    def __init__(self, mean=0.0, std=1.0, min=None, max=None, rng=None):
+        ParameterDist.__init__(self, mean=mean, std=std, min=min, max=max)
+        self.dist_name = 'TruncatedNormalDist'
+        self.rng = _as_rng(rng)
+
+    def _bounds(self):
+        """Return the interval in standard units."""
+        mean, std = self.params['mean'], self.params['std']
+        a = -float('inf') if self.params['min'] is None else (self.params['min'] - mean)/std
+        b = float('inf') if self.params['max'] is None else (self.params['max'] - mean)/std
+        return a, b
+
+    def _draw(self, n):
+        return self.ppf(self._rng().uniform(size=n))
+
+    def ppf(self, q):
+        numpy = _require('numpy', self.dist_name)
+        a, b = self._bounds()
+        # work in the lower tail, where the cdf is accurate
+        flip = a > 0
+        if flip:
+            a, b = -b, -a
+            q = 1 - numpy.asarray(q)
+        cdf_a = norm_cdf(a)
+        z = norm_ppf(cdf_a + (norm_cdf(b) - cdf_a)*numpy.asarray(q))
+        z = numpy.clip(z, a, b)
+        if flip:
+            z = -z
+        return self.params['mean'] + self.params['std']*z
+
+
+class ChoiceDist(ParameterDist):
+    """
+    random choice from the list `values`, with probabilities `p` (by default
+    all values are equally likely)
+    """
+
+    def __init__(self, values, p=None, rng=None):
+        ParameterDist.__init__(self, values=list(values), p=p)
+        self.dist_name = 'ChoiceDist'
+        self.rng = _as_rng(rng)
+
+    def _values(self):
+        numpy = _require('numpy', self.dist_name)
+        values = numpy.asarray(self.params['values'])
+        if values.dtype.kind not in 'biuf':
+            # keep strings and mixed types as they are
+            values = numpy.empty(len(self.params['values']), dtype=object)
+            values[:] = self.params['values']
+        return values
+
+    def _draw(self, n):
+        values = self._values()
+        return values[self._rng().choice(len(values), size=n, p=self.params['p'])]
+
+    def ppf(self, q):
+        numpy = _require('numpy', self.dist_name)
+        values = self._values()
+        if self.params['p'] is None:
+            cdf = numpy.arange(1, len(values) + 1)/float(len(values))
+        else:
+            cdf = numpy.cumsum(self.params['p'])
+        index = numpy.searchsorted(cdf, q, side='left')
+        return values[numpy.minimum(index, len(values) - 1)]
+
+
+class RandIntDist(ParameterDist):
+    """
+    uniform distribution over the integers min, min+1, ..., max
+    """
+
+    def __init__(self, min=0, max=1, rng=None):
+        ParameterDist.__init__(self, min=min, max=max)
+        self.dist_name = 'RandIntDist'
+        self.rng = _as_rng(rng)
+
+    def _draw(self, n):
+        return _integers(self._rng(), self.params['min'], self.params['max'] + 1, n)
+
+    def ppf(self, q):
+        numpy = _require('numpy', self.dist_name)
+        low, high = self.params['min'], self.params['max']
+        vals = low - 1 + numpy.ceil(numpy.asarray(q)*(high - low + 1)).astype(numpy.int64)
+        return numpy.clip(vals, low, high)
+
+
+class PoissonDist(ParameterDist):
+    """
+    Poisson distribution with mean lam
+    """
+
+    def __init__(self, lam=1.0, rng=None):
+        ParameterDist.__init__(self, lam=lam)
+        self.dist_name = 'PoissonDist'
+        self.rng = _as_rng(rng)
+
+    def _draw(self, n):
+        return self._rng().poisson(self.params['lam'], size=n)
+
+    def ppf(self, q):
+        numpy = _require('numpy', self.dist_name)
+        lam = self.params['lam']
+        if lam == 0:
+            return numpy.zeros(numpy.shape(q), dtype=numpy.int64)
+        k = numpy.arange(int(lam + 12*math.sqrt(lam) + 20))
+        log_pmf = k*math.log(lam) - lam - numpy.array([math.lgamma(i + 1) for i in k])
+        cdf = numpy.cumsum(numpy.exp(log_pmf))
+        index = numpy.searchsorted(cdf, q, side='left')
+        return numpy.minimum(index, len(k) - 1)
@@ -0,0 +1,192 @@
+"""
+parameters.results
+==================
+
+Storage of the results of a parameter sweep in N-dimensional arrays, with one
+dimension for each `ParameterRange` of a `ParameterSpace`, as given by
+`ParameterSpace.parameter_space_dimension_labels()`. Requires NumPy.
+
+Classes
+-------
+
+ResultsCube - memory-mapped arrays of results, indexed by the points of a
+              ParameterSpace.
+
+"""
+
+from __future__ import absolute_import
+import json
+import os
+from . import ParameterSpace, LinearSequence
+
+try:
+    basestring
+except NameError:
+    basestring = str
+
+
+class ResultsCube(object):
+    """
+    Arrays of results, one for each named output, with one dimension for each
+    `ParameterRange` of a `ParameterSpace`, e.g.::
+
+        >>> cube = ResultsCube.create(space, 'results', {'rate': 'float64', 'spikes': 'int64'})
+        >>> for P in space.iter_inner():
+        ...     cube[P] = run_model(P)   # a dict {'rate': ..., 'spikes': ...}
+        >>> cube['rate'].mean(axis=0)
+
+    Each array is stored in a NumPy `.npy` file in the cube's directory and
+    accessed through a memory map, so results are written to the file as they
+    are set, are not lost if the sweep crashes, and do not need to fit in
+    memory. The position of a point in the arrays is found from a table of the
+    values of each range, or in constant time for ranges created with
+    `ParameterRange.linspace()`, etc.
+
+    Several processes can write to the same cube at once, as long as they set
+    different points: each should open the cube itself with `ResultsCube()`,
+    or be passed the cube, which is pickled as its directory.
+    """
+
+    def __init__(self, directory, mode='r+'):
+        """Open the cube in `directory`, created with `create()`."""
+        import numpy
+        self.directory = directory
+        self.mode = mode
+        with open(os.path.join(directory, 'cube.json')) as f:
+            meta = json.load(f)
+        self.keys = meta['keys']
+        self.outputs = meta['outputs']
+        self.space = ParameterSpace(os.path.join(directory, 'space.param'))
+        self.arrays = dict((name, numpy.load(self._filename(name), mmap_mode=mode))
+                           for name in self.outputs)
+        self.done = numpy.load(self._filename('_done'), mmap_mode=mode)
+        # tables of the positions of the values of each range, except for
+        # ranges which find positions in constant time themselves
+        self._lookup = []
+        for key in self.keys:
+            prange = self.space[key]
+            table = None
+            if not isinstance(prange._values, LinearSequence):
+                table = {}
+                try:
+                    for i, value in enumerate(prange):
+                        table.setdefault(value, i)
+                except TypeError:  # unhashable values
+                    table = None
+            self._lookup.append((key, prange, table))
+
+    @classmethod
+    def create(cls, space, directory, outputs, fill_value=None):
+        """
+        Create a cube for the points of `space` in `directory`, with an array
+        for each of the `outputs`, a dict mapping names to NumPy dtypes or a
+        list of names of float outputs, and return it. Elements are
+        initialized to `fill_value`, by default NaN for floating-point arrays
+        and 0 otherwise.
+        """
+        from numpy.lib.format import open_memmap
+        import numpy
+        if not hasattr(outputs, 'items'):
+            outputs = dict((name, 'float64') for name in outputs)
+        for name in outputs:
+            if name.startswith('_'):
+                raise ValueError("Output names may not start with '_': %s" % name)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        shape, keys = space.parameter_space_dimension_labels()
+        shape = tuple(shape)
+        for name, dtype in outputs.items():
+            dtype = numpy.dtype(dtype)
+            if fill_value is not None:
+                fill = fill_value
+            else:
+                fill = numpy.nan if dtype.kind in 'fc' else 0
+            array = open_memmap(os.path.join(directory, name + '.npy'), mode='w+',
+                                dtype=dtype, shape=shape)
+            if fill:
+                array[...] = fill
+            array.flush()
+            del array
+        done = open_memmap(os.path.join(directory, '_done.npy'), mode='w+',
+                           dtype=bool, shape=shape)
+        done.flush()
+        del done
+        with open(os.path.join(directory, 'space.param'), 'w') as f:
+            f.write(space.pretty())
+        with open(os.path.join(directory, 'cube.json'), 'w') as f:
+            json.dump({'keys': keys, 'outputs': sorted(outputs)}, f)
+        return cls(directory)
+
+    def _filename(self, name):
+        return os.path.join(self.directory, name + '.npy')
+
+    @property
+    def shape(self):
+        return self.done.shape
+
+    def labels(self):
+        """Return a dict of the values of the range for each dimension."""
+        return self.space.get_ranges_values()
+
+    def index(self, point):
+        """
+        Return the position in the arrays of `point`, a `ParameterSet` from
+        the space, as a tuple.
+        """
+        index = []
+        for key, prange, table in self._lookup:
+            value = point[key]
+            i = None
+            if table is not None:
+                try:
+                    i = table.get(value)
+                except TypeError:
+                    pass
+            if i is None:
+                try:
+                    i = prange.index(value)
+                except ValueError:
+                    raise ValueError("The value %r of %s is not within the ParameterSpace"
+                                     % (value, key))
+            index.append(i)
+        return tuple(index)
+
+    def set(self, point, **values):
+        """Store the results `values`, given by output name, for `point`."""
+        index = self.index(point)
+        for name, value in values.items():
+            self.arrays[name][index] = value
+        self.done[index] = True
+
+    def get(self, point):
+        """Return a dict of the results for `point`."""
+        index = self.index(point)
+        return dict((name, self.arrays[name][index]) for name in self.outputs)
+
+    def is_set(self, point):
+        """Return True if results have been stored for `point`."""
+        return bool(self.done[self.index(point)])
+
+    def __setitem__(self, point, values):
+        self.set(point, **values)
+
+    def __getitem__(self, item):
+        """Return the array for an output name, or the results for a point."""
+        if isinstance(item, basestring):
+            return self.arrays[item]
+        return self.get(item)
+
+    def flush(self):
+        """Write any changes to the arrays to disk."""
+        for array in self.arrays.values():
+            array.flush()
+        self.done.flush()
+
+    def __getstate__(self):
+        return {'directory': self.directory, 'mode': self.mode}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], state['mode'])
+
+    def __repr__(self):
+        return 'ResultsCube(%r)' % self.directory
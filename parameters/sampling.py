@@ -0,0 +1,207 @@
+"""
+parameters.sampling
+===================
+
+Stratified and low-discrepancy sampling of the unit hypercube, used by
+`ParameterSpace.sample()`. Only NumPy is required.
+
+Functions
+---------
+
+latin_hypercube - blocks of points from a Latin hypercube design.
+halton          - blocks of points from the Halton sequence.
+sobol           - blocks of points from the Sobol' sequence.
+unit_samples    - dispatch to one of the above by name.
+
+Each function yields arrays of shape `(block_size, d)` (the last block may be
+smaller) whose values lie strictly between 0 and 1, so that they can be
+mapped through the inverse cumulative distribution function of any
+`ParameterDist`.
+
+"""
+
+from __future__ import absolute_import
+import numpy
+
+# points are kept away from 0 and 1, where inverse cdfs are infinite
+_EPS = 2.0**-53
+
+# Primitive polynomials and initial direction numbers for dimensions 2 to 40
+# of the Sobol' sequence, from S. Joe and F. Y. Kuo, "Constructing Sobol
+# sequences with better two-dimensional projections", SIAM J. Sci. Comput. 30,
+# 2635-2654 (2008) (file new-joe-kuo-6.21201). Each polynomial is written as an
+# integer whose bits are its coefficients, including the leading and trailing 1.
+_SOBOL_DIRECTIONS = [
+    (3, (1,)),
+    (7, (1, 3)),
+    (11, (1, 3, 1)),
+    (13, (1, 1, 1)),
+    (19, (1, 1, 3, 3)),
+    (25, (1, 3, 5, 13)),
+    (37, (1, 1, 5, 5, 17)),
+    (41, (1, 1, 5, 5, 5)),
+    (47, (1, 1, 7, 11, 19)),
+    (55, (1, 1, 5, 1, 1)),
+    (59, (1, 1, 1, 3, 11)),
+    (61, (1, 3, 5, 5, 31)),
+    (67, (1, 3, 3, 9, 7, 49)),
+    (91, (1, 1, 1, 15, 21, 21)),
+    (97, (1, 3, 1, 13, 27, 49)),
+    (103, (1, 1, 1, 15, 7, 5)),
+    (109, (1, 3, 1, 15, 13, 25)),
+    (115, (1, 1, 5, 5, 19, 61)),
+    (131, (1, 3, 7, 11, 23, 15, 103)),
+    (137, (1, 3, 7, 13, 13, 15, 69)),
+    (143, (1, 1, 3, 13, 7, 35, 63)),
+    (145, (1, 3, 5, 9, 1, 25, 53)),
+    (157, (1, 3, 1, 13, 9, 35, 107)),
+    (167, (1, 3, 1, 5, 27, 61, 31)),
+    (171, (1, 1, 5, 11, 19, 41, 61)),
+    (185, (1, 3, 5, 3, 3, 13, 69)),
+    (191, (1, 1, 7, 13, 1, 19, 1)),
+    (193, (1, 3, 7, 5, 13, 19, 59)),
+    (203, (1, 1, 3, 9, 25, 29, 41)),
+    (211, (1, 3, 5, 13, 23, 1, 55)),
+    (213, (1, 3, 7, 3, 13, 59, 17)),
+    (229, (1, 3, 1, 3, 5, 53, 69)),
+    (239, (1, 1, 5, 5, 23, 33, 13)),
+    (241, (1, 1, 7, 7, 1, 61, 123)),
+    (247, (1, 1, 7, 9, 13, 61, 49)),
+    (253, (1, 3, 3, 5, 3, 55, 33)),
+    (285, (1, 3, 1, 15, 31, 13, 49, 245)),
+    (299, (1, 3, 5, 15, 31, 59, 63, 97)),
+    (301, (1, 3, 1, 11, 11, 11, 77, 249)),
+]
+
+_SOBOL_BITS = 32
+SOBOL_MAX_DIMENSION = len(_SOBOL_DIRECTIONS) + 1
+
+
+def _sobol_direction_numbers(d):
+    """Return the direction numbers for the first `d` dimensions, shape (d, 32)."""
+    if d > SOBOL_MAX_DIMENSION:
+        raise ValueError("Sobol' sampling is limited to %d dimensions, use 'halton' "
+                         "or 'lhs' instead" % SOBOL_MAX_DIMENSION)
+    L = _SOBOL_BITS
+    V = numpy.zeros((d, L), dtype=numpy.uint64)
+    V[0] = [1 << (L - 1 - k) for k in range(L)]
+    for j in range(1, d):
+        poly, m = _SOBOL_DIRECTIONS[j - 1]
+        s = len(m)
+        a = (poly >> 1) & ((1 << (s - 1)) - 1)
+        v = [m[k] << (L - 1 - k) for k in range(s)]
+        for k in range(s, L):
+            x = v[k - s] ^ (v[k - s] >> s)
+            for i in range(1, s):
+                if (a >> (s - 1 - i)) & 1:
+                    x ^= v[k - i]
+            v.append(x)
+        V[j] = v
+    return V
+
+
+def _clip(u):
+    return numpy.clip(u, _EPS, 1.0 - _EPS)
+
+
+def _blocks(n, block_size, start=0):
+    """Yield arrays of consecutive indices start, ..., start+n-1."""
+    for i in range(start, start + n, block_size):
+        yield numpy.arange(i, min(i + block_size, start + n), dtype=numpy.uint64)
+
+
+def _integers(rng, d):
+    """Draw `d` random 32-bit integers with a `Generator` or a `RandomState`."""
+    if hasattr(rng, 'integers'):
+        x = rng.integers(0, 2**_SOBOL_BITS, size=d, dtype=numpy.uint64)
+    else:
+        x = rng.randint(0, 2**_SOBOL_BITS, size=d).astype(numpy.uint64)
+    return x
+
+
+def sobol(n, d, block_size=1024, rng=None, skip=1):
+    """
+    Yield the first `n` points of the `d`-dimensional Sobol' sequence, in
+    blocks. The first `skip` points (by default only the origin) are left out.
+    If `rng` is given, the points are randomized with a random digital shift.
+    """
+    V = _sobol_direction_numbers(d)
+    if rng is not None:
+        shift = _integers(rng, d)
+    for index in _blocks(n, block_size, skip):
+        gray = index ^ (index >> numpy.uint64(1))
+        X = numpy.zeros((len(index), d), dtype=numpy.uint64)
+        for bit in range(_SOBOL_BITS):
+            mask = ((gray >> numpy.uint64(bit)) & numpy.uint64(1)).astype(bool)
+            X[mask] ^= V[:, bit]
+        if rng is not None:
+            X ^= shift
+        yield _clip(X/2.0**_SOBOL_BITS)
+
+
+def _primes(d):
+    """Return the first `d` prime numbers."""
+    primes = []
+    candidate = 2
+    while len(primes) < d:
+        if all(candidate % p for p in primes if p*p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def halton(n, d, block_size=1024, rng=None, skip=1):
+    """
+    Yield the first `n` points of the `d`-dimensional Halton sequence, in
+    blocks. The first `skip` points (by default only the origin) are left out.
+    If `rng` is given, the points are randomized with a random shift modulo 1.
+    """
+    bases = _primes(d)
+    if rng is not None:
+        shift = rng.uniform(size=d)
+    for index in _blocks(n, block_size, skip):
+        index = index.astype(numpy.int64)
+        u = numpy.empty((len(index), d))
+        for j, base in enumerate(bases):
+            i = index.copy()
+            f = 1.0
+            x = numpy.zeros(len(index))
+            while i.any():
+                f /= base
+                x += f*(i % base)
+                i //= base
+            u[:, j] = x
+        if rng is not None:
+            u = (u + shift) % 1.0
+        yield _clip(u)
+
+
+def latin_hypercube(n, d, block_size=1024, rng=None):
+    """
+    Yield the `n` points of a random Latin hypercube design in `d`
+    dimensions, in blocks: along each dimension, each of the `n` equal
+    intervals of [0, 1] contains exactly one point.
+    """
+    if rng is None:
+        rng = numpy.random
+    strata = numpy.empty((n, d), dtype=numpy.int64)
+    for j in range(d):
+        strata[:, j] = rng.permutation(n)
+    for start in range(0, n, block_size):
+        block = strata[start:start + block_size]
+        yield _clip((block + rng.uniform(size=block.shape))/n)
+
+
+def unit_samples(method, n, d, block_size=1024, rng=None):
+    """
+    Yield `n` points of the unit hypercube in `d` dimensions, in blocks, with
+    `method` one of 'lhs', 'sobol' or 'halton'.
+    """
+    if method == 'lhs':
+        return latin_hypercube(n, d, block_size, rng)
+    elif method == 'sobol':
+        return sobol(n, d, block_size, rng)
+    elif method == 'halton':
+        return halton(n, d, block_size, rng)
+    else:
+        raise ValueError("Unknown sampling method '%s', use 'lhs', 'sobol' or 'halton'" % method)
@@ -0,0 +1,305 @@
+"""
+parameters.sharedmem
+====================
+
+Sharing a parameter set between processes through shared memory, so that the
+workers of a sweep read one copy of a large base parameter set, and of its
+NumPy arrays in particular, rather than each receiving a pickled copy of its
+own. Requires Python 3.8 or later; `ParameterSet.share()` uses this module.
+
+A published parameter set is a snapshot: the structure and the values other
+than arrays are stored in an index, pickled once, and each array, including
+the array of an `ArrayParameterTable`, is stored once in the shared memory
+block. Processes that attach to it by name unpickle the index, once per
+process, and get a `FrozenParameterSet` whose arrays are read-only views of
+the shared memory, and which is pickled as its name, e.g.::
+
+    >>> with P.share() as shared:
+    ...     pool.map(run_model, [(shared.view(), seed) for seed in range(64)])
+
+The block is removed when the publisher calls `unlink()`, leaves the `with`
+block, is garbage collected or exits; processes that are still attached keep
+their views until they detach.
+
+Classes
+-------
+
+SharedParameterSet - a parameter set published in shared memory, held by the
+                     publishing process.
+FrozenParameterSet - a read-only view of a published parameter set; views of
+                     subclasses, e.g. of a `ParameterSpace`, are instances
+                     of both.
+
+Functions
+---------
+
+attach         - return a view of the parameter set published under a name.
+detach         - forget the view of a published parameter set.
+
+"""
+
+from __future__ import absolute_import
+import os
+import pickle
+import struct
+import sys
+import weakref
+from collections import namedtuple
+from multiprocessing import shared_memory, resource_tracker, parent_process
+from . import ParameterSet, ParameterSpace, ParameterTable, ArrayParameterTable, \
+    intern
+
+_MAGIC = b'PARAMSHM'
+_HEADER = struct.Struct('<8sQQ')    # magic, publisher pid, length of the index
+_ALIGNMENT = 64
+
+# the index stores parameter sets as `_Node`s, with their class and the
+# attributes they are pickled with, arrays as `_Array`s, with offsets from
+# the start of the array data, and `ArrayParameterTable`s as `_Table`s
+_Node = namedtuple('_Node', 'type state items')
+_Array = namedtuple('_Array', 'offset dtype shape')
+_Table = namedtuple('_Table', 'array row_labels column_labels label')
+
+_attached = {}  # name: (segment, root view), for the views in this process
+
+
+class _Segment(shared_memory.SharedMemory):
+    """
+    A shared memory block which can be garbage collected while arrays still
+    refer to its memory, e.g. at exit, which `SharedMemory` reports as an
+    error; the memory is then unmapped by the operating system.
+    """
+
+    def __del__(self):
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass
+
+
+def _aligned(n):
+    return -(-n // _ALIGNMENT) * _ALIGNMENT
+
+
+def _index(node, arrays, size):
+    """
+    Return the `_Node` for the parameter set `node`, appending the arrays
+    to be stored in shared memory to `arrays`, and the total size of their
+    data so far, which starts at `size`.
+    """
+    numpy = sys.modules.get('numpy')
+    items = {}
+    for key, value in node.items():
+        if isinstance(value, ParameterSet):
+            value, size = _index(value, arrays, size)
+        elif (numpy is not None and type(value) is numpy.ndarray
+              and not value.dtype.hasobject):
+            value, size = _store(value, arrays, size)
+        elif isinstance(value, ArrayParameterTable) and not value.array.dtype.hasobject:
+            array, size = _store(value.array, arrays, size)
+            value = _Table(array, value.row_labels(), value.column_labels(), value.label)
+        items[key] = value
+    cls = type(node)
+    if issubclass(cls, FrozenParameterSet):
+        cls = cls._base
+    return _Node(cls, node.__getstate__(), items), size
+
+
+def _store(array, arrays, size):
+    arrays.append((size, array))
+    return _Array(size, array.dtype, array.shape), size + _aligned(array.nbytes)
+
+
+class SharedParameterSet(object):
+    """
+    A copy of the parameter set `parameter_set` in a new block of shared
+    memory called `name` (a unique name by default), which other processes
+    can open with `attach(name)`. The block is removed by `unlink()`, at the
+    end of a `with` block, or when this object is garbage collected or the
+    process exits.
+    """
+
+    def __init__(self, parameter_set, name=None):
+        arrays = []
+        root, size = _index(parameter_set, arrays, 0)
+        index = pickle.dumps(root, pickle.HIGHEST_PROTOCOL)
+        start = _aligned(_HEADER.size + len(index))
+        segment = _Segment(name, create=True, size=start + size)
+        try:
+            _HEADER.pack_into(segment.buf, 0, _MAGIC, os.getpid(), len(index))
+            segment.buf[_HEADER.size:_HEADER.size + len(index)] = index
+            if arrays:
+                import numpy
+                for offset, array in arrays:
+                    target = numpy.ndarray(array.shape, array.dtype, buffer=segment.buf,
+                                           offset=start + offset)
+                    target[...] = array
+                    del target
+        except Exception:
+            segment.close()
+            segment.unlink()
+            raise
+        self.name = segment.name
+        self.size = segment.size
+        self._finalizer = weakref.finalize(self, _release, segment)
+
+    def view(self):
+        """Return a `FrozenParameterSet` view of the published parameter set."""
+        return attach(self.name)
+
+    def unlink(self):
+        """Remove the shared memory block. Views in other processes are still valid."""
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unlink()
+
+    def __repr__(self):
+        return "<SharedParameterSet %r, %d bytes>" % (self.name, self.size)
+
+
+def _release(segment):
+    _attached.pop(segment.name, None)
+    segment.close()
+    segment.unlink()
+
+
+class FrozenParameterSet(ParameterSet):
+    """
+    A read-only view of a parameter set published in shared memory, returned
+    by `attach()`, in which arrays are read-only views of the shared memory.
+    It is pickled as its name and path, so passing it to another process
+    attaches that process to the same memory. Use `tree_copy()` to get a
+    `ParameterSet` that can be modified; its arrays are still shared.
+    """
+
+    __slots__ = ('_shared_name', '_path')
+    _base = ParameterSet
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("A shared parameter set cannot be modified; "
+                        "use tree_copy() to get a copy that can be")
+
+    __setitem__ = __delitem__ = flat_add = update = set_many = merge = apply_patch = \
+        intern = pop = popitem = clear = setdefault = __ior__ = _read_only
+
+    def __reduce__(self):
+        return attach, (self._shared_name, self._path)
+
+
+_frozen_classes = {ParameterSet: FrozenParameterSet}
+
+
+def _frozen_class(cls):
+    """Return the class of the views of parameter sets of class `cls`."""
+    frozen = _frozen_classes.get(cls)
+    if frozen is None:
+        namespace = {'__slots__': (), '_base': cls, '__module__': __name__}
+        if issubclass(cls, ParameterSpace):
+            namespace['constrain'] = FrozenParameterSet._read_only
+        frozen = _frozen_classes[cls] = type('Frozen' + cls.__name__,
+                                             (FrozenParameterSet, cls), namespace)
+    return frozen
+
+
+def _array(value, buf, start):
+    import numpy
+    count = 1
+    for n in value.shape:
+        count *= n
+    array = numpy.frombuffer(buf, value.dtype, count, start + value.offset)
+    array = array.reshape(value.shape)
+    array.flags.writeable = False
+    return array
+
+
+def _view(node, buf, start, name, path):
+    """Build the `FrozenParameterSet` for the `_Node` `node`, see `attach()`."""
+    cls = _frozen_class(node.type)
+    ps = cls.__new__(cls)
+    object.__setattr__(ps, '_url', None)
+    object.__setattr__(ps, 'label', None)
+    for attr, value in node.state.items():
+        object.__setattr__(ps, attr, value)
+    object.__setattr__(ps, '_shared_name', name)
+    object.__setattr__(ps, '_path', path)
+    if isinstance(ps, ParameterTable):
+        # set by `ParameterTable.__init__()`
+        object.__setattr__(ps, 'rows', ps.items)
+        object.__setattr__(ps, 'row_labels', ps.keys)
+    for key, value in node.items.items():
+        key = intern(key)
+        if isinstance(value, _Node):
+            value = _view(value, buf, start, name, path + key + '.')
+        elif isinstance(value, _Array):
+            value = _array(value, buf, start)
+        elif isinstance(value, _Table):
+            array = _array(value.array, buf, start)
+            value = ArrayParameterTable(array, value.row_labels, value.column_labels,
+                                        array.dtype, value.label)
+        dict.__setitem__(ps, key, value)
+    return ps
+
+
+def _open(name):
+    """
+    Open the shared memory block `name` and return it with the pid of the
+    process that published it.
+    """
+    if sys.version_info >= (3, 13):
+        segment = _Segment(name, track=False)
+    else:
+        segment = _Segment(name)
+    try:
+        magic, pid, length = _HEADER.unpack_from(segment.buf)
+    except struct.error:
+        magic = None
+    if magic != _MAGIC:
+        segment.close()
+        raise ValueError("'%s' is not a shared parameter set" % name)
+    if sys.version_info < (3, 13) and os.name == 'posix':
+        # The resource tracker removes the blocks registered with it when
+        # the processes using it have exited. Children of the publisher use
+        # its tracker, in which the block is already registered; other
+        # processes must not register it, or it would be removed when they
+        # exit, while the publisher and its workers are still using it.
+        parent = parent_process()
+        if pid != os.getpid() and (parent is None or parent.pid != pid):
+            resource_tracker.unregister('/' + segment.name, 'shared_memory')
+    return segment, length
+
+
+def attach(name, path=''):
+    """
+    Return a `FrozenParameterSet` view of the parameter set published in
+    shared memory as `name`, or of the parameter set at the dotted `path` in
+    it. The first call in a process unpickles the whole index, i.e. the
+    structure and the values other than arrays, and builds the view of the
+    whole parameter set, whatever `path` is; arrays are not copied. Later
+    calls return the same view.
+    """
+    entry = _attached.get(name)
+    if entry is None:
+        segment, length = _open(name)
+        root = pickle.loads(segment.buf[_HEADER.size:_HEADER.size + length])
+        start = _aligned(_HEADER.size + length)
+        entry = _attached[name] = (segment, _view(root, segment.buf, start, name, ''))
+    return entry[1][path.rstrip('.')] if path else entry[1]
+
+
+def detach(name):
+    """
+    Forget this process's view of the shared parameter set `name`, so that
+    its memory is unmapped once no arrays from it are in use, and a later
+    `attach(name)` opens the block again.
+    """
+    segment = _attached.pop(name)[0]
+    try:
+        segment.close()
+    except BufferError:
+        # arrays from the view still use the memory, which is unmapped
+        # when the last of them is garbage collected
+        pass
@@ -20,20 +20,31 @@ CongruencyValidator  - A CongruencyValidator validates a ParameterSet against a
 
 ValidationError      - The Exception raised when validation fails
 
+ValidationResult     - The outcome of validating a single source with `validate_many`.
+
+BatchValidation      - An iterator over `ValidationResult`s, with progress counters.
+
 Functions
 ---------
 
 congruent_dicts      - returns True if two nested dictionaries have the same key heirarchy,
                        otherwise False.
 
+validate_many        - validates many parameter files against one `ParameterSchema`
+                       in a pool of worker processes.
+
 
 See also: parameters
 
 """
 
 from __future__ import absolute_import
+import time
+import pickle
+import threading
+import multiprocessing
 import yaml
-from parameters import ParameterSet
+from parameters import ParameterSet, instrumentation
 import parameters
 
 
@@ -224,27 +235,28 @@ class CongruencyValidator(object):
 
         """
 
-        ps = parameter_set
-        schema = parameter_schema
-
-        ps_keys = set()
-        schema_keys = set()
-
-        for path, sb in schema.flat():
-            try:
-                val = ps[path]
-            except KeyError:
-                raise ValidationError(path=path, schema_base=sb,
-                                      parameter='<MISSING>')
-            if not sb.validate(val):
-                raise ValidationError(path=path, schema_base=sb, parameter=val)
-
-        for path, val in ps.flat():
-            try:
-                sb = schema[path]
-            except KeyError:
-                raise ValidationError(path=path, schema_base='<MISSING>',
-                                      parameter=val)
+        with instrumentation.timed('validate'):
+            ps = parameter_set
+            schema = parameter_schema
+
+            ps_keys = set()
+            schema_keys = set()
+
+            for path, sb in schema.flat():
+                try:
+                    val = ps[path]
+                except KeyError:
+                    raise ValidationError(path=path, schema_base=sb,
+                                          parameter='<MISSING>')
+                if not sb.validate(val):
+                    raise ValidationError(path=path, schema_base=sb, parameter=val)
+
+            for path, val in ps.flat():
+                try:
+                    sb = schema[path]
+                except KeyError:
+                    raise ValidationError(path=path, schema_base='<MISSING>',
+                                          parameter=val)
 
         return True
 
@@ -299,6 +311,177 @@ def congruent_dicts(template, candidate, subset=False, parent_path=''):
         return False
 
 
+class ValidationResult(object):
+    """
+    The outcome of validating a single source with `validate_many`.
+
+    `index` is the position of the source in the input sequence, `error` is
+    `None` if the source was valid, otherwise the `ValidationError` (or the
+    exception raised while loading the source).
+    """
+
+    def __init__(self, index, source, error=None):
+        self.index = index
+        self.source = source
+        self.error = error
+
+    @property
+    def valid(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.valid:
+            return 'ValidationResult(%d, %r, valid)' % (self.index, self.source)
+        return 'ValidationResult(%d, %r, %s)' % (self.index, self.source, self.error)
+
+
+# state of a worker process of `validate_many`, set once by `_init_worker`
+_worker_schema = None
+_worker_validator = None
+
+
+def _init_worker(schema, validator_class):
+    global _worker_schema, _worker_validator
+    _worker_schema = schema
+    _worker_validator = validator_class()
+
+
+def _validate_one(item):
+    """Load and validate one source in a worker, returning `(index, error)`."""
+    index, source = item
+    try:
+        if isinstance(source, ParameterSet):
+            ps = source
+        else:
+            ps = ParameterSet(source)
+        _worker_validator.validate(ps, _worker_schema)
+    except Exception as e:
+        return index, e
+    return index, None
+
+
+def _validate_remote(item):
+    """
+    As `_validate_one`, for a pool worker: an exception that cannot be sent
+    back to the parent is replaced by a `RuntimeError` giving its type and
+    message, so that it does not end the iteration.
+    """
+    index, error = _validate_one(item)
+    if error is not None:
+        try:
+            pickle.loads(pickle.dumps(error))
+        except Exception:
+            error = RuntimeError("%s: %s" % (type(error).__name__, error))
+    return index, error
+
+
+class BatchValidation(object):
+    """
+    An iterator over the `ValidationResult`s of a batch of sources, in the
+    order in which they finish, created by `validate_many`.
+
+    Progress can be followed through the `submitted`, `completed`, `passed`
+    and `failed` counters, and the `elapsed()` and `throughput()` methods.
+    """
+
+    def __init__(self, sources, schema, workers=None, chunksize=1,
+                 validator_class=CongruencyValidator):
+        if not isinstance(schema, ParameterSchema):
+            schema = ParameterSchema(schema)
+        self.sources = sources
+        self.schema = schema
+        self.workers = workers or multiprocessing.cpu_count()
+        self.chunksize = chunksize
+        self.validator_class = validator_class
+        self.submitted = 0
+        self.completed = 0
+        self.passed = 0
+        self.failed = 0
+        self._start = None
+        self._pending = {}
+        # `_items` is consumed by the pool's task-feeding thread
+        self._lock = threading.Lock()
+
+    def _items(self):
+        # sources are kept here, rather than sent back from the workers
+        for index, source in enumerate(self.sources):
+            with self._lock:
+                self._pending[index] = source
+                self.submitted += 1
+            yield index, source
+
+    def _result(self, index, error):
+        self.completed += 1
+        if error is None:
+            self.passed += 1
+        else:
+            self.failed += 1
+        with self._lock:
+            source = self._pending.pop(index)
+        return ValidationResult(index, source, error)
+
+    def __iter__(self):
+        self._start = time.time()
+        if self.workers == 1:
+            _init_worker(self.schema, self.validator_class)
+            for item in self._items():
+                yield self._result(*_validate_one(item))
+            return
+        # the schema is pickled once per worker, not once per source
+        pool = multiprocessing.Pool(self.workers, _init_worker,
+                                    (self.schema, self.validator_class))
+        try:
+            for index, error in pool.imap_unordered(_validate_remote,
+                                                    self._items(), self.chunksize):
+                yield self._result(index, error)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def elapsed(self):
+        """Return the time in seconds since validation started."""
+        if self._start is None:
+            return 0.0
+        return time.time() - self._start
+
+    def throughput(self):
+        """Return the number of sources validated per second."""
+        elapsed = self.elapsed()
+        if elapsed == 0.0:
+            return 0.0
+        return self.completed/elapsed
+
+    def errors(self):
+        """Validate all sources, and return a list of the failed `ValidationResult`s."""
+        return [result for result in self if not result.valid]
+
+
+def validate_many(sources, schema, workers=None, chunksize=1,
+                  validator_class=CongruencyValidator):
+    """
+    Load and validate many parameter sets against one `ParameterSchema`, in a
+    pool of `workers` processes (by default, one per CPU).
+
+    `sources` may be any iterable of file names, URLs, definition strings,
+    dicts or `ParameterSet`s. It is read by the pool as fast as it can, not as
+    the workers need more sources, so a generator of large parameter sets may
+    be exhausted, and all of them held in memory, long before they have been
+    validated; with `workers=1` it is read one source at a time. The schema
+    is sent to each worker once. Returns a `BatchValidation`, which yields a `ValidationResult`
+    for each source as soon as it has been validated, e.g.::
+
+        batch = validate_many(glob.glob('incoming/*.param'), schema, workers=8)
+        for result in batch:
+            if not result.valid:
+                print("%s: %s" % (result.source, result.error))
+        print("%.1f files/s" % batch.throughput())
+
+    With `workers=1`, validation runs in the calling process.
+    """
+    return BatchValidation(sources, schema, workers, chunksize, validator_class)
+
+
 # Add to parameters on import
 parameters.ParameterSchema = ParameterSchema
 parameters.Subclass = Subclass
@@ -0,0 +1,247 @@
+"""
+parameters.workqueue
+====================
+
+A queue of the points of a `ParameterSpace`, stored in an SQLite database
+file, from which any number of worker processes, on one machine or on several
+machines sharing a filesystem, take points to run as they become free. Needs
+no other service than the file itself.
+
+Classes
+-------
+
+WorkQueue - a queue of the points of a ParameterSpace, stored in a file.
+Task      - a point leased from a WorkQueue.
+LeaseLost - the exception raised when a task's lease has been given to another
+            worker.
+
+"""
+
+from __future__ import absolute_import
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from . import ParameterSpace
+
+
+class LeaseLost(Exception):
+    """Raised when a task has been leased again after its lease expired."""
+    pass
+
+
+class Task(object):
+    """
+    A point of the space leased by a worker: `position` is its position in
+    the iteration order of the queue, `point` the `ParameterSet` and
+    `attempt` the number of times it has been leased, counting this one.
+    """
+
+    def __init__(self, position, point, attempt, token):
+        self.position = position
+        self.point = point
+        self.attempt = attempt
+        self.token = token
+
+    def __repr__(self):
+        return 'Task(position=%r, attempt=%r)' % (self.position, self.attempt)
+
+
+class WorkQueue(object):
+    """
+    A queue of the points of a `ParameterSpace`, created with `create()`.
+    Each worker opens the queue file, leases a task, runs it, and marks it as
+    complete or failed, e.g.::
+
+        >>> queue = WorkQueue('sweep.db')
+        >>> for task in queue:
+        ...     try:
+        ...         run_model(task.point)
+        ...     except Exception as e:
+        ...         queue.fail(task, str(e))
+        ...     else:
+        ...         queue.complete(task)
+
+    A task whose lease is neither renewed with `heartbeat()` nor completed
+    within `lease_time` seconds, e.g. because the worker crashed, is leased
+    again to the next worker that asks. Failed tasks are tried again until
+    they have been leased `max_attempts` times.
+
+    Only the positions of tasks that have been leased are stored, so creating
+    a queue for a very large space takes no time. Constraints of the space
+    are not saved in the file: for a space with constraints, pass the space
+    as `space` when opening the queue (a queue for such a space cannot be
+    pickled).
+
+    Note that SQLite relies on the locking of the filesystem, which some
+    network filesystems do not implement correctly.
+    """
+
+    def __init__(self, filename, lease_time=600.0, worker=None, timeout=60.0, space=None):
+        if not os.path.exists(filename):
+            raise IOError("No work queue file %s, use WorkQueue.create()" % filename)
+        self.filename = filename
+        self.lease_time = lease_time
+        self.worker = worker or '%s:%d' % (socket.gethostname(), os.getpid())
+        self.timeout = timeout
+        self._connection = sqlite3.connect(filename, timeout=timeout, isolation_level=None)
+        meta = dict(self._connection.execute("SELECT key, value FROM meta"))
+        self.total = int(meta['total'])
+        self.order = meta['order']
+        self.seed = None if meta['seed'] == '' else int(meta['seed'])
+        self.max_attempts = int(meta['max_attempts'])
+        if space is None:
+            if meta['constrained'] == '1':
+                raise ValueError("Constraints are not saved in the queue file, "
+                                 "pass the ParameterSpace as `space`")
+            space = ParameterSpace(meta['space'])
+        self.space = space
+
+    @classmethod
+    def create(cls, space, filename, order='sequential', seed=None, max_attempts=3, **kwargs):
+        """
+        Create a queue of the points of `space`, in the order given by `order`
+        and `seed` as for `ParameterSpace.iter_inner()`, in the file
+        `filename`, and return it. Further arguments are passed to
+        `WorkQueue()`.
+        """
+        if os.path.exists(filename):
+            raise IOError("The file %s already exists" % filename)
+        if order not in ('sequential', 'random'):
+            raise ValueError("Unknown order '%s', use 'sequential' or 'random'" % order)
+        connection = sqlite3.connect(filename)
+        with connection:
+            connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            connection.execute(
+                "CREATE TABLE tasks (position INTEGER PRIMARY KEY, state TEXT, worker TEXT, "
+                "token TEXT, expires REAL, attempts INTEGER, error TEXT)")
+            connection.execute("CREATE INDEX tasks_state ON tasks (state, expires)")
+            meta = {'space': space.pretty(),
+                    'constrained': '1' if space.constraints else '0',
+                    'total': str(space.num_conditions()),
+                    'next_position': '0',
+                    'order': order,
+                    'seed': '' if seed is None else str(seed),
+                    'max_attempts': str(max_attempts)}
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        connection.close()
+        if space.constraints:
+            kwargs['space'] = space
+        return cls(filename, **kwargs)
+
+    def _point(self, position):
+        for point in self.space.iter_inner(order=self.order, seed=self.seed, start=position):
+            return point
+
+    def lease(self):
+        """
+        Return the next `Task` to run, or None if there are no tasks left to
+        lease (though leased tasks may still fail and be leased again).
+        Expired and failed tasks are leased before new ones.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        c = self._connection
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = c.execute(
+                    "SELECT position, attempts FROM tasks WHERE state = 'pending' "
+                    "OR (state = 'leased' AND expires < ?) ORDER BY position LIMIT 1",
+                    (now,)).fetchone()
+                if row is None:
+                    break
+                position, attempts = row
+                if attempts < self.max_attempts:
+                    c.execute("UPDATE tasks SET state = 'leased', worker = ?, token = ?, "
+                              "expires = ?, attempts = ? WHERE position = ?",
+                              (self.worker, token, now + self.lease_time, attempts + 1,
+                               position))
+                    break
+                c.execute("UPDATE tasks SET state = 'failed', error = 'lease expired' "
+                          "WHERE position = ?", (position,))
+            if row is None:
+                position = int(c.execute("SELECT value FROM meta WHERE key = 'next_position'"
+                                         ).fetchone()[0])
+                if position >= self.total:
+                    c.execute("COMMIT")
+                    return None
+                attempts = 0
+                c.execute("UPDATE meta SET value = ? WHERE key = 'next_position'",
+                          (str(position + 1),))
+                c.execute("INSERT INTO tasks VALUES (?, 'leased', ?, ?, ?, 1, NULL)",
+                          (position, self.worker, token, now + self.lease_time))
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+        return Task(position, self._point(position), attempts + 1, token)
+
+    def _update(self, task, assignments, values):
+        cursor = self._connection.execute(
+            "UPDATE tasks SET %s WHERE position = ? AND token = ? AND state = 'leased'"
+            % assignments, tuple(values) + (task.position, task.token))
+        if cursor.rowcount == 0:
+            raise LeaseLost("Task %d has been leased by another worker" % task.position)
+
+    def heartbeat(self, task):
+        """
+        Renew the lease of `task` for `lease_time` seconds. Raises `LeaseLost`
+        if the task has already been leased again by another worker.
+        """
+        self._update(task, "expires = ?", (time.time() + self.lease_time,))
+
+    def complete(self, task):
+        """Mark `task` as done."""
+        self._update(task, "state = 'done'", ())
+
+    def fail(self, task, error=''):
+        """
+        Mark `task` as failed, with an `error` message. It will be leased
+        again unless it has already been tried `max_attempts` times.
+        """
+        state = 'pending' if task.attempt < self.max_attempts else 'failed'
+        self._update(task, "state = ?, error = ?", (state, error))
+
+    def __iter__(self):
+        """Lease tasks until there are none left."""
+        while True:
+            task = self.lease()
+            if task is None:
+                return
+            yield task
+
+    def counts(self):
+        """
+        Return a dict of the number of tasks which are 'new' (never leased),
+        'pending' (to be retried), 'leased', 'done' or 'failed'.
+        """
+        counts = dict.fromkeys(('pending', 'leased', 'done', 'failed'), 0)
+        counts.update(self._connection.execute(
+            "SELECT state, COUNT(*) FROM tasks GROUP BY state"))
+        counts['new'] = self.total - sum(counts.values())
+        return counts
+
+    def failures(self):
+        """Return a list of (position, error) pairs for the tasks which have failed for good."""
+        return list(self._connection.execute(
+            "SELECT position, error FROM tasks WHERE state = 'failed' ORDER BY position"))
+
+    def finished(self):
+        """Return True if every task is either done or has failed for good."""
+        counts = self.counts()
+        return counts['done'] + counts['failed'] == self.total
+
+    def close(self):
+        self._connection.close()
+
+    def __getstate__(self):
+        return {'filename': self.filename, 'lease_time': self.lease_time,
+                'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __repr__(self):
+        return 'WorkQueue(%r)' % self.filename
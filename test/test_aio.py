@@ -0,0 +1,127 @@
+"""
+Unit tests for the parameters.aio module
+"""
+
+from __future__ import absolute_import
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from parameters import ParameterSet, ParameterSpace, ParameterRange, NormalDist
+
+if sys.version_info >= (3, 7):
+    import asyncio
+    from parameters.aio import amap
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "requires Python 3.7 or later")
+class AsyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.space = ParameterSpace({'a': ParameterRange([1, 2, 3]),
+                                     'b': ParameterRange([10, 20, 30, 40]),
+                                     'x': NormalDist(rng=1)})
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_aload_with_includes(self):
+        sub = os.path.join(self.directory, 'sub.param')
+        main = os.path.join(self.directory, 'main.param')
+        with open(sub, 'w') as f:
+            f.write("{'tau': 10.0, 'deeper': url(%r)}" % os.path.join(self.directory, 'deep.param'))
+        with open(os.path.join(self.directory, 'deep.param'), 'w') as f:
+            f.write("{'z': 3}")
+        with open(main, 'w') as f:
+            f.write("{'cell': url(%r), 'n': 2}" % sub)
+        ps = run(ParameterSet.aload(main))
+        self.assertEqual(ps, ParameterSet(main))
+        self.assertEqual(ps.cell.deeper.z, 3)
+        self.assertEqual(ps.cell._url, sub)
+
+    def test_aload_includes_in_lists(self):
+        sub = os.path.join(self.directory, 'sub.param')
+        main = os.path.join(self.directory, 'main.param')
+        with open(sub, 'w') as f:
+            f.write("{'tau': 10.0}")
+        with open(main, 'w') as f:
+            f.write("{'cells': [url(%r), {'x': [1, url(%r)]}], 'n': 2}" % (sub, sub))
+        ps = run(ParameterSet.aload(main))
+        self.assertEqual(ps.cells[0].tau, 10.0)
+        self.assertEqual(ps.cells[1]['x'][1].tau, 10.0)
+        self.assertEqual(ps, ParameterSet(main))
+
+    def test_aload_yaml(self):
+        filename = os.path.join(self.directory, 'cell.yaml')
+        with open(filename, 'w') as f:
+            f.write("cell:\n  tau_m: 10.0\n  syn: [1, 2]\nn: 2\n")
+        ps = run(ParameterSet.aload(filename))
+        self.assertEqual(ps.as_dict(), {'cell': {'tau_m': 10.0, 'syn': [1, 2]}, 'n': 2})
+        self.assertIsInstance(ps.cell, ParameterSet)
+        self.assertEqual(ps._url, filename)
+
+    def test_aiter_inner(self):
+        steps = []
+
+        async def ticker():
+            while True:
+                steps.append(len(points))
+                await asyncio.sleep(0)
+
+        async def collect():
+            task = asyncio.ensure_future(ticker())
+            async for p in self.space.aiter_inner(batch=5, copy=True):
+                points.append((p.a, p.b))
+            task.cancel()
+        points = []
+        run(collect())
+        self.assertEqual(points, [(p.a, p.b) for p in self.space.iter_inner()])
+        # the ticker ran between the batches
+        self.assertEqual(steps[:2], [5, 10])
+
+    def test_arealize_dists(self):
+        async def collect():
+            return [p.x async for p in self.space.arealize_dists(7, batch=2)]
+        self.assertEqual(len(run(collect())), 7)
+
+    def test_amap(self):
+        running = [0, 0]
+
+        async def model(p):
+            running[0] += 1
+            running[1] = max(running)
+            await asyncio.sleep(0.001*(p.a % 2))
+            running[0] -= 1
+            return p.a*p.b
+
+        async def collect():
+            return [(p.a, p.b, result) async for p, result in
+                    amap(model, self.space.aiter_inner(copy=True), limit=3)]
+        results = run(collect())
+        self.assertEqual(sorted(results),
+                         sorted((p.a, p.b, p.a*p.b) for p in self.space.iter_inner()))
+        self.assertEqual(running[1], 3)
+
+    def test_amap_error(self):
+        async def model(p):
+            if p.a == 2:
+                raise RuntimeError("diverged")
+            return p.a
+
+        async def collect():
+            return [r async for r in amap(model, list(self.space.iter_inner(copy=True)))]
+        self.assertRaises(RuntimeError, run, collect())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for the parameters.instrumentation module
+"""
+
+from __future__ import absolute_import
+import unittest
+import shutil
+import tempfile
+import os
+from parameters import ParameterSet, ParameterSpace, ParameterRange, \
+    ParameterReference, NormalDist, instrumentation
+from parameters.validators import ParameterSchema, CongruencyValidator
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def setUp(self):
+        instrumentation.disable()
+        instrumentation.reset()
+        self.ps = ParameterSet({'a': {'b': {'c': 1, 'd': 2}, 'e': 3}, 'f': 4})
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled_by_default(self):
+        self.ps['a.b.c']
+        self.ps.tree_copy()
+        self.assertEqual(instrumentation.snapshot(), {'counters': {}, 'timers': {}})
+
+    def test_getitem_depth(self):
+        with instrumentation.measure() as m:
+            self.assertEqual(self.ps['a.b.c'], 1)
+            self.assertEqual(self.ps['f'], 4)
+            self.assertEqual(self.ps.a.e, 3)
+        self.assertEqual(m.counters['getitem'], 4)
+        self.assertEqual(m.counters['getitem.depth'], 3 + 1 + 1 + 1)
+        self.assertRaises(KeyError, self.ps.__getitem__, 'a.x.c')
+        self.assertFalse(instrumentation.enabled)
+
+    def test_nested_subclass_lookup(self):
+        class Defaults(ParameterSet):
+            def __getitem__(self, name):
+                try:
+                    return ParameterSet.__getitem__(self, name)
+                except KeyError:
+                    return 0
+
+        ps = ParameterSet({'a': 1})
+        dict.__setitem__(ps, 'd', Defaults({'x': 2}))
+        with instrumentation.measure() as m:
+            self.assertEqual(ps['d.x'], 2)
+            self.assertEqual(ps['d.missing'], 0)
+        self.assertEqual(m.counters['getitem'], 2)
+
+    def test_internal_lookups_not_counted(self):
+        space = ParameterSpace({'a': {'x': NormalDist(rng=1), 'y': 1},
+                                'b': ParameterRange([1, 2])})
+        with instrumentation.measure() as m:
+            space.tree_copy()
+            list(space.realize_dists(5))
+            space.parameter_space_dimension_labels()
+        self.assertNotIn('getitem', m.counters)
+
+    def test_tree_copy(self):
+        with instrumentation.measure() as m:
+            copy = self.ps.tree_copy()
+        self.assertEqual(copy, self.ps)
+        self.assertEqual(m.counters['tree_copy'], 1)
+        self.assertEqual(m.counters['tree_copy.nodes'], 3)
+
+    def test_references(self):
+        ps = ParameterSet({'a': 1, 'b': ParameterReference('a')*2,
+                           'c': ParameterReference('a')})
+        with instrumentation.measure() as m:
+            ps.replace_references()
+        self.assertEqual(ps.b, 2)
+        self.assertEqual(m.counters['reference.evaluate'], 2)
+
+    def test_load_and_validate(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'params.txt')
+            self.ps.save(filename)
+            with instrumentation.measure() as m:
+                ps = ParameterSet(filename)
+                ParameterSet("{'x': 1}")
+                CongruencyValidator().validate(ps, ParameterSchema(self.ps))
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(m.timers['load']['count'], 1)
+        self.assertEqual(m.timers['load:' + filename]['count'], 1)
+        self.assertEqual(m.timers['parse']['count'], 2)
+        self.assertEqual(m.timers['validate']['count'], 1)
+        self.assertNotIn('fetch', m.timers)
+        self.assertTrue(m.timers['load']['seconds'] >= m.timers['load:' + filename]['seconds'] >= 0)
+
+    def test_snapshot_and_nested_measure(self):
+        instrumentation.enable()
+        self.ps['a.e']
+        with instrumentation.measure() as m:
+            self.ps['a.b']
+        self.assertTrue(instrumentation.enabled)
+        self.assertEqual(m.counters, {'getitem': 1, 'getitem.depth': 2})
+        self.assertEqual(instrumentation.snapshot()['counters'],
+                         {'getitem': 2, 'getitem.depth': 4})
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot()['counters'], {})
+
+    def test_callbacks(self):
+        events = []
+        callback = lambda kind, name, value: events.append((kind, name, value))
+        instrumentation.add_callback(callback)
+        try:
+            with instrumentation.measure():
+                self.ps['a.b.c']
+                ParameterSet("{'x': 1}")
+        finally:
+            instrumentation.remove_callback(callback)
+        self.assertEqual(events[:2], [('count', 'getitem', 1), ('count', 'getitem.depth', 3)])
+        self.assertEqual([e[:2] for e in events[2:]], [('time', 'parse')])
+
+
+if __name__ == '__main__':
+    unittest.main()
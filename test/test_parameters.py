@@ -13,6 +13,7 @@ import unittest
 import types
 from copy import deepcopy
 import pickle
+import gc
 import numpy
 
 try:
@@ -46,6 +47,21 @@ except ImportError:
 #        self.assertFalse(NeuroTools.parameters.have_scipy)
 
 
+class LazyImportTest(unittest.TestCase):
+
+    def test_heavy_dependencies_not_imported(self):
+        import subprocess
+        code = ("import sys, parameters, parameters.random; "
+                "parameters.ParameterSet({'x': parameters.random.NormalDist()}); "
+                "print(' '.join(sys.modules))")
+        p = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             universal_newlines=True)
+        loaded = p.communicate()[0].split()
+        for name in ('numpy', 'scipy', 'urllib.request'):
+            self.assertFalse(name in loaded, "%s imported eagerly" % name)
+
+
 class ParameterRangeTest(unittest.TestCase):
 
     def test_simple_create(self):
@@ -73,6 +89,50 @@ class ParameterRangeTest(unittest.TestCase):
     def test_invalid_create(self):
         self.assertRaises(TypeError, ParameterRange, 555, name="invalid")
 
+    def test_linspace(self):
+        pr = ParameterRange.linspace(0, 1, 11, units="mV")
+        self.assertEqual(len(pr), 11)
+        self.assertEqual(list(pr), list(numpy.linspace(0, 1, 11)))
+        self.assertEqual(pr.index(0.3), 3)
+        self.assertEqual(pr.index(1), 10)
+        self.assertRaises(ValueError, pr.index, 0.35)
+        self.assertRaises(ValueError, pr.index, 1.1)
+        self.assertEqual(repr(pr), 'ParameterRange.linspace(0, 1, 11, units="mV")')
+        pr = ParameterRange.linspace(0.0, 1.0, 4, endpoint=False)
+        self.assertEqual(list(pr), [0.0, 0.25, 0.5, 0.75])
+
+    def test_lazy_range_is_not_materialized(self):
+        pr = ParameterRange.linspace(0.0, 1.0, 10**9)
+        self.assertEqual(len(pr), 10**9)
+        self.assertEqual(pr._values[-1], 1.0)
+        self.assertEqual(pr.index(pr._values[123456789]), 123456789)
+        self.assertEqual(ParameterRange.arange(10**12).index(999), 999)
+
+    def test_logspace_and_arange(self):
+        pr = ParameterRange.logspace(0, 3, 4)
+        self.assertEqual(list(pr), [1.0, 10.0, 100.0, 1000.0])
+        self.assertEqual(pr.index(100), 2)
+        pr = ParameterRange.logspace(0, 2, 3, base=2)
+        self.assertEqual(list(pr), [1.0, 2.0, 4.0])
+        self.assertEqual(list(ParameterRange.arange(5)), [0, 1, 2, 3, 4])
+        self.assertEqual(list(ParameterRange.arange(5, 0, -2)), [5, 3, 1])
+        self.assertEqual(list(ParameterRange.arange(0.0, 1.0, 0.25)), [0.0, 0.25, 0.5, 0.75])
+        self.assertEqual(ParameterRange.arange(3), ParameterRange([0, 1, 2]))
+        self.assertRaises(ValueError, ParameterRange.arange, 0, 1, 0)
+        pr = ParameterRange.arange(-0.3, 0.3, 0.1)
+        self.assertEqual(pr.index(0.0), 3)
+        self.assertTrue(0.0 in pr._values)
+        self.assertFalse(1e-9 in pr._values)
+
+    def test_lazy_range_save(self):
+        ps = ParameterSpace({'a': ParameterRange.linspace(-1.0, 1.0, 10**6),
+                             'b': ParameterRange.logspace(0, 3, 4, base=2.0)})
+        s = ps.pretty()
+        self.assertTrue(len(s) < 200)
+        ps2 = ParameterSpace(s)
+        self.assertEqual(ps2, ps)
+        self.assertEqual(ps2.parameter_space_index(ParameterSet({'a': 1.0, 'b': 4.0})), (999999, 2))
+
 
 class ParameterSetCreateTest(unittest.TestCase):
 
@@ -227,6 +287,61 @@ class ParameterSetFlattenTest(unittest.TestCase):
         self.assertEqual(D, self.ps.flatten())
 
 
+class FromFlatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSet({'a': {'b': {'c': 1, 'd': [1, 2]}, 'e': 'x'},
+                                'f': None, 'g': {}})
+
+    def test_from_flat(self):
+        ps = ParameterSet.from_flat(self.ps.flatten())
+        self.assertEqual(ps, ParameterSet({'a': {'b': {'c': 1, 'd': [1, 2]}, 'e': 'x'},
+                                           'f': None}))
+        self.assertIsInstance(ps['a.b'], ParameterSet)
+        self.assertEqual(ps['a.b'].label, 'b')
+        self.assertEqual(ParameterSet.from_flat({}), ParameterSet({}))
+        self.assertIsInstance(ParameterSpace.from_flat({'x': 1}), ParameterSpace)
+
+    def test_order(self):
+        ps = ParameterSet.from_flat({'cell.tau_m': 10.0, 'dt': 0.1, 'cell.cm': 0.25})
+        self.assertEqual(list(ps), ['cell', 'dt'])
+        self.assertEqual(list(ps.cell), ['tau_m', 'cm'])
+        self.assertEqual(ParameterSet.from_flat(self.ps.flatten()).pretty(),
+                         ParameterSet({'a': {'b': {'c': 1, 'd': [1, 2]}, 'e': 'x'},
+                                       'f': None}).pretty())
+        runs = ParameterSet.from_columns({'c': [1], 'a.b': [2], 'd': [3]})
+        self.assertEqual(list(runs[0]), ['c', 'a', 'd'])
+
+    def test_conflict(self):
+        self.assertRaises(ValueError, ParameterSet.from_flat, {'a.b': 1, 'a': 2})
+        self.assertRaises(ValueError, ParameterSet.from_flat, {'a.b.c': 1, 'a.b': 2})
+        self.assertRaises(ValueError, ParameterSet.from_columns, {'a': [2], 'a.b': [1]})
+
+    def test_from_columns(self):
+        runs = ParameterSet.from_columns({'a.b': [1, 2, 3], 'c': ['x', 'y', 'z']})
+        self.assertEqual(runs, [ParameterSet({'a': {'b': 1}, 'c': 'x'}),
+                                ParameterSet({'a': {'b': 2}, 'c': 'y'}),
+                                ParameterSet({'a': {'b': 3}, 'c': 'z'})])
+        self.assertIsNot(runs[0]['a'], runs[1]['a'])
+        self.assertEqual(ParameterSet.from_columns({}), [])
+        self.assertRaises(ValueError, ParameterSet.from_columns,
+                          {'a.b': [1, 2, 3], 'c': [1, 2]})
+
+    def test_from_numpy_columns(self):
+        runs = ParameterSet.from_columns({'a.b': numpy.arange(3.0),
+                                          'a.w': numpy.zeros((3, 2))})
+        self.assertEqual(runs[2]['a.b'], 2.0)
+        self.assertIs(type(runs[2]['a.b']), float)
+        self.assertEqual(runs[1]['a.w'].shape, (2,))
+        table = numpy.zeros(2, dtype=[('cell.tau_m', float), ('n', int)])
+        table['cell.tau_m'] = [10.0, 20.0]
+        table['n'] = [5, 6]
+        runs = ParameterSet.from_columns(table)
+        self.assertEqual(runs, [ParameterSet({'cell': {'tau_m': 10.0}, 'n': 5}),
+                                ParameterSet({'cell': {'tau_m': 20.0}, 'n': 6})])
+        self.assertIs(type(runs[1]['n']), int)
+
+
 class ParameterSetMiscTest(unittest.TestCase):
 
     def setUp(self):
@@ -281,6 +396,77 @@ class ParameterSetDiffTest(unittest.TestCase):
         self.assertEqual(ps2 - self.ps, ({'yourlist': [100, 2, {'e': 55, 'f': 6}]},
                                          {'yourlist': [1, 2, {'e': 5, 'f': 6}]}))    
 
+    def test_diff_added_and_removed(self):
+        ps2 = ParameterSet(self.ps.as_dict())
+        ps2.ps2.ps.z = 26
+        del ps2['mydict']
+        self.assertEqual(self.ps - ps2, ({'mydict': {'c': 3, 'd': 4}},
+                                         {'ps2': {'ps': {'z': 26}}}))
+
+    def test_diff(self):
+        ps2 = ParameterSet(self.ps.as_dict())
+        ps2.ps2.ps.b = 3
+        ps2.ps2.ps.z = 26
+        del ps2['mydict']
+        ps2.hello = {'to': 'world'}
+        self.assertEqual(self.ps.diff(ps2), [
+            Change('changed', 'hello', 'world', {'to': 'world'}),
+            Change('removed', 'mydict', {'c': 3, 'd': 4}, MISSING),
+            Change('changed', 'ps2.ps.b', 2, 3),
+            Change('added', 'ps2.ps.z', MISSING, 26)])
+        self.assertEqual(self.ps.diff(self.ps.tree_copy()), [])
+        self.assertEqual(pickle.loads(pickle.dumps(self.ps.diff(ps2))), self.ps.diff(ps2))
+
+    def test_diff_arrays(self):
+        ps1 = ParameterSet({'a': {'w': numpy.arange(3.0), 'x': float('nan')}, 'b': 1})
+        ps2 = ParameterSet({'a': {'w': numpy.arange(3.0), 'x': float('nan')}, 'b': 1})
+        self.assertEqual(ps1.diff(ps2), [])
+        ps2['a.w'] = numpy.arange(3.0) + 1
+        changes = ps1.diff(ps2)
+        self.assertEqual([(c.kind, c.path) for c in changes], [('changed', 'a.w')])
+
+    def test_apply_patch(self):
+        ps2 = ParameterSet(self.ps.as_dict())
+        ps2.ps2.ps.b = 3
+        ps2.ps2.ps.z = 26
+        ps2.ps2.new = ParameterSet({'x': 1})
+        del ps2['mydict']
+        patched = self.ps.tree_copy().apply_patch(self.ps.diff(ps2))
+        self.assertEqual(patched, ps2)
+        self.assertEqual(patched.diff(ps2), [])
+        self.assertFalse(patched.ps2.new is ps2.ps2.new)
+        self.assertRaises(ValueError, patched.apply_patch, self.ps.diff(ps2))
+        self.assertEqual(patched, ps2)
+
+    def test_merge3(self):
+        ours = self.ps.tree_copy()
+        ours.hello = 'universe'
+        ours.ps2.ps.a = 10
+        theirs = self.ps.tree_copy()
+        theirs.ps2.c = 20
+        theirs.ps2.ps.a = 10
+        del theirs['null']
+        merged, conflicts = merge3(self.ps, ours, theirs)
+        self.assertEqual(conflicts, [])
+        self.assertEqual(merged.hello, 'universe')
+        self.assertEqual(merged.ps2.c, 20)
+        self.assertEqual(merged.ps2.ps.a, 10)
+        self.assertFalse('null' in merged)
+        self.assertEqual(ours.ps2.c, 19)
+
+    def test_merge3_conflicts(self):
+        ours = self.ps.tree_copy()
+        ours.ps2.ps.a = 10
+        ours.hello = 'universe'
+        theirs = self.ps.tree_copy()
+        del theirs.ps2['ps']
+        theirs.hello = 'there'
+        merged, conflicts = merge3(self.ps, ours, theirs)
+        self.assertEqual([c.path for c in conflicts], ['hello', 'ps2.ps'])
+        self.assertEqual(conflicts[1].ours, [Change('changed', 'ps2.ps.a', 1, 10)])
+        self.assertEqual(merged.hello, 'universe')
+        self.assertEqual(merged.ps2.ps.a, 10)
+
 
 class ParameterSpaceDotAccess(unittest.TestCase):
 
@@ -382,6 +568,296 @@ class ParameterSpaceIterationTest(unittest.TestCase):
                           ParameterSet({'x': 3, 'foo': {}, 'name': {'y': 1.1}}))
 
 
+class RandomOrderIterationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSpace({'a': ParameterRange([1, 2, 3]),
+                                  'b': {'c': ParameterRange.arange(7)},
+                                  'd': ParameterRange(['x', 'y'])})
+
+    def points(self, **kwargs):
+        return [(p.a, p.b.c, p.d) for p in self.ps.iter_inner(**kwargs)]
+
+    def test_visits_every_point_once(self):
+        sequential = self.points()
+        shuffled = self.points(order='random', seed=5)
+        self.assertEqual(len(shuffled), 42)
+        self.assertEqual(sorted(shuffled), sorted(sequential))
+        self.assertNotEqual(shuffled, sequential)
+
+    def test_seed(self):
+        self.assertEqual(self.points(order='random', seed=5),
+                         self.points(order='random', seed=5))
+        self.assertNotEqual(self.points(order='random', seed=5),
+                            self.points(order='random', seed=6))
+
+    def test_resume(self):
+        shuffled = self.points(order='random', seed=5)
+        self.assertEqual(self.points(order='random', seed=5, start=30), shuffled[30:])
+        self.assertEqual(self.points(start=40), self.points()[40:])
+
+    def test_returns_ParameterSet(self):
+        out = list(self.ps.iter_inner(order='random', seed=1, copy=True))
+        self.assertFalse(isinstance(out[0], ParameterSpace))
+        self.assertNotEqual(out[0], out[1])
+
+    def test_point(self):
+        for i, p in enumerate(self.ps.iter_inner()):
+            self.assertEqual(self.ps.point(i), p)
+        self.assertRaises(IndexError, self.ps.point, 42)
+
+    def test_unknown_order(self):
+        self.assertRaises(ValueError, self.ps.iter_inner, order='sorted')
+
+    def test_permutation(self):
+        for n in (0, 1, 2, 5, 64, 1000):
+            self.assertEqual(sorted(IndexPermutation(n, seed=3)), list(range(n)))
+        p = IndexPermutation(10**12, seed=3)
+        self.assertTrue(0 <= p[10**12 - 1] < 10**12)
+
+class LinkedRangeAndConstraintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSpace({'cell': {'tau_m': ParameterRange([5, 10, 20])},
+                                  'syn': {'tau': ParameterRange([1, 2, 5, 10, 30])},
+                                  'a': ParameterRange([1, 2, 3], link='g'),
+                                  'b': ParameterRange(['x', 'y', 'z'], link='g')})
+
+    def test_linked_ranges(self):
+        points = [(p.a, p.b) for p in self.ps.iter_inner()]
+        self.assertEqual(self.ps.num_conditions(), 45)
+        self.assertEqual(len(points), 45)
+        self.assertEqual(sorted(set(points)), [(1, 'x'), (2, 'y'), (3, 'z')])
+
+    def test_linked_ranges_must_have_same_length(self):
+        self.ps.c = ParameterRange([1, 2], link='g')
+        self.assertRaises(ValueError, self.ps.iter_inner)
+
+    def test_link_is_saved(self):
+        ps = ParameterSpace(self.ps.pretty())
+        self.assertEqual(ps.b.link, 'g')
+        self.assertEqual(ps, self.ps)
+
+    def test_constraint(self):
+        self.ps.constrain("syn.tau < cell.tau_m")
+        points = [(p.syn.tau, p.cell.tau_m) for p in self.ps.iter_inner()]
+        self.assertEqual(self.ps.num_conditions(), 27)
+        self.assertEqual(len(points), 27)
+        self.assertTrue(all(tau < tau_m for tau, tau_m in points))
+        shuffled = [(p.a, p.syn.tau, p.cell.tau_m)
+                    for p in self.ps.iter_inner(order='random', seed=2)]
+        self.assertEqual(len(shuffled), 27)
+        self.assertEqual(shuffled[10:],
+                         [(p.a, p.syn.tau, p.cell.tau_m)
+                          for p in self.ps.iter_inner(order='random', seed=2, start=10)])
+
+    def test_constraints_prune(self):
+        calls = []
+
+        def condition(ps):
+            calls.append(ps.a)
+            return ps.a != 2
+        self.ps.constrain(condition, keys=['a'])
+        self.assertEqual(self.ps.num_conditions(), 30)
+        self.assertEqual(len(calls), 3)
+        del calls[:]
+        self.assertEqual(len(list(self.ps.iter_inner())), 30)
+        self.assertEqual(len(calls), 3)
+
+    def test_resume_and_point(self):
+        self.ps.constrain("syn.tau < cell.tau_m").constrain("a + syn.tau != 3")
+        points = list(self.ps.iter_inner(copy=True))
+        self.assertEqual(len(points), self.ps.num_conditions())
+        self.assertEqual(list(self.ps.iter_inner(start=7, copy=True)), points[7:])
+        self.assertEqual(self.ps.point(5), points[5])
+        self.assertRaises(IndexError, self.ps.point, len(points))
+
+    def test_tree_copy_keeps_constraints(self):
+        self.ps.constrain("syn.tau < cell.tau_m")
+        self.assertEqual(self.ps.tree_copy().num_conditions(), 27)
+
+    def test_copies_keep_constraints(self):
+        self.ps.constrain("syn.tau < cell.tau_m")
+        self.assertEqual(pickle.loads(pickle.dumps(self.ps)).num_conditions(), 27)
+        self.assertEqual(deepcopy(self.ps).num_conditions(), 27)
+        self.assertEqual(ParameterSpace(self.ps.pretty()).num_conditions(), 27)
+        self.assertEqual(ParameterSpace(self.ps).num_conditions(), 27)
+
+    def test_save_and_load_constraints(self):
+        import tempfile
+        filename = os.path.join(tempfile.mkdtemp(), 'space.param')
+        self.ps.constrain("syn.tau < cell.tau_m").constrain("a + syn.tau != 3")
+        self.ps.save(filename)
+        loaded = ParameterSpace(filename)
+        self.assertEqual([c.condition for c in loaded.constraints],
+                         ["syn.tau < cell.tau_m", "a + syn.tau != 3"])
+        self.assertEqual(list(loaded.iter_inner(copy=True)), list(self.ps.iter_inner(copy=True)))
+        os.remove(filename)
+
+    def test_function_constraints_cannot_be_pickled_or_saved(self):
+        self.ps.constrain(lambda ps: ps.a != 2, keys=['a'])
+        self.assertRaises(pickle.PicklingError, pickle.dumps, self.ps)
+        self.assertRaises(ValueError, self.ps.save, 'space.param')
+        self.assertEqual(deepcopy(self.ps).num_conditions(), 30)
+        self.assertIn('# constraint not saved', self.ps.pretty())
+
+class SweepCursorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSpace({'a': ParameterRange([1, 2, 3]),
+                                  'b': ParameterRange([10, 20, 30, 40]),
+                                  'x': NormalDist(rng=7),
+                                  'y': [UniformDist(rng=8), 5]})
+
+    def test_resume_iter_inner(self):
+        for order in ('sequential', 'random'):
+            expected = [(p.a, p.b) for p in self.ps.iter_inner(order=order, seed=3)]
+            cursor = SweepCursor(order=order, seed=3)
+            points = []
+            for p in self.ps.iter_inner(cursor=cursor):
+                points.append((p.a, p.b))
+                if len(points) == 5:
+                    break
+            self.assertEqual(cursor.position, 5)
+            points.extend((p.a, p.b) for p in self.ps.iter_inner(cursor=cursor))
+            self.assertEqual(points, expected)
+            self.assertEqual(cursor.position, 12)
+
+    def test_random_seed_is_stored(self):
+        cursor = SweepCursor(order='random')
+        first = [(p.a, p.b) for p in self.ps.iter_inner(cursor=cursor)]
+        self.assertTrue(cursor.seed is not None)
+        self.assertEqual(first, [(p.a, p.b) for p in
+                                 self.ps.iter_inner(order='random', seed=cursor.seed)])
+
+    def test_resume_realize_dists(self):
+        cursor = SweepCursor()
+        points = []
+        for p in self.ps.realize_dists(10, cursor=cursor):
+            points.append((p.x, p.y[0], p.y[1]))
+            if len(points) == 4:
+                break
+        self.ps.x.next(3)  # the generators move on before the restart
+        points.extend((p.x, p.y[0], p.y[1]) for p in self.ps.realize_dists(10, cursor=cursor))
+        self.assertEqual(cursor.position, 10)
+        self.setUp()
+        self.assertEqual(points, [(p.x, p.y[0], p.y[1])
+                                  for p in self.ps.realize_dists(10, cursor=SweepCursor())])
+
+    def test_resume_draws_remaining_points(self):
+        cursor = SweepCursor()
+        for p in self.ps.realize_dists(4, cursor=cursor):
+            pass
+        self.setUp()
+        resumed = SweepCursor(position=4, rng_states=cursor.rng_states)
+        draws = []
+        draw = self.ps.x._draw
+        self.ps.x._draw = lambda n: draws.append(n) or draw(n)
+        rest = [p.x for p in self.ps.realize_dists(10, cursor=resumed)]
+        self.assertEqual(sum(draws), 6)
+        self.setUp()
+        expected = [p.x for p in self.ps.realize_dists(10, cursor=SweepCursor())]
+        self.assertEqual(rest, expected[4:])
+
+    def test_save_load(self):
+        import tempfile
+        cursor = SweepCursor(order='random', seed=3)
+        for p in self.ps.realize_dists(3, cursor=cursor):
+            pass
+        filename = os.path.join(tempfile.mkdtemp(), 'sweep.cursor')
+        cursor.save(filename)
+        cursor.save(filename)
+        try:
+            self.assertEqual(SweepCursor.load(filename), cursor)
+        finally:
+            os.remove(filename)
+
+class ParameterSpaceDifferenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.old = ParameterSpace({'a': ParameterRange([1, 2, 3]),
+                                   'b': {'c': ParameterRange.linspace(0, 1, 11)},
+                                   'k': 5})
+
+    def points(self, space):
+        return sorted((p.a, p.b.c, p.k) for p in space.iter_inner())
+
+    def check(self, new):
+        difference = new.difference(self.old)
+        intersection = new.intersection(self.old)
+        old_points = set(self.points(self.old))
+        new_points = self.points(new)
+        self.assertEqual(self.points(difference),
+                         [p for p in new_points if p not in old_points])
+        self.assertEqual(self.points(intersection),
+                         [p for p in new_points if p in old_points])
+        self.assertEqual(difference.num_conditions() + intersection.num_conditions(),
+                         new.num_conditions())
+        return difference
+
+    def test_extended_range(self):
+        new = self.old.tree_copy()
+        new.a = ParameterRange([1, 2, 3, 4, 5])
+        difference = self.check(new)
+        self.assertEqual(len(difference), 1)
+        self.assertEqual(difference[0].a, ParameterRange([4, 5]))
+        # the unchanged range is not expanded
+        self.assertEqual(repr(difference[0].b.c), 'ParameterRange.linspace(0, 1, 11)')
+
+    def test_several_changes(self):
+        new = self.old.tree_copy()
+        new.a = ParameterRange([2, 3, 4])
+        new.b.c = ParameterRange.linspace(0, 1, 21)
+        self.assertEqual(len(self.check(new)), 2)
+
+    def test_fixed_value_changed(self):
+        new = self.old.tree_copy()
+        new.k = 6
+        self.assertEqual(self.check(new).num_conditions(), 33)
+        self.assertEqual(len(new.intersection(self.old)), 0)
+
+    def test_identical(self):
+        self.assertEqual(len(self.check(self.old.tree_copy())), 0)
+
+    def test_linked_and_constrained(self):
+        new = ParameterSpace({'a': ParameterRange([1, 2, 3], link='g'),
+                              'b': {'c': ParameterRange([0.0, 0.5, 2.0], link='g')},
+                              'k': ParameterRange([5, 6])})
+        self.check(new)
+        self.old.constrain('a < 3')
+        self.check(new)
+
+    def test_large_lazy_range_not_enumerated(self):
+        old = ParameterSpace({'a': ParameterRange.arange(10**9), 'b': ParameterRange([1, 2])})
+        new = old.tree_copy()
+        new.b = ParameterRange([1, 2, 3])
+        difference = new.difference(old)
+        self.assertEqual(difference.num_conditions(), 10**9)
+        self.assertEqual(repr(difference[0].a), 'ParameterRange.arange(0, 1000000000)')
+        self.assertEqual(difference[0].b, 3)
+        self.assertEqual(new.intersection(old).num_conditions(), 2*10**9)
+
+    def test_constrained_difference_can_be_saved(self):
+        import tempfile
+        new = ParameterSpace({'a': ParameterRange([1, 2, 3, 4]), 'b': {'c': 0.5}, 'k': 5})
+        self.old.constrain('a < 3')
+        difference = new.difference(self.old)
+        copy = pickle.loads(pickle.dumps(difference[0]))
+        self.assertEqual(self.points(copy), self.points(difference))
+        filename = os.path.join(tempfile.mkdtemp(), 'difference.param')
+        difference[0].save(filename)
+        try:
+            loaded = ParameterSpace(filename)
+        finally:
+            os.remove(filename)
+        self.assertEqual(self.points(loaded), [(3, 0.5, 5), (4, 0.5, 5)])
+        self.assertEqual(self.points(new.intersection(self.old)), [(1, 0.5, 5), (2, 0.5, 5)])
+
+    def test_includes(self):
+        self.assertTrue(self.old.includes({'a': 2, 'b': {'c': 0.3}, 'k': 5}))
+        self.assertFalse(self.old.includes({'a': 2, 'b': {'c': 0.35}, 'k': 5}))
+        self.assertFalse(self.old.includes({'a': 2, 'b': {'c': 0.3}}))
+
 class ParameterSpaceWithDistributionsTest(unittest.TestCase):
 
     def setUp(self):
@@ -395,6 +871,17 @@ class ParameterSpaceWithDistributionsTest(unittest.TestCase):
     def test_dist_keys(self):
         self.assertEqual(set(self.ps.dist_keys()), set(['g', 'l', 'd.g2']))
 
+    def test_new_dists_in_string_format(self):
+        ps = ParameterSpace({'a': ChoiceDist(['x', 'y']),
+                             'b': TruncatedNormalDist(min=0.0),
+                             'c': {'d': RandIntDist(0, 5), 'e': LogNormalDist()}})
+        ps2 = ParameterSpace(ps.pretty())
+        self.assertEqual(ps, ps2)
+        self.assertEqual(set(ps2.dist_keys()), set(['a', 'b', 'c.d', 'c.e']))
+        for p in ps2.realize_dists(n=3):
+            self.assertTrue(p.a in ('x', 'y'))
+            self.assertTrue(p.b >= 0.0)
+
     @unittest.skipUnless(have_scipy, "SciPy not available")
     def test_realize_dists_with_copy_True(self):
         gen = self.ps.realize_dists(n=2, copy=True)
@@ -424,6 +911,37 @@ class ParameterSpaceWithDistributionsTest(unittest.TestCase):
         self.assertEqual(output[0].l[2], output[1].l[2])
 
 
+class ParameterSpaceSampleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSpace({'g': GammaDist(mean=2.0, std=0.5),
+                                  'l': [NormalDist(), 'a string'],
+                                  'd': {'u': UniformDist(min=0.0, max=10.0), 'x': 0},
+                                  'r': ParameterRange([1, 2, 3, 4])})
+
+    def test_lhs(self):
+        output = list(self.ps.sample(10, seed=1, block_size=3, copy=True))
+        self.assertEqual(len(output), 10)
+        # the space of UniformDist is stratified
+        self.assertEqual(sorted(int(p.d.u) for p in output), list(range(10)))
+        self.assertEqual(output[0].l[1], 'a string')
+        self.assertEqual(output[0].d.x, 0)
+        self.assertTrue(isinstance(output[0].r, ParameterRange))
+        again = list(self.ps.sample(10, seed=1, copy=True))
+        self.assertEqual(output, again)
+
+    def test_with_ranges(self):
+        for method in ('lhs', 'sobol', 'halton'):
+            output = list(self.ps.sample(8, method=method, ranges=True, copy=True))
+            self.assertEqual(sorted(set(p.r for p in output)), [1, 2, 3, 4])
+            self.assertTrue(isinstance(output[0], ParameterSet))
+            self.assertFalse(isinstance(output[0], ParameterSpace))
+            self.assertTrue(all(p.g > 0 for p in output))
+
+    def test_nothing_to_sample(self):
+        self.assertRaises(ValueError, list, ParameterSpace({'x': ParameterRange([1, 2])}).sample(2))
+
+
 class ParameterSpaceSaveLoadTest(unittest.TestCase):
 
     def setUp(self):
@@ -498,6 +1016,154 @@ class ParameterTableTest(unittest.TestCase):
         self.assertEqual(pt, ParameterTable(ts))
         self.assertNotEqual(pt, ParameterTable(ts.replace('7', '8')))
 
+    def test_create_from_string_with_comments(self):
+        pt = ParameterTable('''
+            # generated by a script
+            #       col1    col2
+            row1     1       2
+            # a comment
+            row2     3       4
+        ''')
+        self.assertEqual(pt.as_dict(), {'row1': {'col1': 1.0, 'col2': 2.0},
+                                        'row2': {'col1': 3.0, 'col2': 4.0}})
+        self.assertTrue(isinstance(pt.row2.col1, float))
+
+    def test_load(self):
+        from io import StringIO
+        pt = ParameterTable.load(StringIO(u"label,n,tau_m,model\ncell1,1,20.0,iaf\n"
+                                          u"cell2,2,15,adex\n"),
+                                 delimiter=',', chunk_size=1, label='cells')
+        self.assertIsInstance(pt, ParameterTable)
+        self.assertEqual(pt.label, 'cells')
+        self.assertEqual(pt.cell2.as_dict(), {'n': 2, 'tau_m': 15.0, 'model': 'adex'})
+        self.assertTrue(isinstance(pt.cell2.n, int))
+        self.assertTrue(isinstance(pt.cell2.tau_m, float))
+        self.assertEqual(sorted(pt.column('model').values()), ['adex', 'iaf'])
+        pt = ParameterTable.load(StringIO(u"#  a  b\nr1  1  2\n"), dtypes={'b': str})
+        self.assertEqual(pt.r1.as_dict(), {'a': 1, 'b': '2'})
+
+class ArrayParameterTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pt = ArrayParameterTable('''
+            #       col1    col2    col3
+            row1     1       2       3
+            row2     4       5       6
+            row3     7       8       9
+        ''')
+
+    def test_create_from_string(self):
+        pt = self.pt
+        self.assertEqual(pt.shape, (3, 3))
+        self.assertEqual(pt.row2.col3, 6.0)
+        self.assertEqual(pt['row2.col3'], 6.0)
+        self.assertEqual(pt.column('col1'), {'row1': 1.0, 'row2': 4.0, 'row3': 7.0})
+        self.assertEqual(pt.row('row2'), {'col1': 4.0, 'col2': 5.0, 'col3': 6.0})
+        self.assertEqual(pt.row_labels(), ['row1', 'row2', 'row3'])
+        self.assertEqual(pt.column_labels(), ['col1', 'col2', 'col3'])
+
+    def test_same_as_parameter_table(self):
+        pt = ParameterTable(self.pt.table_string())
+        self.assertEqual(self.pt, pt.as_dict())
+        self.assertEqual(ArrayParameterTable(pt), self.pt)
+        self.assertEqual(ArrayParameterTable(self.pt.table_string()), self.pt)
+
+    def test_views_share_data(self):
+        pt = self.pt
+        column = pt.column('col2')
+        self.assertTrue(numpy.shares_memory(column.array, pt.array))
+        column['row1'] = 20.0
+        self.assertEqual(pt.row1.col2, 20.0)
+        t = pt.transpose()
+        self.assertTrue(numpy.shares_memory(t.array, pt.array))
+        self.assertEqual(t.col3.row2, 6.0)
+        self.assertEqual(t.row_labels(), pt.column_labels())
+        self.assertEqual([label for label, row in t.rows()], ['col1', 'col2', 'col3'])
+
+    def test_create_from_array(self):
+        pt = ArrayParameterTable(numpy.arange(6.0).reshape((2, 3)),
+                                 row_labels=['a', 'b'], column_labels=['x', 'y', 'z'])
+        self.assertEqual(pt.b.x, 3.0)
+        self.assertRaises(TypeError, ArrayParameterTable, numpy.zeros((2, 2)))
+        self.assertRaises(ValueError, ArrayParameterTable, numpy.zeros((2, 2)),
+                          row_labels=['a', 'a'], column_labels=['x', 'y'])
+
+    def test_in_parameter_set(self):
+        ps = ParameterSet({'weights': self.pt, 'n': 3})
+        self.assertEqual(ps['weights.row3.col1'], 7.0)
+        ps2 = ParameterSet(ps.pretty())
+        self.assertEqual(ps2.weights, self.pt)
+
+
+class ArrayParameterTableLoadTest(unittest.TestCase):
+
+    def test_load_inferred_types(self):
+        from io import StringIO
+        pt = ArrayParameterTable.load(StringIO(u"""
+            # generated by a script
+            #       n   tau_m   model
+            cell1   1   20.0    iaf
+            # a comment
+            cell2   2   15      adex
+            """))
+        self.assertEqual(pt.column_labels(), ['n', 'tau_m', 'model'])
+        self.assertEqual(pt.row_labels(), ['cell1', 'cell2'])
+        self.assertEqual(pt.array.dtype, object)
+        self.assertEqual(pt.cell2.as_dict(), {'n': 2, 'tau_m': 15.0, 'model': 'adex'})
+        self.assertTrue(isinstance(pt.cell2.n, int) or pt.cell2.n.dtype.kind == 'i')
+
+    def test_comment_after_header(self):
+        from io import StringIO
+        pt = ArrayParameterTable.load(StringIO(u"""
+            # generated by a script
+            #       a       b
+            # units: mV ms
+            r1      1       2
+            r2      3       4.5
+            """))
+        self.assertEqual(pt.column_labels(), ['a', 'b'])
+        self.assertEqual(pt.r2.as_dict(), {'a': 3, 'b': 4.5})
+        self.assertEqual(string_table(u"#  a  b\n# comment\nr1  1  2\n"),
+                         {'r1': {'a': 1.0, 'b': 2.0}})
+        self.assertRaises(ValueError, string_table, u"#  a  b\nr1  1  2\nr2  3\n")
+        self.assertRaises(ValueError, ArrayParameterTable.load,
+                          StringIO(u"#  a  b\nr1  1  2 3\nr2  3\n"), dtypes=float)
+
+    def test_load_widens_across_chunks(self):
+        from io import StringIO
+        pt = ArrayParameterTable.load(StringIO(u"label,x,y\nr1,1,2\nr2,3,4\nr3,5,6.5\n"),
+                                      delimiter=',', chunk_size=2)
+        self.assertEqual(pt.column('x').as_dict(), {'r1': 1, 'r2': 3, 'r3': 5})
+        self.assertEqual(pt.column('y').as_dict(), {'r1': 2.0, 'r2': 4.0, 'r3': 6.5})
+        self.assertTrue(isinstance(pt.r3.y, float))
+
+    def test_load_given_types(self):
+        from io import StringIO
+        text = u"#  a  b\nr1  1  2\nr2  3  4\n"
+        self.assertEqual(ArrayParameterTable.load(StringIO(text)).array.dtype.kind, 'i')
+        pt = ArrayParameterTable.load(StringIO(text), dtypes=float)
+        self.assertEqual(pt.array.dtype, numpy.float64)
+        pt = ArrayParameterTable.load(StringIO(text), dtypes={'b': str})
+        self.assertEqual(pt.r2.b, '4')
+        self.assertRaises(ValueError, ArrayParameterTable.load,
+                          StringIO(u"#  a  b\nr1  1\n"))
+
+    def test_load_file(self):
+        import tempfile
+        pt = ParameterTable('''
+            #       col1    col2
+            row1     1.5     2
+            row2     4       5
+        ''')
+        f = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
+        f.write(pt.table_string())
+        f.close()
+        try:
+            self.assertEqual(ArrayParameterTable.load(f.name), pt.as_dict())
+        finally:
+            os.remove(f.name)
+
+
 class ParameterReferenceTest(unittest.TestCase):
       
       def test_simple_lazy_evaluation(self):
@@ -543,8 +1209,419 @@ class ParameterReferenceTest(unittest.TestCase):
         self.assertEqual(ps.p3, 7)
         self.assertEqual(ps.p4, 8)
         self.assertEqual(ps.p6.z, 9)
-        
-        
+
+
+class AccessTrackingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSet({'sim': {'dt': 0.1, 'tstop': 1000.0},
+                                'cell': {'tau_m': 10.0, 'syn': {'E': 0.0, 'tau': 1.5}},
+                                'w': numpy.arange(3.0),
+                                'seed': 42})
+
+    def model(self, P):
+        cell = P.cell
+        return P['sim.dt']*cell.tau_m + sum(P.cell.syn.values())
+
+    def test_paths(self):
+        with self.ps.track_access() as record:
+            self.model(self.ps)
+            self.assertRaises(KeyError, self.ps.__getitem__, 'sim.method')
+            self.assertFalse(hasattr(self.ps, 'extra'))
+        self.assertEqual(record.paths, ['cell.syn', 'cell.tau_m', 'sim.dt'])
+        self.assertEqual(record.missing, ['extra', 'sim.method'])
+        self.ps.seed    # not recorded after the block
+        self.assertEqual(record.paths, ['cell.syn', 'cell.tau_m', 'sim.dt'])
+
+    def test_used(self):
+        with self.ps.track_access() as record:
+            self.model(self.ps)
+        used = record.used()
+        self.assertIsInstance(used, ParameterSet)
+        self.assertEqual(used.as_dict(), {'sim': {'dt': 0.1},
+                                          'cell': {'tau_m': 10.0,
+                                                   'syn': {'E': 0.0, 'tau': 1.5}}})
+
+    def test_digest_ignores_unused_parameters(self):
+        with self.ps.track_access() as record:
+            self.model(self.ps)
+        key = record.digest()
+        other = self.ps.tree_copy()
+        other['sim.tstop'] = 2000.0
+        other['seed'] = 1
+        self.assertEqual(record.digest(other), key)
+        self.assertNotEqual(other.digest(), self.ps.digest())
+        other['cell.syn.E'] = -70.0
+        self.assertNotEqual(record.digest(other), key)
+
+    def test_digest(self):
+        self.assertEqual(self.ps.digest(), self.ps.tree_copy().digest())
+        self.assertEqual(self.ps.digest(['sim.dt', 'nothing']),
+                         ParameterSet({'sim': {'dt': 0.1}}).digest(['sim.dt', 'nothing']))
+        other = self.ps.tree_copy()
+        other['w'] = numpy.arange(3.0) + 1
+        self.assertNotEqual(other.digest(['w']), self.ps.digest(['w']))
+        self.assertNotEqual(self.ps.digest(['nothing']), self.ps.digest(['seed']))
+
+    def test_get_and_contains(self):
+        with self.ps.track_access() as record:
+            self.ps.sim.get('method', 'euler')
+            'seed' in self.ps
+            self.ps.cell.get('tau_m')
+        # only a missing name was looked up in sim, so it is used in full
+        self.assertEqual(record.paths, ['cell.tau_m', 'seed', 'sim'])
+        self.assertEqual(record.missing, ['sim.method'])
+        key = record.digest()
+        other = self.ps.tree_copy()
+        other['sim.method'] = 'rk4'
+        self.assertNotEqual(record.digest(other), key)
+        other = self.ps.tree_copy()
+        del other['seed']
+        self.assertNotEqual(record.digest(other), key)
+
+    def test_iteration_uses_whole_set(self):
+        for use in (lambda P: list(P.sim), lambda P: P.sim.keys(), len,
+                    lambda P: P.sim.items(), lambda P: P.sim.tree_copy()):
+            with self.ps.track_access() as record:
+                self.ps['sim.dt']
+                use(self.ps)
+            other = self.ps.tree_copy()
+            other['sim.extra'] = 1
+            self.assertNotEqual(record.digest(other), record.digest())
+        self.assertEqual(record.paths, ['sim'])
+
+    def test_internal_traversal_not_recorded(self):
+        with self.ps.track_access() as record:
+            self.ps.cell.tree_copy()
+            self.ps.cell.as_dict()
+        self.assertEqual(record.paths, ['cell'])
+        self.assertEqual(record._read_paths, set(['cell']))
+        with self.ps.track_access() as record:
+            self.ps.tree_copy()
+        self.assertEqual(record.paths, [''])
+        self.assertEqual(record.digest(), self.ps.digest(['']))
+        self.assertEqual(record.used(), self.ps)
+
+    def test_other_threads_not_recorded(self):
+        import threading
+        thread = threading.Thread(target=lambda: (self.ps.seed, len(self.ps.sim)))
+        with self.ps.track_access() as record:
+            thread.start()
+            thread.join()
+            self.ps.get('cell')
+        self.assertEqual(record.paths, ['cell'])
+
+    def test_dict_methods_only_replaced_while_tracking(self):
+        self.assertFalse('__len__' in ParameterSet.__dict__)
+        with self.ps.track_access():
+            with self.ps.track_access():
+                self.assertTrue('__len__' in ParameterSet.__dict__)
+            self.assertTrue('__len__' in ParameterSet.__dict__)
+        self.assertFalse('__len__' in ParameterSet.__dict__)
+        self.assertFalse('get' in ParameterSet.__dict__)
+
+    def test_nested_records(self):
+        with self.ps.track_access() as outer:
+            self.ps.seed
+            with self.ps.cell.track_access() as inner:
+                self.model(self.ps)
+        self.assertEqual(outer.paths, ['cell.syn', 'cell.tau_m', 'seed', 'sim.dt'])
+        self.assertEqual(inner.paths, ['syn', 'tau_m'])
+
+
+class MemoryReportTest(unittest.TestCase):
+
+    def setUp(self):
+        # build the names at run time, so that they are distinct objects
+        self.ps = ParameterSet(dict(("cell%d" % i, dict([("".join(["tau", "_m"]), float(i)),
+                                                         ("".join(["c", "m"]), [0.25, 0.5])]))
+                                    for i in range(10)), label="net")
+        self.ps['w'] = numpy.zeros(100)
+
+    def test_totals(self):
+        report = self.ps.memory_report()
+        self.assertEqual(report['nodes'], 11)
+        self.assertEqual(report['total'], report['node_bytes'] + report['key_bytes'] +
+                         sum(report['by_type'].values()))
+        self.assertEqual(sorted(report['by_type']), ['float', 'list', 'ndarray'])
+        self.assertTrue(report['by_type']['ndarray'] >= 800)
+        self.assertEqual(len(report['by_subtree']), 11)
+        self.assertTrue(sum(report['by_subtree'].values()) < report['total'])
+        self.assertEqual(self.ps.memory_report(), report)
+
+    def test_depth(self):
+        report = self.ps.memory_report(depth=2)
+        self.assertEqual(len(report['by_subtree']), 31)
+        self.assertTrue(report['by_subtree']['cell3'] > report['by_subtree']['cell3.cm'] > 0)
+
+    def test_keys_are_interned(self):
+        self.assertTrue(list(self.ps['cell1'].keys())[0] is list(self.ps['cell2'].keys())[0])
+
+    def test_compact_nodes(self):
+        self.assertEqual(sorted(self.ps.cell1.names()), ['cm', 'tau_m'])
+        self.assertEqual(dict(self.ps.cell1.parameters()), {'tau_m': 1.0, 'cm': [0.25, 0.5]})
+        self.assertEqual(self.ps.label, "net")
+        self.assertEqual(self.ps.cell1.label, "cell1")
+        # no instance dict is needed for `_url` and `label`
+        self.assertFalse([obj for obj in gc.get_referents(self.ps.cell1) if type(obj) is dict])
+        copy = pickle.loads(pickle.dumps(self.ps))
+        self.assertEqual(copy.cell1.tau_m, 1.0)
+
+
+class InternPoolTest(unittest.TestCase):
+
+    def make_point(self, i):
+        return ParameterSet({'cell': {'tau_m': 10.0, 'syn': {'E': [0.0, -70.0], 'tau': 1.5}},
+                             'sim': {'dt': 0.1, 'seed': i},
+                             'w': numpy.arange(3.0)})
+
+    def test_shared_subtrees_and_values(self):
+        pool = InternPool()
+        a = self.make_point(1).intern(pool)
+        b = self.make_point(2).intern(pool)
+        self.assertEqual(b.pretty(), self.make_point(2).pretty())
+        self.assertTrue(a.cell is b.cell)
+        self.assertFalse(a.sim is b.sim)
+        self.assertTrue(a['sim.dt'] is b['sim.dt'])
+        self.assertFalse(a.w is b.w)     # arrays that can be changed are not shared
+        self.assertEqual(len(pool), 6)  # two roots, cell, cell.syn, two sims
+
+    def test_equal_points(self):
+        pool = InternPool()
+        a = self.make_point(1).intern(pool)
+        self.assertTrue(self.make_point(1).intern(pool) is a)
+
+    def test_fingerprint(self):
+        pool = InternPool()
+        a = ParameterSet({'x': {'v': 1}, 'y': {'v': 1}, 'z': {'v': 1.0}, 't': {'v': True}})
+        a.intern(pool)
+        self.assertFalse(a.x is a.y)        # different labels
+        self.assertEqual(a.y.label, 'y')
+        self.assertEqual([type(a[k].v) for k in 'xzt'], [int, float, bool])
+        c = ParameterSet({'v': numpy.arange(3)}).intern(pool)
+        d = ParameterSet({'v': numpy.arange(3.0)}).intern(pool)
+        self.assertFalse(c is d)
+
+    def test_eviction(self):
+        pool = InternPool()
+        a = self.make_point(1).intern(pool)
+        b = self.make_point(2).intern(pool)
+        del a
+        gc.collect()
+        self.assertEqual(len(pool), 4)
+        del b
+        gc.collect()
+        self.assertEqual(len(pool), 0)
+        self.assertEqual(pool._values, {})
+
+    def test_mutable_values_are_not_shared(self):
+        pool = InternPool()
+        frozen = numpy.arange(3.0)
+        frozen.flags.writeable = False
+        a = ParameterSet({'x': [1, 2], 'f': frozen, 't': (1, 'a'), 'label': 'a'})
+        b = ParameterSet({'x': [1, 2], 'f': frozen.copy(), 't': (1, 'a'), 'label': 'b'})
+        b.f.flags.writeable = False
+        a.intern(pool)
+        b.intern(pool)
+        self.assertFalse(a.x is b.x)
+        self.assertTrue(a.f is b.f)
+        self.assertTrue(a.t is b.t)
+
+    def test_distributions_are_not_shared(self):
+        pool = InternPool()
+        a = ParameterSet({'d': {'n': NormalDist(rng=1)}}).intern(pool)
+        b = ParameterSet({'d': {'n': NormalDist(rng=1)}}).intern(pool)
+        self.assertFalse(a.d is b.d)
+        self.assertFalse(a['d.n'] is b['d.n'])
+        a['d.n'].next()
+        self.assertEqual(a['d.n'].next(), b['d.n'].next(2)[1])
+
+    def test_unpickled(self):
+        pool = InternPool()
+        a = pickle.loads(pickle.dumps(self.make_point(1))).intern(pool)
+        self.assertTrue(self.make_point(1).intern(pool) is a)
+
+    def test_spaces_are_not_shared(self):
+        pool = InternPool()
+        a = ParameterSet({'s': ParameterSpace({'x': ParameterRange([1, 2])})}).intern(pool)
+        b = ParameterSet({'s': ParameterSpace({'x': ParameterRange([1, 2])})}).intern(pool)
+        self.assertFalse(a.s is b.s)
+
+
+class ParameterOverlayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.base = ParameterSet({'cell': {'tau_m': 10.0, 'cm': 0.25, 'syn': {'E': 0.0}},
+                                  'sim': {'dt': 0.1, 'tstop': 1000.0}}, label="base")
+        self.job = self.base.overlay({'cell.tau_m': 15.0, 'sim': {'seed': 2}})
+
+    def test_lookup(self):
+        job = self.job
+        self.assertEqual((job.cell.tau_m, job.cell.cm, job['cell.syn.E']), (15.0, 0.25, 0.0))
+        self.assertEqual((job.sim.dt, job['sim.seed']), (0.1, 2))
+        self.assertEqual(job.cell.syn, self.base.cell.syn)
+        self.assertRaises(KeyError, job.__getitem__, 'cell.gbar')
+        self.assertRaises(AttributeError, getattr, job, 'nothing')
+        self.assertTrue('cell.cm' in job)
+        self.assertFalse('cell.cm.x' in job)
+        self.assertEqual(sorted(job), ['cell', 'sim'])
+        self.assertEqual(len(job.sim), 3)
+        self.assertEqual(self.base.cell.tau_m, 10.0)
+
+    def test_leaf_shadows_subtree(self):
+        job = self.base.overlay({'cell': 'none'}, {'cell.x': 1})
+        self.assertEqual(job.cell.as_dict(), {'x': 1})
+        self.assertEqual(self.base.overlay({'cell': 'none'}).cell, 'none')
+
+    def test_merged_views(self):
+        expected = self.base.tree_copy()
+        expected.replace_values(**{'cell.tau_m': 15.0})
+        expected.sim.seed = 2
+        self.assertEqual(self.job.flatten(), expected.flatten())
+        self.assertEqual(self.job.as_dict(), expected.as_dict())
+        self.assertEqual(ParameterSet(self.job.pretty()), expected)
+        collapsed = self.job.collapse()
+        self.assertIsInstance(collapsed, ParameterSet)
+        self.assertEqual(collapsed, expected)
+        self.assertEqual(collapsed.label, "base")
+        self.assertFalse(collapsed.cell.syn is self.base.cell.syn)
+
+    def test_set_and_stack(self):
+        self.job['cell.syn.E'] = -70.0
+        self.assertEqual(self.job.cell.syn.E, -70.0)
+        self.assertEqual(self.base.cell.syn.E, 0.0)
+        job2 = self.job.overlay({'sim.dt': 0.01})
+        self.assertEqual((job2.sim.dt, job2.sim.seed, job2.cell.tau_m), (0.01, 2, 15.0))
+        self.assertEqual(self.job.sim.dt, 0.1)
+        empty = self.base.overlay()
+        empty['sim.dt'] = 0.5
+        self.assertEqual((empty.sim.dt, self.base.sim.dt), (0.5, 0.1))
+
+    def test_set_leaves_layers_unchanged(self):
+        overrides = ParameterSet({'cell': {'tau_m': 15.0}})
+        job = self.base.overlay(overrides)
+        job['cell.tau_m'] = 20.0
+        job['sim.dt'] = 0.01
+        self.assertEqual((job.cell.tau_m, job.sim.dt), (20.0, 0.01))
+        self.assertEqual(overrides.as_dict(), {'cell': {'tau_m': 15.0}})
+        self.assertEqual((self.base.cell.tau_m, self.base.sim.dt), (10.0, 0.1))
+        job2 = job.overlay()
+        job2['cell.cm'] = 0.5
+        self.assertEqual((job2.cell.cm, job.cell.cm), (0.5, 0.25))
+
+    def test_set_nested(self):
+        job = self.base.overlay({'cell.tau_m': 15.0})
+        job.sim['dt'] = 0.5
+        sim = job.sim
+        sim.tstop = 10.0
+        job.cell.syn.E = -70.0
+        job.n = 7
+        self.assertEqual((job.sim.dt, sim.dt, sim.tstop, job['sim.tstop']), (0.5, 0.5, 10.0, 10.0))
+        self.assertEqual((job['cell.syn.E'], job.cell.tau_m, job.n, job['n']), (-70.0, 15.0, 7, 7))
+        self.assertEqual(job.collapse().as_dict(),
+                         {'cell': {'tau_m': 15.0, 'cm': 0.25, 'syn': {'E': -70.0}},
+                          'sim': {'dt': 0.5, 'tstop': 10.0}, 'n': 7})
+        self.assertEqual(self.base.as_dict(),
+                         {'cell': {'tau_m': 10.0, 'cm': 0.25, 'syn': {'E': 0.0}},
+                          'sim': {'dt': 0.1, 'tstop': 1000.0}})
+
+    def test_unpickled_layer(self):
+        base = pickle.loads(pickle.dumps(self.base))
+        object.__delattr__(base, 'label')
+        job = base.overlay({'sim.dt': 0.01})
+        self.assertEqual(job.label, None)
+        self.assertEqual(job.sim.dt, 0.01)
+
+    def test_collapse_space(self):
+        job = self.base.overlay({'cell.tau_m': ParameterRange([10.0, 15.0])})
+        space = job.collapse()
+        self.assertIsInstance(space, ParameterSpace)
+        self.assertEqual(space.num_conditions(), 2)
+
+
+class MergeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSet({'cell': {'tau_m': 10.0, 'cm': 0.25, 'syn': {'E': 0.0}},
+                                'sim': {'dt': 0.1}, 'seed': 1})
+
+    def test_merge_override(self):
+        other = {'cell': {'tau_m': 15.0, 'syn': {'tau': 1.5}, 'new': {'x': 1}},
+                 'sim.method': 'euler', 'seed': {'value': 2}}
+        syn = self.ps.cell.syn
+        result = self.ps.merge(other)
+        self.assertTrue(result is self.ps)
+        self.assertEqual(self.ps.as_dict(),
+                         {'cell': {'tau_m': 15.0, 'cm': 0.25, 'syn': {'E': 0.0, 'tau': 1.5},
+                                   'new': {'x': 1}},
+                          'sim': {'dt': 0.1, 'method': 'euler'}, 'seed': {'value': 2}})
+        self.assertTrue(self.ps.cell.syn is syn)
+        self.assertIsInstance(self.ps.cell.new, ParameterSet)
+        self.assertIsInstance(self.ps.seed, ParameterSet)
+        self.assertEqual(self.ps.cell.new.label, 'new')
+        # `other` is not modified
+        self.assertEqual(type(other['cell']['new']), dict)
+
+    def test_merge_copies_parameter_sets(self):
+        other = ParameterSet({'extra': {'a': 1}})
+        self.ps.merge(other)
+        self.ps['extra.a'] = 2
+        self.assertEqual(other.extra.a, 1)
+
+    def test_merge_strategies(self):
+        other = {'cell': {'tau_m': 15.0, 'cm': 0.25, 'gbar': 1.0}}
+        kept = self.ps.tree_copy().merge(other, strategy='keep')
+        self.assertEqual((kept.cell.tau_m, kept.cell.gbar), (10.0, 1.0))
+        self.assertRaises(ValueError, self.ps.tree_copy().merge, other, strategy='error')
+        self.ps.tree_copy().merge({'cell': {'cm': 0.25}}, strategy='error')
+        conflicts = []
+
+        def mean(path, value, new):
+            conflicts.append(path)
+            return (value + new)/2
+        merged = self.ps.tree_copy().merge(other, strategy=mean)
+        self.assertEqual(merged.cell.tau_m, 12.5)
+        self.assertEqual(conflicts, ['cell.tau_m'])
+        self.assertRaises(ValueError, self.ps.merge, other, strategy='average')
+
+    def test_set_many(self):
+        self.ps.set_many({'cell.tau_m': 15.0, 'cell.syn.E': -70.0, 'seed': 2,
+                          'sim': ParameterSet({'dt': 0.01}), 'sim.tstop': 100.0})
+        self.assertEqual(self.ps.as_dict(),
+                         {'cell': {'tau_m': 15.0, 'cm': 0.25, 'syn': {'E': -70.0}},
+                          'sim': {'dt': 0.01, 'tstop': 100.0}, 'seed': 2})
+        self.assertRaises(KeyError, self.ps.set_many, {'nothing.x': 1})
+
+    def test_merge_into_space(self):
+        space = ParameterSpace({'cell': {'tau_m': ParameterRange([10.0, 20.0])}, 'seed': 1})
+        other = ParameterSpace({'w': ParameterRange([0.1, 0.2]), 'n': 3})
+        other.constrain('w < 0.15')
+        space.merge({'cell': {'cm': ParameterRange([0.25, 0.5])}, 'syn': {'E': 0.0},
+                     'input': other})
+        self.assertIsInstance(space.syn, ParameterSpace)
+        self.assertIsInstance(space.input, ParameterSpace)
+        self.assertEqual(len(space.input.constraints), 1)
+        self.assertEqual(space.num_conditions(), 2*2*2)
+
+    def test_subclass_setitem(self):
+        names = []
+
+        class RecordingSet(ParameterSet):
+            def __setitem__(self, name, value):
+                names.append(name)
+                ParameterSet.__setitem__(self, name, value)
+
+        ps = RecordingSet({'a': 1, 'b': {'c': 2}})
+        del names[:]
+        ps.set_many({'a': 2, 'b.c': 3})
+        ps.merge({'a': 4, 'd': {'e': 5}})
+        self.assertEqual(names, ['a', 'a', 'e', 'd'])
+        self.assertIsInstance(ps.d, RecordingSet)
+
+    def test_replace_values(self):
+        self.ps.replace_values(**{'cell.syn.E': -70.0, 'seed': 3})
+        self.assertEqual((self.ps.cell.syn.E, self.ps.seed), (-70.0, 3))
+
+
 if __name__ == '__main__':
     unittest.main()
-
@@ -6,6 +6,7 @@ Unit tests for the NeuroTools.random module
 from __future__ import absolute_import
 import unittest
 from parameters.random import *
+import numpy
 
 
 class RandomDistributionTest(unittest.TestCase):
@@ -37,6 +38,91 @@ class RandomDistributionTest(unittest.TestCase):
         pd = ParameterDist()
         self.assertRaises(NotImplementedError, pd.next)
 
+    def test_GammaDistSeeded(self):
+        g = GammaDist(mean=2.0, std=0.5, rng=42)
+        expected = numpy.random.default_rng(42).gamma(16.0, 0.125, size=5)
+        self.assertTrue(numpy.all(g.next(5) == expected))
+        vals = GammaDist(mean=2.0, std=0.5, rng=1).next(100000)
+        self.assertAlmostEqual(vals.mean(), 2.0, 1)
+        self.assertAlmostEqual(vals.std(), 0.5, 1)
+
+    def test_norm_ppf(self):
+        p = numpy.array([0.0, 1e-10, 0.01, 0.3, 0.5, 0.975, 1.0])
+        x = norm_ppf(p)
+        self.assertEqual(x[0], -numpy.inf)
+        self.assertEqual(x[-1], numpy.inf)
+        self.assertEqual(x[4], 0.0)
+        for xi, pi in zip(x[1:-1], p[1:-1]):
+            self.assertAlmostEqual(norm_cdf(xi), pi, 9)
+
+    def test_TruncatedNormalDist(self):
+        t = TruncatedNormalDist(mean=-65.0, std=5.0, min=-60.0, max=-50.0, rng=1)
+        vals = t.next(10000)
+        self.assertTrue(vals.min() >= -60.0)
+        self.assertTrue(vals.max() <= -50.0)
+        # far in the tail
+        vals = TruncatedNormalDist(min=8.0, rng=1).next(1000)
+        self.assertTrue(vals.min() >= 8.0)
+        self.assertTrue(vals.mean() < 8.5)
+
+    def test_LogNormalDist(self):
+        vals = LogNormalDist(mu=0.0, sigma=0.5, rng=1).next(100000)
+        self.assertTrue(vals.min() > 0)
+        self.assertAlmostEqual(vals.mean(), LogNormalDist(sigma=0.5).mean(), 1)
+
+    def test_discrete_dists(self):
+        self.assertEqual(set(ChoiceDist(['a', 'b'], rng=1).next(100)), set(['a', 'b']))
+        self.assertEqual(list(ChoiceDist([1, 2, 3], p=[0, 0, 1]).next(3)), [3, 3, 3])
+        vals = RandIntDist(min=1, max=3, rng=1).next(100)
+        self.assertEqual(set(vals), set([1, 2, 3]))
+        vals = RandIntDist(min=1, max=3, rng=numpy.random.RandomState(1)).next(100)
+        self.assertEqual(set(vals), set([1, 2, 3]))
+        self.assertEqual(PoissonDist(lam=0.0).next(2).tolist(), [0, 0])
+
+    def test_buffered_same_as_unbuffered(self):
+        sizes = [1, 1, 7, 300, 1, 2, 50]
+        for make in (lambda: NormalDist(mean=1.0, rng=3),
+                     lambda: GammaDist(mean=2.0, std=0.5, rng=3),
+                     lambda: TruncatedNormalDist(min=0.0, max=1.0, rng=3),
+                     lambda: RandIntDist(0, 9, rng=3),
+                     lambda: ChoiceDist(['a', 'b', 'c'], rng=3)):
+            unbuffered = make()
+            plain = numpy.concatenate([unbuffered.next(n) for n in sizes])
+            buffered = make().buffered(64)
+            vals = numpy.concatenate([buffered.next(n) for n in sizes])
+            self.assertEqual(vals.tolist(), plain.tolist())
+            self.assertEqual(vals.dtype, plain.dtype)
+
+    def test_buffer_cleared(self):
+        u = UniformDist(rng=1).buffered(100)
+        u.next()
+        u.from_stats([10, 20])
+        self.assertTrue(u.next(100).min() >= 10)
+        u.buffered(0)
+        self.assertEqual(len(u._buffer), 0)
+
+    def test_ppf(self):
+        q = numpy.array([0.05, 0.5, 0.95])
+        self.assertTrue(numpy.allclose(NormalDist(1.0, 2.0).ppf(q),
+                                       [1.0 - 2*1.6448536, 1.0, 1.0 + 2*1.6448536]))
+        self.assertTrue(numpy.allclose(UniformDist(-1.0, 1.0).ppf(q), [-0.9, 0.0, 0.9]))
+        self.assertTrue(numpy.allclose(LogNormalDist(0.0, 1.0).ppf([0.5]), [1.0]))
+        self.assertEqual(RandIntDist(1, 4).ppf([0.01, 0.25, 0.26, 0.99]).tolist(), [1, 1, 2, 4])
+        self.assertEqual(list(ChoiceDist(['a', 'b'], p=[0.9, 0.1]).ppf(q)), ['a', 'a', 'b'])
+        self.assertEqual(PoissonDist(2.0).ppf([0.1, 0.5, 0.9]).tolist(), [0, 2, 4])
+        vals = TruncatedNormalDist(min=0.0, max=1.0).ppf(numpy.linspace(0, 1, 11))
+        self.assertEqual((vals[0], vals[-1]), (0.0, 1.0))
+        self.assertTrue((numpy.diff(vals) > 0).all())
+
+    def test_gamma_ppf(self):
+        q = numpy.linspace(0.001, 0.999, 50)
+        for a in (0.2, 1.0, 16.0):
+            self.assertTrue(numpy.allclose(gammainc(a, gamma_ppf(q, a)), q, rtol=0, atol=1e-12))
+        # exponential distribution
+        self.assertTrue(numpy.allclose(gamma_ppf(q, 1.0), -numpy.log(1 - q)))
+        g = GammaDist(a=16.0, b=0.125)
+        self.assertTrue(numpy.allclose(g.ppf(q), 0.125*gamma_ppf(q, 16.0)))
+
 # ========================================================================
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for the parameters.results module
+"""
+
+from __future__ import absolute_import
+import unittest
+import multiprocessing
+import pickle
+import shutil
+import tempfile
+import os
+import numpy
+from parameters import ParameterSpace, ParameterRange
+from parameters.results import ResultsCube
+
+
+def _run(args):
+    cube, point = args
+    cube[point] = {'total': point.a + point.b.c, 'count': point.a}
+    cube.flush()
+
+
+class ResultsCubeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'cube')
+        self.space = ParameterSpace({'a': ParameterRange([1, 2, 3]),
+                                     'b': {'c': ParameterRange.linspace(0, 1, 5)},
+                                     'name': ParameterRange(['x', 'y'])})
+        self.cube = ResultsCube.create(self.space, self.directory,
+                                       {'total': 'float64', 'count': 'int32'})
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.directory))
+
+    def test_create(self):
+        self.assertEqual(self.cube.shape, (3, 5, 2))
+        self.assertEqual(self.cube.keys, ['a', 'b.c', 'name'])
+        self.assertTrue(numpy.isnan(self.cube['total']).all())
+        self.assertEqual(self.cube['count'].dtype, numpy.int32)
+        self.assertEqual(self.cube.labels()['name'], ['x', 'y'])
+
+    def test_index_matches_parameter_space_index(self):
+        for point in self.space.iter_inner():
+            self.assertEqual(self.cube.index(point), self.space.parameter_space_index(point))
+
+    def test_set_and_reopen(self):
+        for point in self.space.iter_inner():
+            if point.name == 'x':
+                self.cube[point] = {'total': point.a + point.b.c, 'count': point.a}
+        self.cube.flush()
+        cube = ResultsCube(self.directory, mode='r')
+        point = self.space.point(5)
+        self.assertEqual(cube.get(point), {'total': 3.25, 'count': 3})
+        self.assertTrue(cube.is_set(point))
+        self.assertFalse(cube.is_set(self.space.point(20)))
+        self.assertEqual(cube['count'][:, :, 0].sum(), 30)
+        self.assertTrue(numpy.isnan(cube['total'][:, :, 1]).all())
+
+    def test_value_not_in_space(self):
+        point = self.space.point(0)
+        point.a = 4
+        self.assertRaises(ValueError, self.cube.index, point)
+
+    def test_pickle(self):
+        cube = pickle.loads(pickle.dumps(self.cube))
+        self.assertEqual(cube.directory, self.directory)
+        self.assertEqual(cube.shape, self.cube.shape)
+
+    def test_concurrent_writes(self):
+        points = [(self.cube, point) for point in self.space.iter_inner(copy=True)]
+        pool = multiprocessing.Pool(2)
+        try:
+            pool.map(_run, points)
+        finally:
+            pool.close()
+            pool.join()
+        cube = ResultsCube(self.directory, mode='r')
+        self.assertTrue(cube.done.all())
+        self.assertEqual(cube['total'].sum(), 2*(5*(1 + 2 + 3) + 3*2.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+Unit tests for the parameters.sampling module
+"""
+
+from __future__ import absolute_import
+import unittest
+import numpy
+from parameters.sampling import *
+
+try:
+    from scipy.stats import qmc
+    have_qmc = True
+except ImportError:
+    have_qmc = False
+
+
+class UnitSamplesTest(unittest.TestCase):
+
+    def test_latin_hypercube_is_stratified(self):
+        u = numpy.concatenate(list(latin_hypercube(20, 3, block_size=7,
+                                                   rng=numpy.random.default_rng(1))))
+        self.assertEqual(u.shape, (20, 3))
+        for j in range(3):
+            self.assertEqual(sorted((u[:, j]*20).astype(int)), list(range(20)))
+
+    def test_sequences_in_open_interval(self):
+        for method in ('lhs', 'sobol', 'halton'):
+            u = numpy.concatenate(list(unit_samples(method, 100, 5, block_size=30)))
+            self.assertEqual(u.shape, (100, 5))
+            self.assertTrue(u.min() > 0.0 and u.max() < 1.0)
+
+    def test_sobol_randomized_is_reproducible(self):
+        a = list(sobol(10, 4, rng=numpy.random.default_rng(5)))[0]
+        b = list(sobol(10, 4, rng=numpy.random.default_rng(5)))[0]
+        self.assertTrue((a == b).all())
+        self.assertRaises(ValueError, list, sobol(10, SOBOL_MAX_DIMENSION + 1))
+        self.assertRaises(ValueError, unit_samples, 'grid', 10, 2)
+
+    @unittest.skipUnless(have_qmc, "scipy.stats.qmc not available")
+    def test_same_as_scipy(self):
+        u = numpy.concatenate(list(sobol(255, SOBOL_MAX_DIMENSION, block_size=100, skip=0)))
+        expected = qmc.Sobol(SOBOL_MAX_DIMENSION, scramble=False).random(256)[:255]
+        self.assertTrue(numpy.allclose(u, expected, rtol=0, atol=1e-15))
+        u = numpy.concatenate(list(halton(100, 6, block_size=30, skip=0)))
+        expected = qmc.Halton(6, scramble=False).random(100)
+        self.assertTrue(numpy.allclose(u, expected, rtol=0, atol=1e-15))
+
+
+if __name__ == '__main__':
+    unittest.main()
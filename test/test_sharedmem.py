@@ -0,0 +1,163 @@
+"""
+Unit tests for the parameters.sharedmem module
+"""
+
+from __future__ import absolute_import
+import unittest
+import multiprocessing
+import pickle
+import subprocess
+import sys
+import numpy
+from parameters import ParameterSet, ParameterSpace, ParameterRange, ParameterTable, \
+    ArrayParameterTable
+
+if sys.version_info >= (3, 8):
+    from parameters import sharedmem
+
+
+def _total(args):
+    ps, i = args
+    return float(ps['cells.weights'].sum()) + ps.cells.n * i
+
+
+def _run(code):
+    p = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE,
+                         stderr=subprocess.PIPE)
+    out, err = p.communicate()
+    return p.returncode, out.decode().strip(), err.decode()
+
+
+@unittest.skipIf(sys.version_info < (3, 8), "requires Python 3.8 or later")
+class SharedParameterSetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ps = ParameterSet({'cells': {'n': 3, 'weights': numpy.arange(12.0).reshape((3, 4)),
+                                          'syn': {'tau': [1.5, 10.0]}},
+                                'columns': numpy.arange(12).reshape((3, 4)).T,
+                                'objects': numpy.array([1, 'x'], dtype=object),
+                                'name': 'net'}, label='base')
+        self.shared = self.ps.share()
+
+    def tearDown(self):
+        self.shared.unlink()
+
+    def test_view(self):
+        view = self.shared.view()
+        self.assertIsInstance(view, ParameterSet)
+        self.assertEqual(view.pretty(), self.ps.pretty())
+        self.assertEqual(view.label, 'base')
+        self.assertEqual(view['cells.syn.tau'], [1.5, 10.0])
+        self.assertTrue((view.columns == self.ps.columns).all())
+        self.assertFalse(view.cells.weights.flags.writeable)
+        self.assertIs(sharedmem.attach(self.shared.name), view)
+        self.assertIs(sharedmem.attach(self.shared.name, 'cells.syn'), view.cells.syn)
+
+    def test_read_only(self):
+        view = self.shared.view()
+        self.assertRaises(TypeError, view.__setitem__, 'name', 'x')
+        self.assertRaises(TypeError, view.cells.__setitem__, 'n', 4)
+        self.assertRaises(TypeError, view.__setitem__, 'cells.n', 4)
+        self.assertRaises(TypeError, setattr, view, 'name', 'x')
+        self.assertRaises(TypeError, view.update, {'name': 'x'})
+        self.assertRaises(TypeError, view.merge, {'name': 'x'})
+        self.assertRaises(TypeError, view.pop, 'name')
+        self.assertRaises(ValueError, view.cells.weights.__setitem__, 0, 1.0)
+        copy = view.tree_copy()
+        copy['cells.n'] = 4
+        self.assertEqual(copy.cells.n, 4)
+        self.assertEqual(view.cells.n, 3)
+
+    def test_snapshot(self):
+        self.ps['cells.n'] = 5
+        self.ps['cells.weights'][0, 0] = -1
+        view = self.shared.view()
+        self.assertEqual(view.cells.n, 3)
+        self.assertEqual(view.cells.weights[0, 0], 0.0)
+
+    def test_pickled_as_name(self):
+        view = self.shared.view()
+        self.assertLess(len(pickle.dumps(view.cells)), 200)
+        self.assertIs(pickle.loads(pickle.dumps(view.cells)), view.cells)
+
+    def test_workers(self):
+        pool = multiprocessing.Pool(2)
+        try:
+            totals = pool.map(_total, [(self.shared.view(), i) for i in range(4)])
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEqual(totals, [66.0, 69.0, 72.0, 75.0])
+
+    def test_attach_in_other_process(self):
+        code = ("from parameters import sharedmem\n"
+                "print(sharedmem.attach(%r)['cells.weights'].sum())" % self.shared.name)
+        self.assertEqual(_run(code)[:2], (0, '66.0'))
+        # the block is still there after the other process has exited
+        self.assertEqual(sharedmem.attach(self.shared.name).cells.n, 3)
+
+    def test_unlink(self):
+        name = self.shared.name
+        self.shared.view()
+        with self.ps.share() as other:
+            self.assertEqual(other.view().name, 'net')
+        self.shared.unlink()
+        self.assertRaises(FileNotFoundError, sharedmem.attach, name)
+        self.assertRaises(FileNotFoundError, sharedmem.attach, other.name)
+
+    def test_unlinked_when_publisher_exits(self):
+        for end in ("", "raise SystemExit(3)"):
+            code = ("from parameters import ParameterSet\n"
+                    "shared = ParameterSet({'a': 1}).share()\n"
+                    "print(shared.name)\n" + end)
+            status, name, err = _run(code)
+            self.assertRaises(FileNotFoundError, sharedmem.attach, name)
+            self.assertNotIn('leaked', err)
+
+    def test_space(self):
+        space = ParameterSpace({'a': ParameterRange([1, 2]), 'b': {'c': 1}})
+        space.constrain("a > 1")
+        with ParameterSet({'space': space}).share() as shared:
+            view = shared.view().space
+            self.assertIsInstance(view, ParameterSpace)
+            self.assertIsInstance(view, sharedmem.FrozenParameterSet)
+            self.assertEqual([p.a for p in view.iter_inner()], [2])
+            self.assertRaises(TypeError, view.constrain, "a < 2")
+            self.assertIsInstance(view.tree_copy(), ParameterSpace)
+            self.assertEqual(len(view.tree_copy().constraints), 1)
+
+    def test_tables(self):
+        table = ParameterTable('''
+            #    x    y
+            r1   1    2
+            r2   3    4
+        ''')
+        weights = ArrayParameterTable(numpy.arange(20000.0).reshape((100, 200)),
+                                      ['r%d' % i for i in range(100)],
+                                      ['c%d' % j for j in range(200)], label='w')
+        with ParameterSet({'table': table, 'weights': weights}).share() as shared:
+            view = shared.view()
+            self.assertIsInstance(view.table, ParameterTable)
+            self.assertEqual(view.table.column('y'), {'r1': 2.0, 'r2': 4.0})
+            self.assertEqual(sorted(view.table.row_labels()), ['r1', 'r2'])
+            self.assertIsInstance(view.weights, ArrayParameterTable)
+            self.assertEqual(view.weights, weights)
+            self.assertEqual(view.weights.label, 'w')
+            self.assertEqual(view.weights.r99.c199, 19999.0)
+            self.assertFalse(view.weights.array.flags.writeable)
+            # the array is in the shared memory, not in the pickled index
+            segment = sharedmem._attached[shared.name][0]
+            self.assertLess(sharedmem._HEADER.unpack_from(segment.buf)[2], 10000)
+
+    def test_not_a_parameter_set(self):
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(create=True, size=64)
+        try:
+            self.assertRaises(ValueError, sharedmem.attach, block.name)
+        finally:
+            block.close()
+            block.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
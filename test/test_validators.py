@@ -0,0 +1,83 @@
+"""
+Unit tests for the parameters.validators module
+"""
+
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+from parameters import ParameterSet
+from parameters.validators import *
+
+
+class UnpicklableError(Exception):
+    # cannot be unpickled, as its constructor needs two arguments
+
+    def __init__(self, path, reason):
+        Exception.__init__(self, "%s: %s" % (path, reason))
+
+
+class FailingValidator(CongruencyValidator):
+
+    def validate(self, parameter_set, parameter_schema):
+        raise UnpicklableError('a', 'rejected')
+
+
+class ValidateManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = ParameterSchema({'a': 1, 'b': {'c': 2.0}})
+        self.dir = tempfile.mkdtemp()
+        self.sources = []
+        for i, content in enumerate(["{'a': 1, 'b': {'c': 2.0}}",
+                                     "{'a': 'x', 'b': {'c': 2.0}}",
+                                     "{'a': 1, 'b': {'c': 2.0}, 'd': 3}",
+                                     "{'a': 2, 'b': {'c': 3.0}}"]):
+            filename = os.path.join(self.dir, "%d.param" % i)
+            with open(filename, 'w') as f:
+                f.write(content)
+            self.sources.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check(self, results):
+        results = sorted(results, key=lambda r: r.index)
+        self.assertEqual([r.source for r in results], self.sources)
+        self.assertEqual([r.valid for r in results], [True, False, False, True])
+        self.assertEqual(results[1].error.path, 'a')
+        self.assertEqual(results[2].error.path, 'd')
+
+    def test_in_process(self):
+        batch = validate_many(self.sources, self.schema, workers=1)
+        self.check(list(batch))
+        self.assertEqual((batch.submitted, batch.completed, batch.passed, batch.failed),
+                         (4, 4, 2, 2))
+
+    def test_process_pool(self):
+        batch = validate_many(iter(self.sources), self.schema, workers=2)
+        self.check(list(batch))
+        self.assertEqual(batch.completed, 4)
+        self.assertTrue(batch.throughput() > 0)
+
+    def test_mixed_sources(self):
+        sources = [ParameterSet({'a': 1, 'b': {'c': 2.0}}), {'a': 1}, "{'a': "]
+        errors = validate_many(sources, self.schema, workers=1).errors()
+        self.assertEqual([r.index for r in errors], [1, 2])
+        self.assertTrue(isinstance(errors[0].error, ValidationError))
+        self.assertTrue(isinstance(errors[1].error, SyntaxError))
+
+    def test_unpicklable_error(self):
+        batch = validate_many(self.sources, self.schema, workers=2,
+                              validator_class=FailingValidator)
+        results = list(batch)
+        self.assertEqual(len(results), 4)
+        for result in results:
+            self.assertTrue(isinstance(result.error, RuntimeError))
+            self.assertEqual(str(result.error), "UnpicklableError: a: rejected")
+        self.assertEqual(batch.failed, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Unit tests for the parameters.workqueue module
+"""
+
+from __future__ import absolute_import
+import unittest
+import multiprocessing
+import shutil
+import tempfile
+import os
+import time
+from parameters import ParameterSpace, ParameterRange
+from parameters.workqueue import WorkQueue, LeaseLost
+
+
+def _drain(queue):
+    positions = []
+    for task in queue:
+        positions.append((task.position, task.point.a, task.point.b))
+        queue.complete(task)
+    return positions
+
+
+class WorkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'sweep.db')
+        self.space = ParameterSpace({'a': ParameterRange([1, 2, 3]),
+                                     'b': ParameterRange([10, 20, 30, 40])})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lease_all(self):
+        queue = WorkQueue.create(self.space, self.filename, order='random', seed=4)
+        points = [(p.a, p.b) for p in self.space.iter_inner(order='random', seed=4)]
+        tasks = list(queue)
+        self.assertEqual([(t.point.a, t.point.b) for t in tasks], points)
+        self.assertEqual(queue.counts(), {'new': 0, 'pending': 0, 'leased': 12,
+                                          'done': 0, 'failed': 0})
+        for task in tasks:
+            queue.complete(task)
+        self.assertTrue(queue.finished())
+        self.assertEqual(queue.lease(), None)
+
+    def test_expired_lease(self):
+        queue = WorkQueue.create(self.space, self.filename, lease_time=0.01)
+        task = queue.lease()
+        time.sleep(0.05)
+        other = WorkQueue(self.filename, worker='other')
+        again = other.lease()
+        self.assertEqual((again.position, again.attempt), (0, 2))
+        self.assertRaises(LeaseLost, queue.heartbeat, task)
+        self.assertRaises(LeaseLost, queue.complete, task)
+        other.heartbeat(again)
+        other.complete(again)
+        self.assertEqual(other.counts()['done'], 1)
+
+    def test_fail_and_retry(self):
+        queue = WorkQueue.create(self.space, self.filename, max_attempts=2)
+        task = queue.lease()
+        queue.fail(task, 'diverged')
+        task = queue.lease()
+        self.assertEqual((task.position, task.attempt), (0, 2))
+        queue.fail(task, 'diverged again')
+        self.assertEqual(queue.lease().position, 1)
+        self.assertEqual(queue.failures(), [(0, 'diverged again')])
+
+    def test_constrained_space(self):
+        self.space.constrain('b > 10*a')
+        queue = WorkQueue.create(self.space, self.filename)
+        self.assertEqual(queue.total, 6)
+        self.assertRaises(ValueError, WorkQueue, self.filename)
+        queue = WorkQueue(self.filename, space=self.space)
+        self.assertTrue(all(t.point.b > 10*t.point.a for t in queue))
+
+    def test_several_workers(self):
+        queue = WorkQueue.create(self.space, self.filename)
+        pool = multiprocessing.Pool(3)
+        try:
+            results = pool.map(_drain, [queue]*3)
+        finally:
+            pool.close()
+            pool.join()
+        positions = sorted(sum(results, []))
+        self.assertEqual([p[0] for p in positions], list(range(12)))
+        self.assertTrue(queue.finished())
+
+
+if __name__ == '__main__':
+    unittest.main()